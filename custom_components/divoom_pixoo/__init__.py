@@ -3,20 +3,41 @@ from __future__ import annotations
 
 import logging
 
-import voluptuous as vol
-
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
+from .catalog import async_get_catalog
 from .const import DIVOOM_PIXOO_CONFIG, DOMAIN
-from .coordinator import DivoomPixooConfig, DivoomPixooDataUpdateCoordinator
+from .coordinator import (
+    DivoomPixooConfig,
+    DivoomPixooDataUpdateCoordinator,
+    async_remove_snapshot,
+)
+from .discovery import DivoomPixooRediscovery, async_get_discovery_cache
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS: list[Platform] = [Platform.LIGHT, Platform.SIREN, Platform.SELECT]
+PLATFORMS: list[Platform] = [
+    Platform.LIGHT,
+    Platform.SIREN,
+    Platform.SELECT,
+    Platform.SENSOR,
+    Platform.IMAGE,
+]
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
-RUN_COMMANDS_SCHEMA: vol.Schema = vol.Schema({vol.Required("command_list")})
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up our integration, i.e. the services, discovery cache and catalog shared by all our devices."""
+    async_setup_services(hass)
+    await async_get_discovery_cache(hass)
+    await async_get_catalog(hass)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
@@ -40,21 +61,61 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     # With that device data, create our coordinator object and store it on the central hass.data, to share it with all our platforms and their entity instances
     # The coordinator will be the central shared code that does the actual api calls to our device
     coordinator: DivoomPixooDataUpdateCoordinator = DivoomPixooDataUpdateCoordinator(
-        hass=hass, divoom_pixoo_config=divoom_pixoo_config
+        hass=hass,
+        config_entry=config_entry,
+        divoom_pixoo_config=divoom_pixoo_config,
+        catalog=await async_get_catalog(hass),
     )
     hass.data[DOMAIN][config_entry.entry_id] = coordinator
-    # And have it fetch the first live device data
-    await coordinator.async_config_entry_first_refresh()
+
+    # When the device can not be reached, it might have moved to another ip, so request a rediscovery
+    rediscovery: DivoomPixooRediscovery = DivoomPixooRediscovery(
+        hass, await async_get_discovery_cache(hass)
+    )
+
+    @callback
+    def async_check_reachable() -> None:
+        """Request a rediscovery when the device could no longer be reached for a while."""
+        if coordinator.last_update_success:
+            rediscovery.async_update_succeeded()
+        else:
+            rediscovery.async_update_failed(coordinator.last_exception)
+
+    # Restore the last known device data, so our entities have a state right away
+    # Startup never waits for the device, an unreachable device just makes our entities unavailable
+    await coordinator.async_restore_snapshot()
 
     # No we can ask our platforms to create their entities
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
 
+    config_entry.async_on_unload(coordinator.async_add_listener(async_check_reachable))
+
+    # And have it fetch the first live device data in the background
+    config_entry.async_create_background_task(
+        hass,
+        coordinator.async_refresh(),
+        name=f"divoom_pixoo_first_refresh_{divoom_pixoo_config.id}",
+    )
+
+    # Reload the device when its options are changed
+    config_entry.async_on_unload(config_entry.add_update_listener(async_reload_entry))
+
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a specific Divoom Pixoo device, i.e. when its options have changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a specific Divoom Pixoo device, and all its platorms with their entities."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         hass.data[DOMAIN].pop(entry.entry_id)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted data of a specific Divoom Pixoo device, when it is removed."""
+    await async_remove_snapshot(hass, entry.entry_id)
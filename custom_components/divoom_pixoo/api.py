@@ -0,0 +1,260 @@
+"""Divoom Pixoo API client.
+
+Native asyncio client for the local Divoom Pixoo http api (and the online Divoom device lookup)
+It uses the shared Home Assistant aiohttp session, so every device keeps its keep-alive connection in the session pool
+and no executor threads are needed on the command or poll paths.
+Every request to a device is recorded in the metrics of its client.
+
+http://docin.divoom-gz.com/web/#/5/23
+"""
+from __future__ import annotations
+
+import asyncio
+from asyncio import timeout
+import json
+import logging
+from typing import Any, Final
+
+from aiohttp import ClientError, ClientSession
+
+from .circuit_breaker import CircuitState, DivoomPixooCircuitBreaker
+from .metrics import DivoomPixooMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+DIVOOM_CLOUD_URL: Final = "https://app.divoom-gz.com"
+DIVOOM_CLOUD_FIND_DEVICES: Final = "Device/ReturnSameLANDevice"
+DIVOOM_CLOUD_DIAL_TYPES: Final = "Channel/GetDialType"
+DIVOOM_CLOUD_DIAL_LIST: Final = "Channel/GetDialList"
+
+REQUEST_TIMEOUT: Final = 10
+# Number of times a read command is retried when the connection drops
+REQUEST_RETRIES: Final = 1
+JSON_HEADERS: Final = {"Content-Type": "application/json"}
+# Cheap request, with a short timeout, that probes whether an unreachable device is back
+PROBE_COMMAND: Final = "Device/GetDeviceTime"
+PROBE_DATA: Final = b'{"Command": "Device/GetDeviceTime"}'
+PROBE_TIMEOUT: Final = 2
+
+# Keys from Divoom API
+API_COMMAND: Final = "Command"
+API_COMMAND_LIST: Final = "CommandList"
+API_ERROR_CODE: Final = "error_code"
+API_RETURN_CODE: Final = "ReturnCode"
+API_DEVICE_LIST: Final = "DeviceList"
+API_DIAL_TYPE_LIST: Final = "DialTypeList"
+API_DIAL_LIST: Final = "DialList"
+API_TOTAL_NUM: Final = "TotalNum"
+
+
+class DivoomPixooApiError(Exception):
+    """Divoom Pixoo API error."""
+
+
+class DivoomPixooConnectionError(DivoomPixooApiError):
+    """Divoom Pixoo device could not be reached."""
+
+
+class DivoomPixooInvalidResponse(DivoomPixooApiError):
+    """Divoom Pixoo device returned an invalid response."""
+
+
+class DivoomPixooCircuitOpenError(DivoomPixooConnectionError):
+    """Divoom Pixoo device is known to be unreachable, so the request was not sent."""
+
+
+async def async_post_cloud(
+    session: ClientSession, path: str, payload: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    """Post to the online Divoom API, and return its response."""
+    try:
+        async with timeout(REQUEST_TIMEOUT):
+            async with session.post(
+                f"{DIVOOM_CLOUD_URL}/{path}", json=payload or {}
+            ) as response:
+                result: dict[str, Any] = await response.json(content_type=None)
+    except (TimeoutError, ClientError) as exception:
+        raise DivoomPixooConnectionError(
+            "Could not reach the Divoom online API"
+        ) from exception
+    except ValueError as exception:
+        raise DivoomPixooInvalidResponse(
+            "Invalid response from the Divoom online API"
+        ) from exception
+
+    if not isinstance(result, dict) or result.get(API_RETURN_CODE, 0) != 0:
+        raise DivoomPixooInvalidResponse(
+            f"Divoom online API returned error for {path}: {result}"
+        )
+    return result
+
+
+async def async_get_cloud_devices(session: ClientSession) -> list[dict[str, Any]]:
+    """Get the devices on the same LAN using the online Divoom API.
+
+    http://docin.divoom-gz.com/web/#/5/25
+    """
+    result: dict[str, Any] = await async_post_cloud(session, DIVOOM_CLOUD_FIND_DEVICES)
+    return result.get(API_DEVICE_LIST) or []
+
+
+async def async_get_cloud_dial_types(session: ClientSession) -> list[str]:
+    """Get the clock face (dial) types using the online Divoom API.
+
+    http://docin.divoom-gz.com/web/#/5/27
+    """
+    result: dict[str, Any] = await async_post_cloud(session, DIVOOM_CLOUD_DIAL_TYPES)
+    dial_types: Any = result.get(API_DIAL_TYPE_LIST) or []
+    if not isinstance(dial_types, list):
+        raise DivoomPixooInvalidResponse(f"Invalid dial types: {dial_types}")
+    return [dial_type for dial_type in dial_types if isinstance(dial_type, str)]
+
+
+async def async_get_cloud_dial_list(
+    session: ClientSession, dial_type: str, page: int
+) -> tuple[int, list[dict[str, Any]]]:
+    """Get a page of clock faces (dials) of a type using the online Divoom API, and the total number of them.
+
+    http://docin.divoom-gz.com/web/#/5/28
+    """
+    result: dict[str, Any] = await async_post_cloud(
+        session, DIVOOM_CLOUD_DIAL_LIST, {"DialType": dial_type, "Page": page}
+    )
+    total: Any = result.get(API_TOTAL_NUM, 0)
+    dials: Any = result.get(API_DIAL_LIST) or []
+    if not isinstance(total, int) or not isinstance(dials, list):
+        raise DivoomPixooInvalidResponse(f"Invalid dial list page: {result}")
+    # Entries of a page are not validated, that is up to the caller
+    return total, dials
+
+
+class DivoomPixooApiClient:
+    """Divoom Pixoo API client for a single device."""
+
+    def __init__(
+        self, session: ClientSession, ip: str, request_timeout: float = REQUEST_TIMEOUT
+    ) -> None:
+        """Initialize the DivoomPixooApiClient class."""
+        self._session: ClientSession = session
+        self._request_timeout: float = request_timeout
+        self.url: str = f"http://{ip}/post"
+        self.metrics: DivoomPixooMetrics = DivoomPixooMetrics()
+        self.circuit_breaker: DivoomPixooCircuitBreaker = DivoomPixooCircuitBreaker()
+
+    async def async_send_command(
+        self, command: str, **parameters: Any
+    ) -> dict[str, Any]:
+        """Send a single command to the device, and return its response."""
+        return await self.async_post({API_COMMAND: command, **parameters})
+
+    async def async_send_command_list(
+        self, commands: list[dict[str, Any]]
+    ) -> dict[str, Any]:
+        """Send a list of commands to the device using a single request.
+
+        http://docin.divoom-gz.com/web/#/5/40
+        """
+        return await self.async_send_command(
+            "Draw/CommandList", **{API_COMMAND_LIST: commands}
+        )
+
+    def raise_if_unreachable(self) -> None:
+        """Fail fast when the device is known to be unreachable, without waiting for a timeout."""
+        if self.circuit_breaker.rejects_requests:
+            self.circuit_breaker.rejected += 1
+            raise DivoomPixooCircuitOpenError(
+                f"Device at {self.url} is unreachable, retrying later"
+            )
+
+    async def async_post(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Post a raw payload to the device, and return its response.
+
+        Read commands are retried once when the connection drops, as the device closes pooled keep-alive connections.
+        While the device is unreachable, requests fail fast, see DivoomPixooCircuitBreaker.
+        """
+        command: str = payload.get(API_COMMAND, "")
+        if not self.circuit_breaker.allow_request():
+            raise DivoomPixooCircuitOpenError(
+                f"Device at {self.url} is unreachable, not sending {command}"
+            )
+        if self.circuit_breaker.state is CircuitState.HALF_OPEN:
+            await self._async_probe()
+
+        data: bytes = json.dumps(payload).encode()
+        retries: int = REQUEST_RETRIES if "/Get" in command else 0
+        while True:
+            try:
+                result: dict[str, Any] = await self._async_post(command, data)
+            except DivoomPixooConnectionError as exception:
+                if retries <= 0 or isinstance(exception.__cause__, TimeoutError):
+                    self.circuit_breaker.record_failure()
+                    raise
+                retries -= 1
+                self.metrics.record_retry(command)
+                _LOGGER.debug("Retry %s to %s: %s", command, self.url, exception)
+            except DivoomPixooInvalidResponse:
+                # The device could be reached
+                self.circuit_breaker.record_success()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                return result
+
+    async def _async_probe(self) -> None:
+        """Probe whether an unreachable device is back, using a cheap request with a short timeout."""
+        _LOGGER.debug("Probe %s", self.url)
+        try:
+            await self._async_post(PROBE_COMMAND, PROBE_DATA, PROBE_TIMEOUT)
+        except DivoomPixooInvalidResponse:
+            pass
+        except (DivoomPixooConnectionError, asyncio.CancelledError):
+            self.circuit_breaker.record_failure()
+            raise
+        self.circuit_breaker.record_success()
+
+    async def _async_post(
+        self, command: str, data: bytes, request_timeout: float | None = None
+    ) -> dict[str, Any]:
+        """Post serialized data to the device once, record its metrics, and return the response."""
+        _LOGGER.debug("Post to %s: %s", self.url, command)
+        loop = asyncio.get_running_loop()
+        started: float = loop.time()
+        body: bytes = b""
+        try:
+            async with timeout(request_timeout or self._request_timeout):
+                async with self._session.post(
+                    self.url, data=data, headers=JSON_HEADERS
+                ) as response:
+                    body = await response.read()
+            # The device does not send a json content type
+            result: dict[str, Any] = json.loads(body)
+        except (TimeoutError, ClientError) as exception:
+            self.metrics.record(
+                command,
+                loop.time() - started,
+                len(data),
+                error=True,
+                timeout=isinstance(exception, TimeoutError),
+            )
+            raise DivoomPixooConnectionError(
+                f"Could not reach device at {self.url}"
+            ) from exception
+        except ValueError as exception:
+            self.metrics.record(
+                command, loop.time() - started, len(data), len(body), error=True
+            )
+            raise DivoomPixooInvalidResponse(
+                f"Invalid response from device at {self.url}"
+            ) from exception
+
+        failed: bool = (
+            not isinstance(result, dict) or result.get(API_ERROR_CODE, 0) != 0
+        )
+        self.metrics.record(
+            command, loop.time() - started, len(data), len(body), error=failed
+        )
+        if failed:
+            raise DivoomPixooInvalidResponse(
+                f"Device at {self.url} returned error for {command}: {result}"
+            )
+        return result
@@ -0,0 +1,233 @@
+"""Divoom Pixoo Catalog.
+
+Catalog of the clock faces a Divoom Pixoo can show, and the index over all its effects, shared by all our devices
+The catalog is seeded from the faces we know in pixoo_effects, persisted in a Store with a version stamp,
+and refreshed incrementally in the background from the online Divoom API.
+The local api does not list the faces, it only reports the id of the current one.
+
+Face ids that are not in the catalog (yet) never fail an update, they resolve to a placeholder name
+and request a background refresh, after which the real name is used.
+
+http://docin.divoom-gz.com/web/#/5/27
+http://docin.divoom-gz.com/web/#/5/28
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import datetime, timedelta
+import logging
+from typing import Any, Final
+
+from aiohttp import ClientSession
+from bidict import bidict
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.singleton import singleton
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import (
+    DivoomPixooApiError,
+    async_get_cloud_dial_list,
+    async_get_cloud_dial_types,
+)
+from .const import DOMAIN
+from .effects import EFFECT_CATEGORY_FACES, DivoomPixooEffect, DivoomPixooEffectIndex
+from .pixoo_effects import CHANNEL_INDEX_FACES_DICT
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_CATALOG: Final = f"{DOMAIN}_catalog"
+STORAGE_KEY: Final = f"{DOMAIN}.catalog"
+STORAGE_VERSION: Final = 1
+# The catalog is refreshed in the background this often
+CATALOG_REFRESH_INTERVAL: Final = timedelta(days=1)
+# Minimum time between two refreshes, i.e. when devices keep reporting unknown faces
+CATALOG_MIN_REFRESH_INTERVAL: Final = timedelta(minutes=15)
+
+# Keys from Divoom API
+# http://docin.divoom-gz.com/web/#/5/28
+API_CLOCK_ID: Final = "ClockId"
+API_NAME: Final = "Name"
+
+
+class DivoomPixooCatalog:
+    """Divoom Pixoo Catalog of clock faces, persisted in a Store."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the DivoomPixooCatalog class."""
+        self.hass: HomeAssistant = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self.faces: bidict[str, int] = bidict(CHANNEL_INDEX_FACES_DICT)
+        # Incremented on every change of the catalog, so consumers can cheaply detect it
+        self.version: int = 0
+        # Number of faces per dial type at the last refresh, unchanged dial types are not fetched again
+        self._dial_types: dict[str, int] = {}
+        self.updated: datetime | None = None
+        self._effect_index: DivoomPixooEffectIndex | None = None
+        self._refresh_task: asyncio.Task[None] | None = None
+        self._listeners: list[CALLBACK_TYPE] = []
+
+    @property
+    def effect_index(self) -> DivoomPixooEffectIndex:
+        """Return the index over all effects, built once per catalog version."""
+        if self._effect_index is None:
+            self._effect_index = DivoomPixooEffectIndex(self.faces)
+        return self._effect_index
+
+    @callback
+    def get_face_name(self, clock_id: int) -> str:
+        """Return the name of a face, or a placeholder for a face that is not in the catalog yet."""
+        if (name := self.faces.inverse.get(clock_id)) is not None:
+            return name
+        _LOGGER.debug("Unknown clock face %s, requesting catalog refresh", clock_id)
+        self.async_request_refresh()
+        return f"Clock {clock_id}"
+
+    @callback
+    def get_effect(self, name: str) -> DivoomPixooEffect | None:
+        """Return an effect by name, also accepting the placeholder names of unknown faces."""
+        if (effect := self.effect_index.get(name)) is not None:
+            return effect
+        prefix, _, clock_id = name.partition(" ")
+        if prefix == "Clock" and clock_id.isdigit():
+            return DivoomPixooEffect(name, EFFECT_CATEGORY_FACES, int(clock_id))
+        return None
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Listen for changes of the catalog, and return a function to stop listening."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Stop listening for changes of the catalog."""
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    def _add_face(self, clock_id: int, name: str) -> None:
+        """Add a face to the catalog.
+
+        Known faces keep their name, so effects used in automations stay valid.
+        """
+        if clock_id in self.faces.inverse:
+            return
+        if name in self.faces:
+            # Names are not unique across dial types
+            name = f"{name} ({clock_id})"
+        self.faces[name] = clock_id
+
+    async def async_load(self) -> None:
+        """Load the catalog from the store, on top of the faces we know."""
+        if (data := await self._store.async_load()) is None:
+            return
+        for clock_id, name in data["faces"].items():
+            self._add_face(int(clock_id), name)
+        self._dial_types = data["dial_types"]
+        self.version = data["version"]
+        self.updated = dt_util.parse_datetime(data["updated"])
+
+    async def _async_fetch_dial_type(
+        self, session: ClientSession, dial_type: str
+    ) -> None:
+        """Fetch the faces of a dial type page by page, unless its number of faces did not change."""
+        total, dials = await async_get_cloud_dial_list(session, dial_type, 1)
+        if total == self._dial_types.get(dial_type) or not dials:
+            return
+        page_size: int = len(dials)
+        page: int = 1
+        while True:
+            for dial in dials:
+                # Skip malformed entries of a page, instead of losing the rest of the refresh
+                if (
+                    not isinstance(dial, dict)
+                    or not isinstance(clock_id := dial.get(API_CLOCK_ID), int)
+                    or not isinstance(name := dial.get(API_NAME), str)
+                ):
+                    _LOGGER.debug("Skipping malformed clock face %s", dial)
+                    continue
+                self._add_face(clock_id, name)
+            if page * page_size >= total:
+                break
+            page += 1
+            _, dials = await async_get_cloud_dial_list(session, dial_type, page)
+            if not dials:
+                break
+        self._dial_types[dial_type] = total
+
+    async def async_refresh(self) -> None:
+        """Refresh the catalog incrementally, and save it."""
+        session: ClientSession = async_get_clientsession(self.hass)
+        known: int = len(self.faces)
+        try:
+            for dial_type in await async_get_cloud_dial_types(session):
+                await self._async_fetch_dial_type(session, dial_type)
+        except DivoomPixooApiError as exception:
+            # Keep what we have (including the dial types fetched so far), and try again on the next refresh
+            _LOGGER.debug("Could not refresh clock face catalog: %s", exception)
+        self.updated = dt_util.utcnow()
+
+        _LOGGER.debug(
+            "Refreshed clock face catalog, %s new faces", len(self.faces) - known
+        )
+        if len(self.faces) != known:
+            self.version += 1
+            self._effect_index = None
+            for update_callback in list(self._listeners):
+                update_callback()
+        await self._store.async_save(
+            {
+                "faces": {clock_id: name for name, clock_id in self.faces.items()},
+                "dial_types": self._dial_types,
+                "version": self.version,
+                "updated": self.updated.isoformat(),
+            }
+        )
+
+    @callback
+    def async_request_refresh(self) -> None:
+        """Refresh the catalog in the background, unless that is already happening or happened recently."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if (
+            self.updated is not None
+            and dt_util.utcnow() - self.updated < CATALOG_MIN_REFRESH_INTERVAL
+        ):
+            return
+        self._refresh_task = self.hass.async_create_background_task(
+            self.async_refresh(), name="divoom_pixoo_catalog_refresh"
+        )
+
+    @callback
+    def async_start(self) -> None:
+        """Start refreshing the catalog periodically, until Home Assistant stops."""
+        if (
+            self.updated is None
+            or dt_util.utcnow() - self.updated > CATALOG_REFRESH_INTERVAL
+        ):
+            self.async_request_refresh()
+        async_track_time_interval(
+            self.hass,
+            self._async_scheduled_refresh,
+            CATALOG_REFRESH_INTERVAL,
+            name="divoom_pixoo_catalog_refresh",
+            cancel_on_shutdown=True,
+        )
+
+    @callback
+    def _async_scheduled_refresh(self, now: datetime) -> None:
+        """Refresh the catalog periodically."""
+        self.async_request_refresh()
+
+
+@singleton(DATA_CATALOG)
+async def async_get_catalog(hass: HomeAssistant) -> DivoomPixooCatalog:
+    """Get the shared clock face catalog, loaded from its store."""
+    catalog: DivoomPixooCatalog = DivoomPixooCatalog(hass)
+    await catalog.async_load()
+    catalog.async_start()
+    return catalog
@@ -0,0 +1,102 @@
+"""Divoom Pixoo Circuit breaker.
+
+Fail fast for devices that can not be reached, instead of waiting for the request timeout on every call
+After a number of consecutive connection failures the circuit opens, and all requests fail immediately.
+Once the reset timeout has passed, a single cheap probe request is allowed through (half open),
+that closes the circuit when it succeeds, or opens it again with a doubled reset timeout.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from enum import StrEnum
+import logging
+import time
+from typing import Final
+
+_LOGGER = logging.getLogger(__name__)
+
+# Consecutive connection failures before the circuit opens
+CIRCUIT_FAILURE_THRESHOLD: Final = 3
+# Time before the first probe of an open circuit, doubled on every failed probe up to the maximum
+CIRCUIT_RESET_TIMEOUT: Final = 30.0
+CIRCUIT_MAX_RESET_TIMEOUT: Final = 300.0
+
+
+class CircuitState(StrEnum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class DivoomPixooCircuitBreaker:
+    """Divoom Pixoo Circuit breaker for a single device."""
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = CIRCUIT_RESET_TIMEOUT,
+        max_reset_timeout: float = CIRCUIT_MAX_RESET_TIMEOUT,
+    ) -> None:
+        """Initialize the DivoomPixooCircuitBreaker class."""
+        self._failure_threshold: int = failure_threshold
+        self._min_reset_timeout: float = reset_timeout
+        self._max_reset_timeout: float = max_reset_timeout
+        self._reset_timeout: float = reset_timeout
+        self._next_probe: float = 0.0
+        self.state: CircuitState = CircuitState.CLOSED
+        self.failures: int = 0
+        # Number of requests that failed fast, because the circuit was open
+        self.rejected: int = 0
+        # Called with the new state, whenever the circuit opens or closes
+        self.on_state_change: Callable[[CircuitState], None] | None = None
+
+    @property
+    def probe_due(self) -> bool:
+        """Return whether the circuit is open, and its reset timeout has passed."""
+        return self.state is CircuitState.OPEN and time.monotonic() >= self._next_probe
+
+    @property
+    def rejects_requests(self) -> bool:
+        """Return whether requests fail fast, i.e. the circuit is open without a probe due, or a probe is running."""
+        return self.state is not CircuitState.CLOSED and not self.probe_due
+
+    def allow_request(self) -> bool:
+        """Return whether a request may be sent, counting the rejected ones.
+
+        An open circuit allows a single probe once its reset timeout has passed, and is half open until it completes.
+        """
+        if self.rejects_requests:
+            self.rejected += 1
+            return False
+        if self.state is CircuitState.OPEN:
+            self.state = CircuitState.HALF_OPEN
+        return True
+
+    def record_success(self) -> None:
+        """Record a request that reached the device, closing the circuit."""
+        self.failures = 0
+        if self.state is CircuitState.CLOSED:
+            return
+        _LOGGER.debug("Circuit closed")
+        self._reset_timeout = self._min_reset_timeout
+        self._set_state(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        """Record a request that could not reach the device, opening the circuit after too many."""
+        self.failures += 1
+        if self.state is CircuitState.HALF_OPEN:
+            # The probe failed, wait longer for the next one
+            self._reset_timeout = min(self._reset_timeout * 2, self._max_reset_timeout)
+        elif self.state is CircuitState.OPEN or self.failures < self._failure_threshold:
+            return
+        _LOGGER.debug("Circuit open, next probe in %s seconds", self._reset_timeout)
+        self._next_probe = time.monotonic() + self._reset_timeout
+        self._set_state(CircuitState.OPEN)
+
+    def _set_state(self, state: CircuitState) -> None:
+        """Set the state, and report it."""
+        self.state = state
+        if self.on_state_change is not None:
+            self.on_state_change(state)
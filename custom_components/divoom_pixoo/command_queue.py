@@ -0,0 +1,246 @@
+"""Divoom Pixoo Command queue.
+
+The device firmware does not cope well with concurrent http requests, so all requests to a device go through its queue
+The queue sends one request at a time, waits a minimum interval between requests,
+and merges pending commands that would overwrite each other (i.e. only the last brightness survives, in the position of the last one)
+Consecutive commands are packed into Draw/CommandList requests, bounded by their number and their json size.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+import json
+import logging
+from typing import Any, Final
+
+from .api import API_COMMAND, DivoomPixooApiClient, DivoomPixooCircuitOpenError
+
+_LOGGER = logging.getLogger(__name__)
+
+# Commands that set a single device setting, where a newer pending value makes an older one redundant
+MERGEABLE_COMMANDS: Final = frozenset(
+    {
+        "Channel/SetClockSelectId",
+        "Channel/SetBrightness",
+        "Channel/OnOffScreen",
+        "Channel/SetIndex",
+        "Channel/SetEqPosition",
+        "Channel/SetCustomPageIndex",
+        "Channel/CloudIndex",
+        "Device/SetTime24Flag",
+        "Device/SetDisTempMode",
+        "Device/SetMirrorMode",
+        "Device/SetScreenRotationAngle",
+    }
+)
+
+# Maximum number of commands that are packed into a single Draw/CommandList request
+MAX_COMMANDS_PER_REQUEST: Final = 32
+# Maximum json size of a packed Draw/CommandList request, larger requests are not reliably accepted by the firmware
+# A single Draw/SendHttpGif frame is about 16 KiB, so frames are never packed together
+MAX_REQUEST_SIZE: Final = 24 * 1024
+# Maximum number of pending commands, before callers have to wait for the queue to drain
+MAX_PENDING_COMMANDS: Final = 256
+
+
+@dataclass
+class _PendingCommand:
+    """A command waiting in the queue, with the future of all callers waiting for it."""
+
+    payload: dict[str, Any]
+    future: asyncio.Future[dict[str, Any]]
+    # Reads need their own response, so they are never packed into a command list
+    batchable: bool = True
+    merge_key: Hashable = field(default_factory=object)
+
+    @property
+    def size(self) -> int:
+        """Return the json size of the payload, as it is sent."""
+        return len(json.dumps(self.payload))
+
+
+class DivoomPixooCommandQueue:
+    """Serialized, rate limited command queue for a single device."""
+
+    def __init__(
+        self,
+        client: DivoomPixooApiClient,
+        min_interval: float,
+        max_pending: int = MAX_PENDING_COMMANDS,
+    ) -> None:
+        """Initialize the DivoomPixooCommandQueue class."""
+        self._client: DivoomPixooApiClient = client
+        self.min_interval: float = min_interval
+        self._max_pending: int = max_pending
+
+        # Dicts keep insertion order, so this is our fifo, indexed by merge key
+        self._pending: dict[Hashable, _PendingCommand] = {}
+        self._pending_changed: asyncio.Condition = asyncio.Condition()
+        self._last_request_time: float = 0.0
+
+    @property
+    def pending(self) -> int:
+        """Return the number of commands waiting in the queue."""
+        return len(self._pending)
+
+    async def async_send(
+        self, commands: list[dict[str, Any]], merge: bool = True
+    ) -> list[dict[str, Any]]:
+        """Queue commands, wait until the device has accepted all of them, and return the response per command.
+
+        Commands queued together are sent together, using as few Draw/CommandList requests as possible.
+        Packed commands share the response of their request.
+        """
+        futures: list[asyncio.Future[dict[str, Any]]] = await self._async_enqueue(
+            self._create_pending_commands(commands, merge)
+        )
+        # Futures are shared with callers whose commands were merged, so don't cancel them for the others
+        return await asyncio.gather(*(asyncio.shield(future) for future in futures))
+
+    async def async_send_all(
+        self, commands: list[dict[str, Any]]
+    ) -> list[dict[str, Any] | Exception]:
+        """Queue commands in order without merging, and return the response or the error per command.
+
+        Commands that read from the device (Get commands) are sent on their own, so they return their actual response.
+        While the device is known to be unreachable, every command returns that error instead of raising it.
+        """
+        try:
+            futures: list[asyncio.Future[dict[str, Any]]] = await self._async_enqueue(
+                self._create_pending_commands(commands, merge=False)
+            )
+        except DivoomPixooCircuitOpenError as exception:
+            return [exception for _ in commands]
+        results: list[dict[str, Any] | Exception] = []
+        for result in await asyncio.gather(
+            *(asyncio.shield(future) for future in futures), return_exceptions=True
+        ):
+            # Commands are only cancelled when the queue stops, which cancels us just like async_send
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            results.append(result)
+        return results
+
+    @staticmethod
+    def _create_pending_commands(
+        commands: list[dict[str, Any]], merge: bool
+    ) -> list[_PendingCommand]:
+        """Create the pending commands to queue."""
+        loop = asyncio.get_running_loop()
+        return [
+            _PendingCommand(
+                payload=command,
+                future=loop.create_future(),
+                batchable="/Get" not in command[API_COMMAND],
+                merge_key=command[API_COMMAND]
+                if merge and command[API_COMMAND] in MERGEABLE_COMMANDS
+                else object(),
+            )
+            for command in commands
+        ]
+
+    async def async_request(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Queue a single request, and return the device response once it has been sent."""
+        futures: list[asyncio.Future[dict[str, Any]]] = await self._async_enqueue(
+            [
+                _PendingCommand(
+                    payload=payload,
+                    future=asyncio.get_running_loop().create_future(),
+                    batchable=False,
+                )
+            ]
+        )
+        return await asyncio.shield(futures[0])
+
+    async def _async_enqueue(
+        self, commands: list[_PendingCommand]
+    ) -> list[asyncio.Future[dict[str, Any]]]:
+        """Add commands to the queue, merging them with pending ones, and return the futures to wait for."""
+        # Don't queue (and wait for back-pressure) when the device is known to be unreachable
+        self._client.raise_if_unreachable()
+        futures: list[asyncio.Future[dict[str, Any]]] = []
+        async with self._pending_changed:
+            # Back-pressure: wait until there is room for all our commands
+            await self._pending_changed.wait_for(
+                lambda: len(self._pending) + len(commands) <= self._max_pending
+                or not self._pending
+            )
+            for command in commands:
+                if (pending := self._pending.pop(command.merge_key, None)) is not None:
+                    # Last write wins, also for the order: the merged command moves to the end of the queue
+                    _LOGGER.debug("Merge pending command %s", command.payload)
+                    pending.payload = command.payload
+                    self._pending[command.merge_key] = pending
+                    futures.append(pending.future)
+                    continue
+                self._pending[command.merge_key] = command
+                futures.append(command.future)
+            self._pending_changed.notify_all()
+        return futures
+
+    def _pop_next_request(self) -> list[_PendingCommand]:
+        """Take the commands for the next request from the queue.
+
+        This is either a single non batchable request, or a run of batchable commands that fits in a single request.
+        """
+        commands: list[_PendingCommand] = []
+        size: int = 0
+        for merge_key, command in list(self._pending.items()):
+            if not command.batchable:
+                if not commands:
+                    commands.append(self._pending.pop(merge_key))
+                break
+            size += command.size
+            if commands and (
+                len(commands) >= MAX_COMMANDS_PER_REQUEST or size > MAX_REQUEST_SIZE
+            ):
+                break
+            commands.append(self._pending.pop(merge_key))
+        return commands
+
+    async def async_run(self) -> None:
+        """Send the queued commands to the device, one request at a time, until cancelled."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                async with self._pending_changed:
+                    await self._pending_changed.wait_for(lambda: bool(self._pending))
+
+                # Rate limit, pending commands keep merging while we wait
+                if (
+                    delay := self._last_request_time + self.min_interval - loop.time()
+                ) > 0:
+                    await asyncio.sleep(delay)
+
+                async with self._pending_changed:
+                    commands: list[_PendingCommand] = self._pop_next_request()
+                    self._pending_changed.notify_all()
+
+                try:
+                    if len(commands) == 1:
+                        result: dict[str, Any] = await self._client.async_post(
+                            commands[0].payload
+                        )
+                    else:
+                        result = await self._client.async_send_command_list(
+                            [command.payload for command in commands]
+                        )
+                except asyncio.CancelledError:
+                    for command in commands:
+                        command.future.cancel()
+                    raise
+                except Exception as exception:  # noqa: BLE001
+                    for command in commands:
+                        if not command.future.done():
+                            command.future.set_exception(exception)
+                else:
+                    for command in commands:
+                        if not command.future.done():
+                            command.future.set_result(result)
+                finally:
+                    self._last_request_time = loop.time()
+        finally:
+            for command in self._pending.values():
+                command.future.cancel()
+            self._pending.clear()
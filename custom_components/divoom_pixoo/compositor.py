@@ -0,0 +1,170 @@
+"""Divoom Pixoo Compositor.
+
+Composes the frame that is streamed to a device, from the framebuffer as its base layer and named widget layers on top
+Every widget owns a rectangle of the frame, and only the rectangles of widgets that actually changed are composed again,
+so a dashboard with a static background and a few live widgets does not re-render the full frame on every change.
+The composed frame is encoded once per flush by the frame streamer, no matter how many widgets changed.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import logging
+
+import numpy as np
+
+from .framebuffer import DivoomPixooFramebuffer
+
+_LOGGER = logging.getLogger(__name__)
+
+# x0, y0, x1, y1 of a rectangle, exclusive of x1 and y1
+Rect = tuple[int, int, int, int]
+
+
+@dataclass
+class DivoomPixooLayer:
+    """Divoom Pixoo widget Layer, that owns a rectangle of the frame."""
+
+    name: str
+    x: int
+    y: int
+    # height x width x 3 uint8
+    pixels: np.ndarray
+    # height x width boolean mask of the opaque pixels, fully opaque when None
+    mask: np.ndarray | None = None
+
+    @property
+    def rect(self) -> Rect:
+        """Return the rectangle of the layer."""
+        height, width = self.pixels.shape[:2]
+        return (self.x, self.y, self.x + width, self.y + height)
+
+    def same_as(self, other: DivoomPixooLayer) -> bool:
+        """Return whether another layer looks exactly the same."""
+        return (
+            self.rect == other.rect
+            and np.array_equal(self.pixels, other.pixels)
+            and (
+                self.mask is other.mask
+                or (
+                    self.mask is not None
+                    and other.mask is not None
+                    and np.array_equal(self.mask, other.mask)
+                )
+            )
+        )
+
+
+@dataclass
+class DivoomPixooCompositorStats:
+    """Divoom Pixoo Compositor counters."""
+
+    # Times the frame was composed
+    compositions: int = 0
+    # Pixels composed, i.e. the area of all dirty rectangles
+    pixels_composed: int = 0
+    # Widget updates that did not change anything
+    unchanged: int = 0
+
+
+class DivoomPixooCompositor:
+    """Divoom Pixoo Compositor, of the framebuffer and widget layers of a device."""
+
+    def __init__(self, framebuffer: DivoomPixooFramebuffer) -> None:
+        """Initialize the DivoomPixooCompositor class."""
+        self.framebuffer: DivoomPixooFramebuffer = framebuffer
+        self.size: int = framebuffer.size
+        # The composed frame
+        self.pixels: np.ndarray = framebuffer.pixels.copy()
+        # Widget layers by name, in the order they are drawn
+        self.layers: dict[str, DivoomPixooLayer] = {}
+        self._dirty: list[Rect] = []
+        # Version of the framebuffer in the composed frame, any change to the base layer recomposes the whole frame
+        self._base_version: int = framebuffer.version
+        self.stats: DivoomPixooCompositorStats = DivoomPixooCompositorStats()
+
+    def _mark_dirty(self, rect: Rect) -> None:
+        """Mark a rectangle to be composed again, merged with the dirty rectangles it overlaps."""
+        x0, y0, x1, y1 = (
+            max(rect[0], 0),
+            max(rect[1], 0),
+            min(rect[2], self.size),
+            min(rect[3], self.size),
+        )
+        if x0 >= x1 or y0 >= y1:
+            return
+        # Merge until no dirty rectangle overlaps the new one, so no pixel is composed twice
+        merged: bool = True
+        while merged:
+            merged = False
+            for dirty in self._dirty:
+                if x0 < dirty[2] and dirty[0] < x1 and y0 < dirty[3] and dirty[1] < y1:
+                    self._dirty.remove(dirty)
+                    x0, y0 = min(x0, dirty[0]), min(y0, dirty[1])
+                    x1, y1 = max(x1, dirty[2]), max(y1, dirty[3])
+                    merged = True
+                    break
+        self._dirty.append((x0, y0, x1, y1))
+
+    def set_layer(
+        self,
+        name: str,
+        pixels: np.ndarray,
+        x: int = 0,
+        y: int = 0,
+        mask: np.ndarray | None = None,
+    ) -> bool:
+        """Add or replace a widget layer, and return whether the frame changed."""
+        layer: DivoomPixooLayer = DivoomPixooLayer(name, x, y, pixels, mask)
+        if (previous := self.layers.get(name)) is not None:
+            if previous.same_as(layer):
+                self.stats.unchanged += 1
+                return False
+            self._mark_dirty(previous.rect)
+        self.layers[name] = layer
+        self._mark_dirty(layer.rect)
+        return True
+
+    def remove_layer(self, name: str) -> bool:
+        """Remove a widget layer, and return whether it existed."""
+        if (layer := self.layers.pop(name, None)) is None:
+            return False
+        self._mark_dirty(layer.rect)
+        return True
+
+    def clear_layers(self) -> None:
+        """Remove all widget layers."""
+        for name in list(self.layers):
+            self.remove_layer(name)
+
+    def compose(self) -> bool:
+        """Compose the dirty rectangles of the frame, and return whether anything was composed."""
+        if self.framebuffer.version != self._base_version:
+            self._base_version = self.framebuffer.version
+            self._dirty = [(0, 0, self.size, self.size)]
+        if not self._dirty:
+            return False
+
+        for x0, y0, x1, y1 in self._dirty:
+            self.pixels[y0:y1, x0:x1] = self.framebuffer.pixels[y0:y1, x0:x1]
+            for layer in self.layers.values():
+                lx0, ly0, lx1, ly1 = layer.rect
+                cx0, cy0 = max(x0, lx0), max(y0, ly0)
+                cx1, cy1 = min(x1, lx1), min(y1, ly1)
+                if cx0 >= cx1 or cy0 >= cy1:
+                    continue
+                source: np.ndarray = layer.pixels[
+                    cy0 - ly0 : cy1 - ly0, cx0 - lx0 : cx1 - lx0
+                ]
+                if layer.mask is None:
+                    self.pixels[cy0:cy1, cx0:cx1] = source
+                else:
+                    mask: np.ndarray = layer.mask[
+                        cy0 - ly0 : cy1 - ly0, cx0 - lx0 : cx1 - lx0
+                    ]
+                    self.pixels[cy0:cy1, cx0:cx1][mask] = source[mask]
+            self.stats.pixels_composed += (x1 - x0) * (y1 - y0)
+
+        _LOGGER.debug("Composed %s dirty rectangles", len(self._dirty))
+        self._dirty.clear()
+        self.stats.compositions += 1
+        return True
@@ -6,17 +6,44 @@ from typing import Any
 
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigFlow,
+    OptionsFlow,
+    OptionsFlowWithConfigEntry,
+)
 from homeassistant.const import CONF_DEVICE
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
+from homeassistant.helpers.device_registry import format_mac
 from homeassistant.helpers.selector import (
+    NumberSelector,
+    NumberSelectorConfig,
+    NumberSelectorMode,
     SelectOptionDict,
     SelectSelector,
     SelectSelectorConfig,
 )
 
-from .const import DIVOOM_PIXOO_CONFIG, DOMAIN
-from .coordinator import DivoomPixooConfig, DivoomPixooDataUpdateCoordinator
+from .const import (
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_COMMAND_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_STREAM_FPS,
+    CONF_SUBNET,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_COMMAND_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_STREAM_FPS,
+    DIVOOM_PIXOO_CONFIG,
+    DOMAIN,
+)
+from .coordinator import DivoomPixooConfig
+from .discovery import (
+    DivoomPixooDiscoveryCache,
+    async_get_discovery_cache,
+    parse_subnet,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,19 +57,56 @@ class DivoomPixooConfigFlow(ConfigFlow, domain=DOMAIN):
         """Initialize the DivoomPixooConfigFlow class."""
         self._discovered_devices: dict[str, DivoomPixooConfig] | None = None
 
+    async def async_step_subnet(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """When no devices were found automatically, scan a subnet given by the user."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            try:
+                parse_subnet(user_input[CONF_SUBNET])
+            except ValueError:
+                errors[CONF_SUBNET] = "invalid_subnet"
+            else:
+                discovery_cache: DivoomPixooDiscoveryCache = (
+                    await async_get_discovery_cache(self.hass)
+                )
+                self._discovered_devices = await discovery_cache.async_refresh(
+                    subnet=user_input[CONF_SUBNET]
+                )
+                if len(self._discovered_devices) <= 0:
+                    return self.async_abort(reason="no_devices_found")
+                return await self.async_step_user()
+
+        return self.async_show_form(
+            step_id="subnet",
+            data_schema=vol.Schema({vol.Required(CONF_SUBNET): str}),
+            errors=errors,
+        )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return DivoomPixooOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """When a user add a new device via the user interface. (i.e. adds this integration the first time, or adds a new device to it)."""
         errors: dict[str, str] = {}
-        # Query the Divoom API to find the local devices
+        # Show the cached devices immediately, only scan the local networks when we have none yet
         if self._discovered_devices is None:
             try:
-                self._discovered_devices: dict[
-                    str, DivoomPixooConfig
-                ] = await DivoomPixooDataUpdateCoordinator.async_discover_divoom_devices(
-                    hass=self.hass
+                discovery_cache: DivoomPixooDiscoveryCache = (
+                    await async_get_discovery_cache(self.hass)
                 )
+                if discovery_cache.devices:
+                    self._discovered_devices = discovery_cache.devices
+                    if discovery_cache.is_stale:
+                        discovery_cache.async_request_refresh()
+                else:
+                    self._discovered_devices = await discovery_cache.async_refresh()
             except Exception as exception:
                 _LOGGER.exception("Unknown exception %s", exception)
                 return self.async_abort(reason="unknown")
@@ -50,14 +114,15 @@ class DivoomPixooConfigFlow(ConfigFlow, domain=DOMAIN):
         # Show possible devices to the user
         if user_input is None:
             if len(self._discovered_devices) <= 0:
-                return self.async_abort(reason="no_devices_found")
+                # Let the user point us to the subnet of the devices instead
+                return await self.async_step_subnet()
 
             devices_as_options: list[SelectOptionDict] = [
                 SelectOptionDict(
                     value=device_id,
                     label=f"{device.name} ({device.id}), IP: {device.ip}, MAC: {device.mac}",
                 )
-                for device_id, device in self._discovered_devices.values()
+                for device_id, device in self._discovered_devices.items()
             ]
             return self.async_show_form(
                 step_id="user",
@@ -75,7 +140,14 @@ class DivoomPixooConfigFlow(ConfigFlow, domain=DOMAIN):
         device_id: str = user_input[CONF_DEVICE]
         divoom_pixoo_config: DivoomPixooConfig = self._discovered_devices[device_id]
 
-        # Ensure we don't add duplicates
+        # Ensure we don't add duplicates, also when the device was added before under another id (i.e. its mac address)
+        if (mac := divoom_pixoo_config.mac) is not None and any(
+            entry.unique_id != device_id
+            and (entry_mac := entry.data[DIVOOM_PIXOO_CONFIG].get("mac")) is not None
+            and format_mac(entry_mac) == format_mac(mac)
+            for entry in self._async_current_entries(include_ignore=False)
+        ):
+            return self.async_abort(reason="already_configured")
         await self.async_set_unique_id(device_id)
         # Update device data, in case it has changed (i.e. the name or ip address has changed, and we reconfigured it)
         self._abort_if_unique_id_configured(
@@ -89,3 +161,81 @@ class DivoomPixooConfigFlow(ConfigFlow, domain=DOMAIN):
             description=f"ID: {divoom_pixoo_config.id}, MAC: {divoom_pixoo_config.mac}, IP: {divoom_pixoo_config.ip}",
             data={DIVOOM_PIXOO_CONFIG: vars(divoom_pixoo_config)},
         )
+
+
+class DivoomPixooOptionsFlow(OptionsFlowWithConfigEntry):
+    """Divoom Pixoo Options flow."""
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options of a device."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            if user_input[CONF_MIN_POLL_INTERVAL] > user_input[CONF_MAX_POLL_INTERVAL]:
+                errors[CONF_MAX_POLL_INTERVAL] = "invalid_poll_interval"
+            else:
+                return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            errors=errors,
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_MIN_COMMAND_INTERVAL,
+                        default=self.options.get(
+                            CONF_MIN_COMMAND_INTERVAL, DEFAULT_MIN_COMMAND_INTERVAL
+                        ),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=0,
+                            max=5,
+                            step=0.05,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_STREAM_FPS,
+                        default=self.options.get(CONF_STREAM_FPS, DEFAULT_STREAM_FPS),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=1,
+                            max=30,
+                            step=1,
+                            unit_of_measurement="fps",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_MIN_POLL_INTERVAL,
+                        default=self.options.get(
+                            CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL
+                        ),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=1,
+                            max=3600,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_MAX_POLL_INTERVAL,
+                        default=self.options.get(
+                            CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL
+                        ),
+                    ): NumberSelector(
+                        NumberSelectorConfig(
+                            min=1,
+                            max=3600,
+                            step=1,
+                            unit_of_measurement="s",
+                            mode=NumberSelectorMode.BOX,
+                        )
+                    ),
+                }
+            ),
+        )
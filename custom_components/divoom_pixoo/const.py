@@ -6,3 +6,17 @@ DOMAIN: Final = "divoom_pixoo"
 
 # CONFIG ENTRY KEYS
 DIVOOM_PIXOO_CONFIG: Final = "divoom_pixoo_config"
+
+# CONFIG FLOW KEYS
+CONF_SUBNET: Final = "subnet"
+
+# CONFIG ENTRY OPTIONS
+CONF_MIN_COMMAND_INTERVAL: Final = "min_command_interval"
+CONF_STREAM_FPS: Final = "stream_fps"
+CONF_MIN_POLL_INTERVAL: Final = "min_poll_interval"
+CONF_MAX_POLL_INTERVAL: Final = "max_poll_interval"
+
+DEFAULT_MIN_COMMAND_INTERVAL: Final = 0.2
+DEFAULT_STREAM_FPS: Final = 5
+DEFAULT_MIN_POLL_INTERVAL: Final = 10
+DEFAULT_MAX_POLL_INTERVAL: Final = 600
@@ -1,35 +1,101 @@
 """Divoom Pixoo Coordinator."""
+from __future__ import annotations
+
+import asyncio
 from asyncio import timeout
-from dataclasses import dataclass
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field, fields, replace
 from datetime import timedelta
 import logging
 from typing import Any, Final
 
-from bidict import frozenbidict
-from pixoo import Pixoo, find_device
-from pixoo.config import PixooConfig
-from pixoo.exceptions import InvalidApiResponse, NoPixooDevicesFound
-
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
-
-from .pixoo_effects import CHANNEL_INDEX_FACES_DICT
-
-SCAN_INTERVAL = timedelta(seconds=60)
+from homeassistant.util import dt as dt_util
+
+from .api import (
+    API_COMMAND,
+    DivoomPixooApiClient,
+    DivoomPixooApiError,
+    DivoomPixooCircuitOpenError,
+)
+from .catalog import DivoomPixooCatalog
+from .circuit_breaker import CircuitState
+from .command_queue import DivoomPixooCommandQueue
+from .compositor import DivoomPixooCompositor
+from .const import (
+    CONF_MAX_POLL_INTERVAL,
+    CONF_MIN_COMMAND_INTERVAL,
+    CONF_MIN_POLL_INTERVAL,
+    CONF_STREAM_FPS,
+    DEFAULT_MAX_POLL_INTERVAL,
+    DEFAULT_MIN_COMMAND_INTERVAL,
+    DEFAULT_MIN_POLL_INTERVAL,
+    DEFAULT_STREAM_FPS,
+    DOMAIN,
+)
+from .effects import (
+    EFFECT_CATEGORY_CHANNEL,
+    EFFECT_CATEGORY_CLOUD,
+    EFFECT_CATEGORY_CUSTOM,
+    EFFECT_CATEGORY_FACES,
+    EFFECT_CATEGORY_VISUALIZER,
+    DivoomPixooEffect,
+)
+from .framebuffer import DivoomPixooFramebuffer
+from .playlist import DivoomPixooPlaylistItem, playlist_animation
+from .streamer import DivoomPixooFrameStreamer
+
+# Poll at the minimum interval for this long after a local command or a detected external change
+FAST_POLL_WINDOW = timedelta(seconds=60)
+# Delay before reconciling optimistic state with the device, so a burst of commands only causes a single refresh
+REQUEST_REFRESH_DELAY = 3
+
+# Minimum time between the brightness steps of a transition, the command queue may space them further apart
+TRANSITION_STEP_INTERVAL: Final = 0.1
+
+# Command that polls the device state
+POLL_COMMAND: Final = "Channel/GetAllConf"
+# Commands that poll the rest of the device state, only folded into a poll when they are needed
+CHANNEL_COMMAND: Final = "Channel/GetIndex"
+DEVICE_TIME_COMMAND: Final = "Device/GetDeviceTime"
+# The device clock hardly drifts, so its time is only polled this often
+DEVICE_TIME_POLL_INTERVAL: Final = timedelta(hours=1)
+# The measured drift jitters with the request latency, so it is only updated when it moved more than this many seconds
+CLOCK_DRIFT_TOLERANCE: Final = 2
+# Outside the fast poll window, the channel is only polled this often
+CHANNEL_POLL_INTERVAL: Final = timedelta(minutes=5)
+
+# The last known data of every device is persisted, so its entities have a state right away at the next startup
+SNAPSHOT_STORAGE_VERSION: Final = 1
+# Delay before saving a changed snapshot, so a burst of changes is written once
+SNAPSHOT_SAVE_DELAY: Final = 10
+
+# Command, and its parameter, that selects an effect of a category other than the faces
+# http://docin.divoom-gz.com/web/#/5/24
+EFFECT_COMMANDS: Final = {
+    EFFECT_CATEGORY_CLOUD: ("Channel/CloudIndex", "Index"),
+    EFFECT_CATEGORY_VISUALIZER: ("Channel/SetEqPosition", "EqPosition"),
+    EFFECT_CATEGORY_CUSTOM: ("Channel/SetCustomPageIndex", "CustomPageIndex"),
+    EFFECT_CATEGORY_CHANNEL: ("Channel/SetIndex", "SelectIndex"),
+}
+# Channel the device switches to, when an effect of a category is selected
+EFFECT_CHANNELS: Final = {
+    EFFECT_CATEGORY_FACES: 0,
+    EFFECT_CATEGORY_CLOUD: 1,
+    EFFECT_CATEGORY_VISUALIZER: 2,
+    EFFECT_CATEGORY_CUSTOM: 3,
+}
 
 _LOGGER = logging.getLogger(__name__)
 
 
-# Keys from Divoom API
-# http://docin.divoom-gz.com/web/#/5/25
-API_DEVICE_ID: Final = "DeviceId"
-API_DEVICE_MAC: Final = "DeviceMac"
-API_DEVICE_NAME: Final = "DeviceName"
-API_DEVICE_IP: Final = "DevicePrivateIP"
-API_DEVICE_HARDWARE: Final = "Hardware"
-
-
 @dataclass
 class DivoomPixooConfig:
     """Divoom Pixoo Config."""
@@ -41,14 +107,12 @@ class DivoomPixooConfig:
     hardware: int | None = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DivoomPixooData:
-    """Divoom Pixoo Data."""
+    """Divoom Pixoo Data, compared field by field to notify only the entities whose fields changed."""
 
     screen_state: int | None = None
     screen_brightness: str | None = None
-    screen_effect: str | None = None
-    screen_effect_list: list[str] | None = None
     # rotation: int | None = None
     # clock_duration: int | None = None
     # gallery_duration: int | None = None
@@ -60,100 +124,191 @@ class DivoomPixooData:
     temperature_mode: int | None = None
     rotation_mode: int | None = None
     mirror_mode: int | None = None
+    # Channel/GetIndex: faces, cloud, visualizer, custom or black
+    channel_index: int | None = None
+    # Id of the effect we selected within the channel (cloud, visualizer or custom), the device can not report it
+    channel_effect_id: int | None = None
+    # Device/GetDeviceTime: seconds the device clock is ahead of ours
+    clock_drift: int | None = None
+
+    def changed_fields(self, other: DivoomPixooData) -> frozenset[str]:
+        """Return the names of the fields that differ from other data."""
+        return frozenset(
+            name for name in DATA_FIELDS if getattr(self, name) != getattr(other, name)
+        )
 
 
-class DivoomPixooDataUpdateCoordinator(DataUpdateCoordinator[DivoomPixooData]):
-    """Divoom Pixoo Coordinator."""
+DATA_FIELDS: Final = tuple(data_field.name for data_field in fields(DivoomPixooData))
 
-    @classmethod
-    async def async_discover_divoom_devices(
-        cls, hass: HomeAssistant
-    ) -> dict[str, DivoomPixooConfig]:
-        """Discover all devices using the online Pixoo API.
 
-        http://docin.divoom-gz.com/web/#/5/25
+def _snapshot_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the data snapshot of a config entry."""
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.{entry_id}.snapshot")
 
-        NOTE: This is the only way to get the divoom pixoo config data for a device !
-        Did a feature request to Divoom for a local api call to get this information, but until then we need this external request.
-        """
-        try:
-            device_list: list[dict[str, Any]] = await hass.async_add_executor_job(
-                find_device.get_pixoo_devices
-            )
-            devices: dict[str, DivoomPixooConfig] = {
-                str(device[API_DEVICE_ID]): DivoomPixooConfig(
-                    id=str(device[API_DEVICE_ID]),
-                    mac=str(device[API_DEVICE_MAC]),
-                    name=str(device[API_DEVICE_NAME]),
-                    ip=str(device[API_DEVICE_IP]),
-                    hardware=str(device[API_DEVICE_HARDWARE]),
-                )
-                for device in device_list
-            }
-            return devices
-        except NoPixooDevicesFound:
-            _LOGGER.warning("No Divoom Pixoo devices found")
-            return {}
-        except Exception as exception:
-            _LOGGER.exception("Unknown exception %s", exception)
-            raise Exception from exception
+
+async def async_remove_snapshot(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the data snapshot of a config entry, i.e. when it is removed."""
+    await _snapshot_store(hass, entry_id).async_remove()
+
+
+@dataclass
+class _DivoomPixooCommandBatch:
+    """Commands, and the optimistic data changes they cause, collected by an active batch."""
+
+    commands: list[dict[str, Any]] = field(default_factory=list)
+    data_changes: dict[str, Any] = field(default_factory=dict)
+
+
+# Active batches by coordinator, scoped to the current task (i.e. a single service call)
+# A single context variable for all coordinators, as context variables are never garbage collected
+_COMMAND_BATCHES: ContextVar[
+    dict[DivoomPixooDataUpdateCoordinator, _DivoomPixooCommandBatch] | None
+] = ContextVar("divoom_pixoo_command_batches", default=None)
+
+
+class DivoomPixooDataUpdateCoordinator(DataUpdateCoordinator[DivoomPixooData]):
+    """Divoom Pixoo Coordinator."""
 
     def __init__(
-        self, hass: HomeAssistant, divoom_pixoo_config: DivoomPixooConfig
+        self,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+        divoom_pixoo_config: DivoomPixooConfig,
+        catalog: DivoomPixooCatalog,
     ) -> None:
         """Initialize the DivoomPixooDataUpdateCoordinator class."""
+        # Adaptive polling: fast after changes, backing off exponentially while nothing changes
+        self.min_update_interval: timedelta = timedelta(
+            seconds=config_entry.options.get(
+                CONF_MIN_POLL_INTERVAL, DEFAULT_MIN_POLL_INTERVAL
+            )
+        )
+        self.max_update_interval: timedelta = timedelta(
+            seconds=config_entry.options.get(
+                CONF_MAX_POLL_INTERVAL, DEFAULT_MAX_POLL_INTERVAL
+            )
+        )
+        self._fast_poll_until: float = 0.0
+
         super().__init__(
             hass,
             _LOGGER,
             # Name of the data. For logging purposes.
             name=divoom_pixoo_config.name,
             # Polling interval. Will only be polled if there are subscribers.
-            update_interval=SCAN_INTERVAL,
+            # Adapted after every update, see _async_adapt_update_interval
+            update_interval=self.min_update_interval,
+            # Refreshes requested after commands are debounced into a single one
+            request_refresh_debouncer=Debouncer(
+                hass, _LOGGER, cooldown=REQUEST_REFRESH_DELAY, immediate=False
+            ),
         )
         _LOGGER.debug("Creating coordinator: %s", divoom_pixoo_config)
+        # Not only during setup, background tasks of this device are created on it later on
+        self.config_entry = config_entry
         self.divoom_pixoo_config: DivoomPixooConfig = divoom_pixoo_config
-        self.pixoo: Pixoo = None
+        # The shared HA session keeps a pooled keep-alive connection per device
+        self.client: DivoomPixooApiClient = DivoomPixooApiClient(
+            session=async_get_clientsession(hass), ip=divoom_pixoo_config.ip
+        )
+        self.client.circuit_breaker.on_state_change = self._async_circuit_state_changed
+        # All requests to the device are serialized and rate limited by the command queue
+        self.command_queue: DivoomPixooCommandQueue = DivoomPixooCommandQueue(
+            client=self.client,
+            min_interval=config_entry.options.get(
+                CONF_MIN_COMMAND_INTERVAL, DEFAULT_MIN_COMMAND_INTERVAL
+            ),
+        )
+        config_entry.async_create_background_task(
+            hass,
+            self.command_queue.async_run(),
+            name=f"divoom_pixoo_command_queue_{divoom_pixoo_config.id}",
+        )
+        # Local framebuffer that our draw services render into, the base layer below the widgets
+        self.framebuffer: DivoomPixooFramebuffer = DivoomPixooFramebuffer()
+        self.compositor: DivoomPixooCompositor = DivoomPixooCompositor(self.framebuffer)
+        self.frame_streamer: DivoomPixooFrameStreamer = DivoomPixooFrameStreamer(
+            command_queue=self.command_queue,
+            compositor=self.compositor,
+            fps=config_entry.options.get(CONF_STREAM_FPS, DEFAULT_STREAM_FPS),
+        )
+        config_entry.async_create_background_task(
+            hass,
+            self.frame_streamer.async_run(),
+            name=f"divoom_pixoo_frame_streamer_{divoom_pixoo_config.id}",
+        )
 
-        self.screen_effect_dict: frozenbidict[str, int] = CHANNEL_INDEX_FACES_DICT
-        self.screen_effect_list: list[str] = list(CHANNEL_INDEX_FACES_DICT)
+        # Last known data, restored at setup before the device has been reached
+        self._snapshot_store: Store[dict[str, Any]] = _snapshot_store(
+            hass, config_entry.entry_id
+        )
 
-    def init_pixoo(self) -> None:
-        """Init Divoom Pixoo API client library."""
-        self.pixoo: Pixoo = Pixoo(
-            pixoo_config=PixooConfig(address=self.divoom_pixoo_config.ip)
+        # Clock face names are resolved using the catalog shared by all devices
+        self.catalog: DivoomPixooCatalog = catalog
+        # Faces that were unknown get their real name once the catalog has been refreshed
+        config_entry.async_on_unload(
+            catalog.async_add_listener(self._async_catalog_changed)
         )
 
+        # Brightness transition in progress, cancelled by any other command
+        self._transition: asyncio.Task[None] | None = None
+
+        # The channel and device time are due at the first poll
+        self._channel_due: float = 0.0
+        self._device_time_due: float = 0.0
+
+        # Data and availability our listeners were last notified of
+        self._notified_data: DivoomPixooData | None = None
+        self._notified_update_success: bool = True
+        # Our own registry of the listeners and their data fields, for the filtered notifications
+        self._field_listeners: dict[
+            object, tuple[CALLBACK_TYPE, frozenset[str] | None]
+        ] = {}
+
     async def _async_update_data(self) -> DivoomPixooData:
         """Update Divoom Pixoo data using API client."""
         _LOGGER.debug("Updating divoom device: %s", self.divoom_pixoo_config)
 
-        # This is the place to pre-process the data to lookup tables so entities can quickly look up their data.
+        # Reads can not be packed into a command list, as that only returns a single response for all its commands
+        # So every read is a request of its own, and the others are only folded in when they are needed
+        now: float = self.hass.loop.time()
+        commands: list[dict[str, Any]] = [{API_COMMAND: POLL_COMMAND}]
+        if poll_channel := self._is_channel_due(now):
+            commands.append({API_COMMAND: CHANNEL_COMMAND})
+        if poll_device_time := now >= self._device_time_due:
+            commands.append({API_COMMAND: DEVICE_TIME_COMMAND})
         try:
             # Note: asyncio.TimeoutError and aiohttp.ClientError are already handled by the data update coordinator.
             async with timeout(10):
-                # Init pixoo
-                if self.pixoo is None:
-                    await self.hass.async_add_executor_job(self.init_pixoo)
-
-                # Grab active context variables to limit data required to be fetched from API
-                # Note: using context is not required if there is no need or ability to limit data retrieved from API.
-                # listening_idx = set(self.async_contexts())
-
-                result: dict[str, Any] = await self.hass.async_add_executor_job(
-                    self.pixoo.get_settings
-                )
-
-        except ConfigEntryNotReady as exception:
-            raise UpdateFailed from exception
-        except InvalidApiResponse as exception:
+                results: list[
+                    dict[str, Any] | Exception
+                ] = await self.command_queue.async_send_all(commands)
+        except DivoomPixooApiError as exception:
             raise UpdateFailed from exception
 
-        # Convert CurClockId into 'effect' name, from mapping dict if it is in there, otherwise generate
+        # Only the settings are required, the rest keeps its last known value when it could not be read
+        result: dict[str, Any] | Exception = results[0]
+        if isinstance(result, Exception):
+            raise UpdateFailed from result
+        previous: DivoomPixooData = self.data or DivoomPixooData()
+        channel_index: int | None = previous.channel_index
+        if poll_channel and isinstance(channel := results[1], dict):
+            channel_index = channel["SelectIndex"]
+            self._channel_due = now + CHANNEL_POLL_INTERVAL.total_seconds()
+        clock_drift: int | None = previous.clock_drift
+        if poll_device_time and isinstance(device_time := results[-1], dict):
+            drift: int = round(device_time["UTCTime"] - dt_util.utcnow().timestamp())
+            if clock_drift is None or abs(drift - clock_drift) > CLOCK_DRIFT_TOLERANCE:
+                clock_drift = drift
+            self._device_time_due = now + DEVICE_TIME_POLL_INTERVAL.total_seconds()
+
         divoom_pixoo_data: DivoomPixooData = DivoomPixooData(
             screen_state=result["LightSwitch"],
-            screen_brightness=result["Brightness"],
-            # cur_clock_id=result["CurClockId"],
-            screen_effect=self.screen_effect_dict.inverse[result["CurClockId"]],
+            # The brightness of a transition in progress is still on its way to the target brightness we wrote through
+            screen_brightness=previous.screen_brightness
+            if self.transition_in_progress
+            else result["Brightness"],
+            cur_clock_id=result["CurClockId"],
             # power_on_channel_id=result["PowerOnChannelId"],
             # rotation=result["RotationFlag"],
             # clock_duration=result["ClockTime"],
@@ -164,11 +319,199 @@ class DivoomPixooDataUpdateCoordinator(DataUpdateCoordinator[DivoomPixooData]):
             temperature_mode=result["TemperatureMode"],
             rotation_mode=result["GyrateAngle"],
             mirror_mode=result["MirrorFlag"],
+            channel_index=channel_index,
+            # Only still known while the device shows the channel we selected it in
+            channel_effect_id=previous.channel_effect_id
+            if channel_index == previous.channel_index
+            else None,
+            clock_drift=clock_drift,
         )
+
+        if divoom_pixoo_data != self.data:
+            if self.data is not None:
+                _LOGGER.debug("Detected external change on %s", self.name)
+                self.async_poll_fast()
+            self._snapshot_store.async_delay_save(
+                lambda: asdict(divoom_pixoo_data), SNAPSHOT_SAVE_DELAY
+            )
+        self._async_adapt_update_interval()
+
         return divoom_pixoo_data
 
-    # Convenience wrappers around api send_command's (perhaps we can create a PR on the pixoo code later on)
-    def play_buzzer(
+    def _is_channel_due(self, now: float) -> bool:
+        """Return whether the channel should be polled.
+
+        Only while an entity shows it, and then on every poll of the fast poll window, or when it is unknown or due.
+        """
+        if not any("channel_index" in context for context in self.async_contexts()):
+            return False
+        return (
+            self.data is None
+            or self.data.channel_index is None
+            or now < self._fast_poll_until
+            or now >= self._channel_due
+        )
+
+    async def async_restore_snapshot(self) -> None:
+        """Restore the last known data from the snapshot, without reaching out to the device."""
+        if (snapshot := await self._snapshot_store.async_load()) is None:
+            return
+        # Ignore fields of other versions of the integration
+        self.data = DivoomPixooData(
+            **{name: value for name, value in snapshot.items() if name in DATA_FIELDS}
+        )
+        _LOGGER.debug("Restored snapshot of %s: %s", self.name, self.data)
+
+    @callback
+    def async_add_listener(
+        self, update_callback: CALLBACK_TYPE, context: Any = None
+    ) -> Callable[[], None]:
+        """Listen for data updates, registering the data fields (the context) of the listener."""
+        remove_listener: Callable[[], None] = super().async_add_listener(
+            update_callback, context
+        )
+        key: object = object()
+        self._field_listeners[key] = (update_callback, context)
+
+        @callback
+        def remove_field_listener() -> None:
+            """Remove the listener."""
+            self._field_listeners.pop(key, None)
+            remove_listener()
+
+        return remove_field_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify only the listeners of the fields that changed since the last notification.
+
+        Listeners without a context (i.e. not an entity of a single field) are always notified,
+        and all listeners are notified when the availability changes.
+        """
+        previous_data: DivoomPixooData | None = self._notified_data
+        previous_update_success: bool = self._notified_update_success
+        self._notified_data = self.data
+        self._notified_update_success = self.last_update_success
+        if (
+            previous_data is None
+            or self.data is None
+            or previous_update_success != self.last_update_success
+        ):
+            self._async_update_context_listeners(None)
+            return
+        self._async_update_context_listeners(self.data.changed_fields(previous_data))
+
+    @callback
+    def _async_update_context_listeners(self, changed: frozenset[str] | None) -> None:
+        """Notify the listeners without a context, and those of the changed fields, or all listeners if None."""
+        for update_callback, context in list(self._field_listeners.values()):
+            if context is None or changed is None or not changed.isdisjoint(context):
+                update_callback()
+
+    @callback
+    def _async_catalog_changed(self) -> None:
+        """Notify the listeners of the current face, that might have a name now."""
+        self._async_update_context_listeners(frozenset({"cur_clock_id"}))
+
+    @callback
+    def _async_circuit_state_changed(self, state: CircuitState) -> None:
+        """Mark our entities unavailable right away when the device becomes unreachable, instead of at the next poll."""
+        if state is CircuitState.OPEN and self.last_update_success:
+            self.async_set_update_error(
+                DivoomPixooCircuitOpenError(f"{self.name} is unreachable")
+            )
+
+    @callback
+    def async_poll_fast(self) -> None:
+        """Poll at the minimum interval for a while, i.e. after a local command or a detected external change.
+
+        A refresh that is already scheduled at a backed off interval is rescheduled at the minimum interval.
+        """
+        self._fast_poll_until = self.hass.loop.time() + FAST_POLL_WINDOW.total_seconds()
+        if self.update_interval == self.min_update_interval:
+            return
+        self.update_interval = self.min_update_interval
+        # Only a pending scheduled refresh, during a refresh the next one is scheduled once it completes
+        # This leaves a debounced refresh alone, so the reconciliation after a command still happens
+        if self._unsub_refresh is not None:
+            self._schedule_refresh()
+
+    @callback
+    def _async_adapt_update_interval(self) -> None:
+        """Adapt the polling interval for the next update.
+
+        Stays at the minimum within the fast poll window, otherwise doubles up to the maximum while nothing changes.
+        """
+        if self.hass.loop.time() < self._fast_poll_until:
+            self.update_interval = self.min_update_interval
+        else:
+            self.update_interval = min(
+                self.update_interval * 2, self.max_update_interval
+            )
+        _LOGGER.debug("Next update of %s in %s", self.name, self.update_interval)
+
+    def _active_batch(self) -> _DivoomPixooCommandBatch | None:
+        """Return the active batch of this coordinator in the current context, if any."""
+        if (batches := _COMMAND_BATCHES.get()) is None:
+            return None
+        return batches.get(self)
+
+    @asynccontextmanager
+    async def async_batch(self) -> AsyncIterator[None]:
+        """Collect all commands sent within this context, and send them as a single Draw/CommandList request.
+
+        Nested batches are merged into the outer batch.
+        """
+        batches: dict[DivoomPixooDataUpdateCoordinator, _DivoomPixooCommandBatch] = (
+            _COMMAND_BATCHES.get() or {}
+        )
+        if self in batches:
+            yield
+            return
+
+        self.async_cancel_transition()
+        batch: _DivoomPixooCommandBatch = _DivoomPixooCommandBatch()
+        # A new dict, so the batches of the outer context are left untouched
+        token = _COMMAND_BATCHES.set({**batches, self: batch})
+        try:
+            yield
+        finally:
+            _COMMAND_BATCHES.reset(token)
+
+        if batch.commands:
+            self.async_poll_fast()
+            _LOGGER.debug(
+                "Send batch: %s", [command[API_COMMAND] for command in batch.commands]
+            )
+            await self.command_queue.async_send(batch.commands)
+        if batch.data_changes:
+            self.async_set_optimistic_data(**batch.data_changes)
+
+    async def async_send_command(self, command: str, **parameters: Any) -> None:
+        """Send a command to the device, or add it to the active batch."""
+        if (batch := self._active_batch()) is not None:
+            batch.commands.append({API_COMMAND: command, **parameters})
+            return
+        self.async_cancel_transition()
+        self.async_poll_fast()
+        await self.command_queue.async_send([{API_COMMAND: command, **parameters}])
+
+    @callback
+    def async_set_optimistic_data(self, **data_changes: Any) -> None:
+        """Write the expected result of a command through to our data, and notify the entities right away.
+
+        Within an active batch, the changes are applied once the batch has been sent.
+        Entities should call async_request_refresh afterwards, to reconcile with the device using a single debounced refresh.
+        """
+        if (batch := self._active_batch()) is not None:
+            batch.data_changes.update(data_changes)
+            return
+        if self.data is None:
+            return
+        self.async_set_updated_data(replace(self.data, **data_changes))
+
+    # Convenience wrappers around api commands
+    async def async_play_buzzer(
         self,
         play_total_time: int = 3000,
         active_time_in_cycle: int = 500,
@@ -176,31 +519,148 @@ class DivoomPixooDataUpdateCoordinator(DataUpdateCoordinator[DivoomPixooData]):
     ) -> None:
         """Play buzzer."""
         _LOGGER.debug("Play buzzer for %s ms", play_total_time)
-        self.pixoo.send_command(
-            command="Device/PlayBuzzer",
-            active_time_in_cycle=active_time_in_cycle,
-            off_time_in_cycle=off_time_in_cycle,
-            play_total_time=play_total_time,
+        await self.async_send_command(
+            "Device/PlayBuzzer",
+            ActiveTimeInCycle=active_time_in_cycle,
+            OffTimeInCycle=off_time_in_cycle,
+            PlayTotalTime=play_total_time,
+        )
+
+    async def async_set_clock(self, clock_id: int) -> None:
+        """Set clock face."""
+        _LOGGER.debug("Set clock %s", clock_id)
+        await self.async_send_command("Channel/SetClockSelectId", ClockId=clock_id)
+        # The device no longer shows our last streamed frame
+        self.frame_streamer.frame_cache.invalidate()
+        self.async_set_optimistic_data(
+            cur_clock_id=clock_id, channel_index=EFFECT_CHANNELS[EFFECT_CATEGORY_FACES]
         )
 
-    def set_hour_mode(self, hour_mode: int) -> None:
+    async def async_set_effect(self, effect: DivoomPixooEffect) -> None:
+        """Set an effect of any category."""
+        if effect.category == EFFECT_CATEGORY_FACES:
+            await self.async_set_clock(effect.id)
+            return
+        _LOGGER.debug("Set %s effect %s", effect.category, effect.id)
+        command, parameter = EFFECT_COMMANDS[effect.category]
+        await self.async_send_command(command, **{parameter: effect.id})
+        # The device no longer shows our last streamed frame
+        self.frame_streamer.frame_cache.invalidate()
+        if effect.category == EFFECT_CATEGORY_CHANNEL:
+            self.async_set_optimistic_data(
+                channel_index=effect.id, channel_effect_id=None
+            )
+        else:
+            self.async_set_optimistic_data(
+                channel_index=EFFECT_CHANNELS[effect.category],
+                channel_effect_id=effect.id,
+            )
+
+    async def async_set_playlist(self, items: list[DivoomPixooPlaylistItem]) -> None:
+        """Show a playlist of frames, uploaded once as an animation the device loops by itself.
+
+        Raises ValueError for playlists that need too many frames.
+        """
+        frames, speed = playlist_animation(items)
+        _LOGGER.debug("Upload playlist of %s frames at %s ms", len(frames), speed)
+        await self.frame_streamer.async_send_frames(frames, speed=speed)
+
+    async def async_set_brightness(self, brightness: int) -> None:
+        """Set brightness."""
+        _LOGGER.debug("Set brightness %s", brightness)
+        await self.async_send_command("Channel/SetBrightness", Brightness=brightness)
+        self.async_set_optimistic_data(screen_brightness=brightness)
+
+    @callback
+    def async_start_transition(self, brightness: int, transition: float) -> None:
+        """Start a brightness transition from the current brightness, replacing the one in progress.
+
+        The expected brightness is written through right away, and reconciled with the device once the transition ends.
+        """
+        self.async_cancel_transition()
+        if self.data is None or self.data.screen_brightness is None:
+            return
+        _LOGGER.debug(
+            "Start transition to brightness %s in %s s", brightness, transition
+        )
+        self._transition = self.config_entry.async_create_background_task(
+            self.hass,
+            self._async_run_transition(
+                int(self.data.screen_brightness), brightness, transition
+            ),
+            name=f"divoom_pixoo_transition_{self.divoom_pixoo_config.id}",
+        )
+        self.async_set_optimistic_data(screen_brightness=brightness)
+
+    @property
+    def transition_in_progress(self) -> bool:
+        """Return whether a brightness transition is in progress."""
+        return self._transition is not None and not self._transition.done()
+
+    @callback
+    def async_cancel_transition(self) -> None:
+        """Cancel the brightness transition in progress, if any."""
+        if self.transition_in_progress:
+            _LOGGER.debug("Cancel transition")
+            self._transition.cancel()
+        self._transition = None
+
+    async def _async_run_transition(
+        self, start: int, brightness: int, transition: float
+    ) -> None:
+        """Step the brightness from start to brightness, at the rate the device accepts the steps."""
+        started: float = self.hass.loop.time()
+        current: int = start
+        try:
+            while current != brightness:
+                # Steps follow the clock, so the steps of a device that falls behind are skipped
+                progress: float = min(
+                    (self.hass.loop.time() - started) / transition, 1.0
+                )
+                if (step := round(start + (brightness - start) * progress)) != current:
+                    current = step
+                    await self.command_queue.async_send(
+                        [{API_COMMAND: "Channel/SetBrightness", "Brightness": current}]
+                    )
+                if current != brightness:
+                    await asyncio.sleep(
+                        max(TRANSITION_STEP_INTERVAL, self.command_queue.min_interval)
+                    )
+        except DivoomPixooApiError as exception:
+            _LOGGER.warning("Brightness transition failed: %s", exception)
+        # Polls during the transition kept the target brightness, a single refresh at the end reconciles with the device
+        self._transition = None
+        self.async_poll_fast()
+        await self.async_request_refresh()
+
+    async def async_set_screen(self, on: bool) -> None:
+        """Set screen on or off."""
+        _LOGGER.debug("Set screen %s", on)
+        await self.async_send_command("Channel/OnOffScreen", OnOff=int(on))
+        self.async_set_optimistic_data(screen_state=int(on))
+
+    async def async_set_hour_mode(self, hour_mode: int) -> None:
         """Set hour mode."""
-        _LOGGER.debug("Set hour mode %s ms", hour_mode)
-        self.pixoo.send_command(command="Device/SetTime24Flag", mode=hour_mode)
+        _LOGGER.debug("Set hour mode %s", hour_mode)
+        await self.async_send_command("Device/SetTime24Flag", Mode=hour_mode)
+        self.async_set_optimistic_data(hour_mode=hour_mode)
 
-    def set_temperature_mode(self, temperature_mode: int) -> None:
+    async def async_set_temperature_mode(self, temperature_mode: int) -> None:
         """Set temperature mode."""
-        _LOGGER.debug("Set temperature mode %s ms", temperature_mode)
-        self.pixoo.send_command(command="Device/SetDisTempMode", mode=temperature_mode)
+        _LOGGER.debug("Set temperature mode %s", temperature_mode)
+        await self.async_send_command("Device/SetDisTempMode", Mode=temperature_mode)
+        self.async_set_optimistic_data(temperature_mode=temperature_mode)
 
-    def set_mirror_mode(self, mirror_mode: int) -> None:
+    async def async_set_mirror_mode(self, mirror_mode: int) -> None:
         """Set mirror mode."""
-        _LOGGER.debug("Set mirror mode %s ms", mirror_mode)
-        self.pixoo.send_command(command="Device/SetMirrorMode", mode=mirror_mode)
+        _LOGGER.debug("Set mirror mode %s", mirror_mode)
+        await self.async_send_command("Device/SetMirrorMode", Mode=mirror_mode)
+        self.async_set_optimistic_data(mirror_mode=mirror_mode)
 
-    def set_rotation_mode(self, rotation_mode: int) -> None:
+    async def async_set_rotation_mode(self, rotation_mode: int) -> None:
         """Set rotation mode."""
-        _LOGGER.debug("Set rotation mode %s ms", rotation_mode)
-        self.pixoo.send_command(
-            command="Device/SetScreenRotationAngle", mode=rotation_mode
+        _LOGGER.debug("Set rotation mode %s", rotation_mode)
+        await self.async_send_command(
+            "Device/SetScreenRotationAngle", Mode=rotation_mode
         )
+        self.async_set_optimistic_data(rotation_mode=rotation_mode)
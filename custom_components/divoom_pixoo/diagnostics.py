@@ -0,0 +1,55 @@
+"""Divoom Pixoo Diagnostics.
+
+https://developers.home-assistant.io/docs/core/integration_diagnostics
+"""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any, Final
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import DivoomPixooDataUpdateCoordinator
+
+TO_REDACT: Final = {"id", "mac", "unique_id"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics of a Divoom Pixoo device, with the full metrics of its api client."""
+    coordinator: DivoomPixooDataUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    return {
+        "config_entry": async_redact_data(config_entry.as_dict(), TO_REDACT),
+        "config": async_redact_data(asdict(coordinator.divoom_pixoo_config), TO_REDACT),
+        "data": None if coordinator.data is None else asdict(coordinator.data),
+        "last_update_success": coordinator.last_update_success,
+        "update_interval": str(coordinator.update_interval),
+        "circuit_breaker": {
+            "state": coordinator.client.circuit_breaker.state,
+            "failures": coordinator.client.circuit_breaker.failures,
+            "rejected": coordinator.client.circuit_breaker.rejected,
+        },
+        "command_queue": {
+            "pending": coordinator.command_queue.pending,
+            "min_interval": coordinator.command_queue.min_interval,
+        },
+        "frame_streamer": {
+            "frames_sent": coordinator.frame_streamer.frames_sent,
+            "frame_cache": asdict(coordinator.frame_streamer.frame_cache.stats),
+        },
+        "compositor": {
+            "layers": list(coordinator.compositor.layers),
+            **asdict(coordinator.compositor.stats),
+        },
+        "catalog": {
+            "version": coordinator.catalog.version,
+            "faces": len(coordinator.catalog.faces),
+        },
+        "metrics": coordinator.client.metrics.as_dict(),
+    }
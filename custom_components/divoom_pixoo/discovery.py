@@ -0,0 +1,441 @@
+"""Divoom Pixoo Discovery.
+
+Cloud free discovery of Divoom Pixoo devices on the local network
+Every host of the local subnets is probed concurrently (by a bounded pool of workers) with a cheap Channel/GetAllConf request,
+and hosts that answer like a Pixoo are returned as DivoomPixooConfig.
+
+The local api does not expose the serial id or name of a device, so the online Divoom API is still used (when reachable)
+to enrich what we found locally, and as a fallback for devices we could not reach locally.
+Devices are keyed by their mac address (looked up from the ARP table for devices only found locally), never by their ip.
+
+Discovered devices are cached in a Store, so the config flow can show them immediately,
+while a background refresh keeps the cache (and the ips of our config entries) up to date.
+"""
+from __future__ import annotations
+
+import asyncio
+from asyncio import timeout
+from collections.abc import Iterator
+from dataclasses import replace
+from datetime import datetime, timedelta
+from ipaddress import IPv4Address, IPv4Network, ip_network
+import logging
+from typing import Any, Final
+
+from aiohttp import ClientSession
+
+from homeassistant.components import network
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import format_mac
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.singleton import singleton
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import (
+    DivoomPixooApiClient,
+    DivoomPixooApiError,
+    DivoomPixooCircuitOpenError,
+    async_get_cloud_devices,
+)
+from .const import DIVOOM_PIXOO_CONFIG, DOMAIN
+from .coordinator import DivoomPixooConfig
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of hosts that are probed at the same time
+DISCOVERY_CONCURRENCY: Final = 128
+# Timeout to wait for a single host, most hosts on a LAN either answer immediately or not at all
+DISCOVERY_TIMEOUT: Final = 1.0
+# Never sweep more than a /24 per adapter
+DISCOVERY_MIN_PREFIX: Final = 24
+
+ARP_TABLE: Final = "/proc/net/arp"
+
+DATA_DISCOVERY_CACHE: Final = f"{DOMAIN}_discovery_cache"
+STORAGE_KEY: Final = f"{DOMAIN}.discovery"
+STORAGE_VERSION: Final = 1
+# Cached devices older than this are refreshed in the background
+DISCOVERY_CACHE_TTL: Final = timedelta(hours=1)
+# Minimum time between two refreshes, i.e. when unreachable devices keep requesting one
+DISCOVERY_MIN_REFRESH_INTERVAL: Final = timedelta(minutes=5)
+# Consecutive failed updates of a device before it requests a rediscovery
+REDISCOVERY_FAILURE_THRESHOLD: Final = 3
+# Time between rediscoveries requested by the same device, doubled on every one up to the maximum
+REDISCOVERY_BACKOFF: Final = DISCOVERY_MIN_REFRESH_INTERVAL
+REDISCOVERY_MAX_BACKOFF: Final = DISCOVERY_CACHE_TTL
+
+# Keys from Divoom API
+# http://docin.divoom-gz.com/web/#/5/25
+API_DEVICE_ID: Final = "DeviceId"
+API_DEVICE_MAC: Final = "DeviceMac"
+API_DEVICE_NAME: Final = "DeviceName"
+API_DEVICE_IP: Final = "DevicePrivateIP"
+API_DEVICE_HARDWARE: Final = "Hardware"
+# http://docin.divoom-gz.com/web/#/5/23
+API_BRIGHTNESS: Final = "Brightness"
+API_CUR_CLOCK_ID: Final = "CurClockId"
+
+
+async def async_get_local_networks(hass: HomeAssistant) -> list[IPv4Network]:
+    """Get the IPv4 networks of the enabled network adapters, capped to a /24."""
+    networks: list[IPv4Network] = []
+    for adapter in await network.async_get_adapters(hass):
+        if not adapter["enabled"]:
+            continue
+        for ipv4 in adapter["ipv4"]:
+            local_network: IPv4Network = ip_network(
+                f"{ipv4['address']}/{max(ipv4['network_prefix'], DISCOVERY_MIN_PREFIX)}",
+                strict=False,
+            )
+            if not local_network.is_loopback and local_network not in networks:
+                networks.append(local_network)
+    return networks
+
+
+def parse_subnet(subnet: str) -> IPv4Network:
+    """Parse a subnet given by the user.
+
+    Raises ValueError when it is not an IPv4 network, or larger than a /24.
+    """
+    parsed = ip_network(subnet, strict=False)
+    if not isinstance(parsed, IPv4Network):
+        raise ValueError(f"{subnet} is not an IPv4 network")
+    if parsed.prefixlen < DISCOVERY_MIN_PREFIX:
+        raise ValueError(f"{subnet} is larger than a /{DISCOVERY_MIN_PREFIX}")
+    return parsed
+
+
+async def async_probe_device(session: ClientSession, ip: str) -> bool:
+    """Return whether there is a Divoom Pixoo listening on this ip."""
+    client: DivoomPixooApiClient = DivoomPixooApiClient(
+        session=session, ip=ip, request_timeout=DISCOVERY_TIMEOUT
+    )
+    try:
+        result: dict[str, Any] = await client.async_send_command("Channel/GetAllConf")
+    except DivoomPixooApiError:
+        return False
+    return API_BRIGHTNESS in result and API_CUR_CLOCK_ID in result
+
+
+async def async_scan_networks(
+    session: ClientSession,
+    networks: list[IPv4Network],
+    max_concurrency: int = DISCOVERY_CONCURRENCY,
+) -> list[str]:
+    """Probe all hosts of the networks concurrently, and return the ips of the Divoom Pixoo devices.
+
+    A fixed pool of workers takes the hosts one by one, so no task is created per host.
+    """
+    hosts: list[IPv4Address] = sorted(
+        {host for net in networks for host in net.hosts()}
+    )
+    _LOGGER.debug("Probing %s hosts in %s", len(hosts), networks)
+    pending: Iterator[IPv4Address] = iter(hosts)
+    found: list[str] = []
+
+    async def async_worker() -> None:
+        # Iterators are shared safely between tasks, as next() never awaits
+        for ip in pending:
+            if await async_probe_device(session, str(ip)):
+                found.append(str(ip))
+
+    await asyncio.gather(
+        *(async_worker() for _ in range(min(max_concurrency, len(hosts))))
+    )
+    return sorted(found, key=IPv4Address)
+
+
+def _read_arp_table() -> dict[str, str]:
+    """Read the ARP table, and return the mac address by ip."""
+    try:
+        with open(ARP_TABLE, encoding="utf-8") as arp_table:
+            lines: list[str] = arp_table.readlines()[1:]
+    except OSError:
+        return {}
+    return {
+        columns[0]: format_mac(columns[3])
+        for columns in (line.split() for line in lines)
+        if len(columns) >= 4 and columns[3] != "00:00:00:00:00:00"
+    }
+
+
+async def async_discover_cloud_devices(
+    hass: HomeAssistant,
+) -> dict[str, DivoomPixooConfig]:
+    """Discover all devices using the online Pixoo API.
+
+    http://docin.divoom-gz.com/web/#/5/25
+    """
+    device_list: list[dict[str, Any]] = await async_get_cloud_devices(
+        async_get_clientsession(hass)
+    )
+    return {
+        str(device[API_DEVICE_ID]): DivoomPixooConfig(
+            id=str(device[API_DEVICE_ID]),
+            mac=str(device[API_DEVICE_MAC]),
+            name=str(device[API_DEVICE_NAME]),
+            ip=str(device[API_DEVICE_IP]),
+            hardware=str(device[API_DEVICE_HARDWARE]),
+        )
+        for device in device_list
+    }
+
+
+def _device_key(device: DivoomPixooConfig) -> str:
+    """Return the key of a discovered device, its mac address, or its serial id when the mac is unknown."""
+    return format_mac(device.mac) if device.mac else str(device.id)
+
+
+async def async_discover_divoom_devices(
+    hass: HomeAssistant, subnets: list[str] | None = None, use_cloud: bool = True
+) -> dict[str, DivoomPixooConfig]:
+    """Discover all Divoom Pixoo devices on the local network, by mac address.
+
+    The subnets of the enabled network adapters are scanned, together with the given extra subnets.
+    Extra subnets larger than a /24 are skipped.
+    """
+    networks: list[IPv4Network] = await async_get_local_networks(hass)
+    for subnet in subnets or []:
+        try:
+            networks.append(parse_subnet(subnet))
+        except ValueError as exception:
+            _LOGGER.warning("Skipping subnet: %s", exception)
+    # The online lookup runs alongside the local scan, so it adds no extra latency when it is reachable
+    cloud_task: asyncio.Task[dict[str, DivoomPixooConfig]] | None = (
+        hass.async_create_task(async_discover_cloud_devices(hass))
+        if use_cloud
+        else None
+    )
+    local_ips: list[str] = await async_scan_networks(
+        async_get_clientsession(hass), networks
+    )
+    _LOGGER.debug("Found devices locally: %s", local_ips)
+
+    cloud_devices: dict[str, DivoomPixooConfig] = {}
+    if cloud_task is not None:
+        try:
+            # Only wait for the online lookup as a fallback, when nothing was found locally
+            async with timeout(DISCOVERY_TIMEOUT if local_ips else None):
+                cloud_devices = await cloud_task
+        except (TimeoutError, DivoomPixooApiError) as exception:
+            _LOGGER.debug("Online device lookup failed: %s", exception)
+
+    # Devices are keyed by their mac address, so the unique id of a new entry does not depend on whether
+    # the online lookup answered in time, and an ip (that the online API might know an old one of) is never an identity
+    # The online API still adds the serial id and name of the devices it knows
+    devices: dict[str, DivoomPixooConfig] = {
+        _device_key(device): device for device in cloud_devices.values()
+    }
+    cloud_ips: set[str] = {device.ip for device in cloud_devices.values()}
+    if unknown_ips := [ip for ip in local_ips if ip not in cloud_ips]:
+        arp_table: dict[str, str] = await hass.async_add_executor_job(_read_arp_table)
+        for ip in unknown_ips:
+            if (mac := arp_table.get(ip)) is None:
+                _LOGGER.debug("Skipping device at %s, its mac address is unknown", ip)
+                continue
+            if (device := devices.get(mac)) is not None:
+                devices[mac] = replace(device, ip=ip)
+                continue
+            devices[mac] = DivoomPixooConfig(id=mac, mac=mac, name=f"Pixoo {ip}", ip=ip)
+
+    if not devices:
+        _LOGGER.warning("No Divoom Pixoo devices found")
+    return devices
+
+
+def _is_valid_subnet(subnet: str) -> bool:
+    """Return whether a subnet can be swept."""
+    try:
+        parse_subnet(subnet)
+    except ValueError:
+        return False
+    return True
+
+
+class DivoomPixooDiscoveryCache:
+    """Divoom Pixoo Discovery cache, persisted in a Store."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the DivoomPixooDiscoveryCache class."""
+        self.hass: HomeAssistant = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self.devices: dict[str, DivoomPixooConfig] = {}
+        # Extra subnets given by the user, that are scanned on every refresh
+        self.subnets: list[str] = []
+        self.updated: datetime | None = None
+        self._refresh_task: asyncio.Task[dict[str, DivoomPixooConfig]] | None = None
+
+    @property
+    def is_stale(self) -> bool:
+        """Return whether the cached devices are older than their TTL."""
+        return (
+            self.updated is None
+            or dt_util.utcnow() - self.updated > DISCOVERY_CACHE_TTL
+        )
+
+    async def async_load(self) -> None:
+        """Load the cached devices from the store."""
+        if (data := await self._store.async_load()) is None:
+            return
+        # Devices stored by earlier versions might be keyed by their serial id
+        self.devices = {
+            _device_key(device): device
+            for device in (
+                DivoomPixooConfig(**device) for device in data["devices"].values()
+            )
+        }
+        # Subnets stored by earlier versions might be too large to sweep
+        self.subnets = [
+            subnet for subnet in data["subnets"] if _is_valid_subnet(subnet)
+        ]
+        self.updated = dt_util.parse_datetime(data["updated"])
+
+    async def async_refresh(
+        self, subnet: str | None = None
+    ) -> dict[str, DivoomPixooConfig]:
+        """Discover the devices again, and update the cache and our config entries."""
+        if subnet is not None and subnet not in self.subnets:
+            self.subnets.append(subnet)
+        self.devices = await async_discover_divoom_devices(
+            self.hass, subnets=self.subnets
+        )
+        self.updated = dt_util.utcnow()
+        await self._store.async_save(
+            {
+                "devices": {
+                    device_id: vars(device)
+                    for device_id, device in self.devices.items()
+                },
+                "subnets": self.subnets,
+                "updated": self.updated.isoformat(),
+            }
+        )
+        self._async_update_config_entries()
+        return self.devices
+
+    @callback
+    def async_request_refresh(self) -> None:
+        """Refresh the cache in the background, unless that is already happening or happened recently."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if (
+            self.updated is not None
+            and dt_util.utcnow() - self.updated < DISCOVERY_MIN_REFRESH_INTERVAL
+        ):
+            return
+        self._refresh_task = self.hass.async_create_background_task(
+            self.async_refresh(), name="divoom_pixoo_discovery_refresh"
+        )
+
+    @callback
+    def _async_update_config_entries(self) -> None:
+        """Update the ip of our config entries, for devices that moved to a new address.
+
+        Entries are matched on their device id, or their mac address, whichever way the device was discovered.
+        Updating the entry reloads it, so its coordinator connects to the new address.
+        """
+        devices_by_mac: dict[str, DivoomPixooConfig] = {
+            format_mac(device.mac): device
+            for device in self.devices.values()
+            if device.mac
+        }
+        entry: ConfigEntry
+        for entry in self.hass.config_entries.async_entries(DOMAIN):
+            config: dict[str, Any] = entry.data[DIVOOM_PIXOO_CONFIG]
+            device: DivoomPixooConfig | None = self.devices.get(entry.unique_id)
+            if device is None and (mac := config.get("mac")):
+                device = devices_by_mac.get(format_mac(mac))
+            if device is None or device.ip == config["ip"]:
+                continue
+            _LOGGER.info(
+                "Device %s moved from %s to %s", entry.title, config["ip"], device.ip
+            )
+            self.hass.config_entries.async_update_entry(
+                entry,
+                data={**entry.data, DIVOOM_PIXOO_CONFIG: {**config, "ip": device.ip}},
+            )
+            if not entry.update_listeners:
+                self.hass.config_entries.async_schedule_reload(entry.entry_id)
+
+    @callback
+    def async_start(self) -> None:
+        """Start refreshing the cache periodically, until Home Assistant stops."""
+        async_track_time_interval(
+            self.hass,
+            self._async_scheduled_refresh,
+            DISCOVERY_CACHE_TTL,
+            name="divoom_pixoo_discovery_refresh",
+            cancel_on_shutdown=True,
+        )
+
+    @callback
+    def _async_scheduled_refresh(self, now: datetime) -> None:
+        """Refresh the cache periodically, as long as we have devices to keep up to date."""
+        if self.hass.config_entries.async_entries(DOMAIN) and self.is_stale:
+            self.async_request_refresh()
+
+
+class DivoomPixooRediscovery:
+    """Divoom Pixoo Rediscovery, of a single device that can no longer be reached.
+
+    Only after a number of consecutive failed updates a rediscovery is requested, backing off exponentially between them.
+    Updates that failed fast on an open circuit breaker are not counted, as they never reached the network.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        discovery_cache: DivoomPixooDiscoveryCache,
+        failure_threshold: int = REDISCOVERY_FAILURE_THRESHOLD,
+    ) -> None:
+        """Initialize the DivoomPixooRediscovery class."""
+        self.hass: HomeAssistant = hass
+        self.discovery_cache: DivoomPixooDiscoveryCache = discovery_cache
+        self._failure_threshold: int = failure_threshold
+        self._backoff: float = REDISCOVERY_BACKOFF.total_seconds()
+        self._next_attempt: float = 0.0
+        self._last_failure: Exception | None = None
+        self.failures: int = 0
+
+    @callback
+    def async_update_succeeded(self) -> None:
+        """Record an update that reached the device."""
+        self.failures = 0
+        self._backoff = REDISCOVERY_BACKOFF.total_seconds()
+        self._next_attempt = 0.0
+
+    @callback
+    def async_update_failed(self, exception: Exception) -> None:
+        """Record a failed update, and request a rediscovery when it is due.
+
+        Listeners are also notified for other reasons than an update, so the same failure is only counted once.
+        """
+        if exception is self._last_failure:
+            return
+        self._last_failure = exception
+        if isinstance(exception.__cause__, DivoomPixooCircuitOpenError):
+            return
+        self.failures += 1
+        now: float = self.hass.loop.time()
+        if self.failures < self._failure_threshold or now < self._next_attempt:
+            return
+        _LOGGER.debug(
+            "Requesting a rediscovery after %s failed updates, next one in %s seconds",
+            self.failures,
+            self._backoff,
+        )
+        self._next_attempt = now + self._backoff
+        self._backoff = min(self._backoff * 2, REDISCOVERY_MAX_BACKOFF.total_seconds())
+        self.discovery_cache.async_request_refresh()
+
+
+@singleton(DATA_DISCOVERY_CACHE)
+async def async_get_discovery_cache(hass: HomeAssistant) -> DivoomPixooDiscoveryCache:
+    """Get the shared discovery cache, loaded from its store."""
+    cache: DivoomPixooDiscoveryCache = DivoomPixooDiscoveryCache(hass)
+    await cache.async_load()
+    cache.async_start()
+    return cache
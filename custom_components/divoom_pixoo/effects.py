@@ -0,0 +1,135 @@
+"""Divoom Pixoo Effects.
+
+Index over all effects of a Divoom Pixoo: the clock faces, cloud channels, visualizers, custom pages and channels
+The index is built once per catalog version, and supports lookups by name, by category and id, and by prefix,
+so large effect lists never have to be scanned or rebuilt on every state write.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Final
+
+from .pixoo_effects import (
+    CHANNEL_DICT,
+    CHANNEL_INDEX_CLOUD_DICT,
+    CHANNEL_INDEX_CUSTOM_DICT,
+    CHANNEL_INDEX_FACES_DICT,
+    CHANNEL_INDEX_VISUALIZER_DICT,
+)
+
+EFFECT_CATEGORY_FACES: Final = "faces"
+EFFECT_CATEGORY_CLOUD: Final = "cloud"
+EFFECT_CATEGORY_VISUALIZER: Final = "visualizer"
+EFFECT_CATEGORY_CUSTOM: Final = "custom"
+EFFECT_CATEGORY_CHANNEL: Final = "channel"
+
+EFFECT_CATEGORIES: Final = (
+    EFFECT_CATEGORY_FACES,
+    EFFECT_CATEGORY_CLOUD,
+    EFFECT_CATEGORY_VISUALIZER,
+    EFFECT_CATEGORY_CUSTOM,
+    EFFECT_CATEGORY_CHANNEL,
+)
+
+# Effects of the fixed categories, named like the faces, i.e. "<category> - <name>"
+STATIC_EFFECTS: Final = {
+    EFFECT_CATEGORY_CLOUD: ("Cloud", CHANNEL_INDEX_CLOUD_DICT),
+    EFFECT_CATEGORY_VISUALIZER: ("Visualizer", CHANNEL_INDEX_VISUALIZER_DICT),
+    EFFECT_CATEGORY_CUSTOM: ("Custom", CHANNEL_INDEX_CUSTOM_DICT),
+    EFFECT_CATEGORY_CHANNEL: ("Channel", CHANNEL_DICT),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class DivoomPixooEffect:
+    """Divoom Pixoo Effect, the id is only unique within its category."""
+
+    name: str
+    category: str
+    id: int
+
+
+class DivoomPixooEffectIndex:
+    """Divoom Pixoo Effect index, immutable once built."""
+
+    def __init__(self, faces: Mapping[str, int]) -> None:
+        """Initialize the DivoomPixooEffectIndex class, from the faces of the catalog."""
+        self._by_name: dict[str, DivoomPixooEffect] = {}
+        self._by_id: dict[tuple[str, int], DivoomPixooEffect] = {}
+        self._by_category: dict[str, list[DivoomPixooEffect]] = {
+            category: [] for category in EFFECT_CATEGORIES
+        }
+        for name, clock_id in faces.items():
+            self._add(DivoomPixooEffect(name, EFFECT_CATEGORY_FACES, clock_id))
+        for category, (prefix, effects) in STATIC_EFFECTS.items():
+            for name, index in effects.items():
+                self._add(DivoomPixooEffect(f"{prefix} - {name}", category, index))
+
+        # Sorted lowercase keys, for prefix searches using bisect
+        # Every effect is keyed by its full name, and by its name without category prefix
+        keys: dict[tuple[str, str], DivoomPixooEffect] = {}
+        for effect in self._by_name.values():
+            lower: str = effect.name.lower()
+            keys[(lower, effect.name)] = effect
+            if (short := lower.partition(" - ")[2]) and short != lower:
+                keys[(short, effect.name)] = effect
+        self._keys: list[tuple[str, str]] = sorted(keys)
+        self._key_effects: list[DivoomPixooEffect] = [keys[key] for key in self._keys]
+
+        # The effect list of the light, bounded to the effects we ship with, faces only found in the online catalog
+        # can still be selected by name and are found using the search service
+        self.effect_list: list[str] = [
+            effect.name
+            for effect in self._by_name.values()
+            if effect.category != EFFECT_CATEGORY_FACES
+            or effect.name in CHANNEL_INDEX_FACES_DICT
+        ]
+
+    def __len__(self) -> int:
+        """Return the number of effects."""
+        return len(self._by_name)
+
+    def _add(self, effect: DivoomPixooEffect) -> None:
+        """Add an effect, the first effect with a name wins."""
+        if effect.name in self._by_name:
+            return
+        self._by_name[effect.name] = effect
+        self._by_id[(effect.category, effect.id)] = effect
+        self._by_category[effect.category].append(effect)
+
+    def get(self, name: str) -> DivoomPixooEffect | None:
+        """Return an effect by name."""
+        return self._by_name.get(name)
+
+    def get_by_id(self, category: str, effect_id: int) -> DivoomPixooEffect | None:
+        """Return an effect by category and id."""
+        return self._by_id.get((category, effect_id))
+
+    def category(self, category: str) -> list[DivoomPixooEffect]:
+        """Return all effects of a category."""
+        return self._by_category.get(category, [])
+
+    def prefix(self, prefix: str) -> Iterable[DivoomPixooEffect]:
+        """Return the effects whose name, with or without category prefix, starts with a prefix (case insensitive)."""
+        prefix = prefix.lower()
+        seen: set[str] = set()
+        for position in range(bisect_left(self._keys, (prefix, "")), len(self._keys)):
+            if not self._keys[position][0].startswith(prefix):
+                break
+            effect: DivoomPixooEffect = self._key_effects[position]
+            if effect.name not in seen:
+                seen.add(effect.name)
+                yield effect
+
+    def search(
+        self, query: str | None = None, category: str | None = None
+    ) -> list[DivoomPixooEffect]:
+        """Return the effects matching a prefix (in alphabetical order) and/or a category."""
+        effects: Iterable[DivoomPixooEffect] = (
+            self.prefix(query) if query else self._by_name.values()
+        )
+        if category is not None:
+            effects = (effect for effect in effects if effect.category == category)
+        return list(effects)
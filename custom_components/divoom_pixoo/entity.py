@@ -16,7 +16,13 @@ _LOGGER = logging.getLogger(__name__)
 
 
 class DivoomPixooEntity(CoordinatorEntity[DivoomPixooDataUpdateCoordinator]):
-    """Define a generic Divoom Device entity."""
+    """Define a generic Divoom Device entity.
+
+    Entities only write their state when one of their data fields changed, or the availability of the device changed
+    """
+
+    # Fields of the coordinator data that the state depends on, None to write the state on every update
+    _data_fields: frozenset[str] | None = None
 
     def __init__(
         self,
@@ -24,13 +30,21 @@ class DivoomPixooEntity(CoordinatorEntity[DivoomPixooDataUpdateCoordinator]):
         description: EntityDescription,
     ) -> None:
         """Initialize the DivoomPixooEntity class."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=self._data_fields)
 
         self._attr_unique_id = (
             f"{self.coordinator.divoom_pixoo_config.id}-{description.key}"
         )
         self.entity_description = description
 
+    @property
+    def available(self) -> bool:
+        """Return True if the device was reachable at the last update, and we know its data.
+
+        Without a snapshot, the data is unknown until the first refresh in the background has completed.
+        """
+        return super().available and self.coordinator.data is not None
+
     @property
     def device_info(self) -> DeviceInfo:
         """Return device registry information for this entity.
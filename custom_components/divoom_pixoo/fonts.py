@@ -0,0 +1,232 @@
+"""Divoom Pixoo Fonts.
+
+Bitmap fonts bundled with the integration, to render text locally into the framebuffer
+Glyphs are decoded into numpy masks on first use, and cached in their font for all devices and renders.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from typing import Final
+
+import numpy as np
+
+FALLBACK_CHARACTER: Final = "?"
+
+# Classic 5x7 font, printable ascii, 5 columns per glyph, least significant bit is the top row
+FONT_5X7_COLUMNS: Final = bytes.fromhex(
+    "0000000000"  # space
+    "00005f0000"  # !
+    "0007000700"  # "
+    "147f147f14"  # #
+    "242a7f2a12"  # $
+    "2313086462"  # %
+    "3649552250"  # &
+    "0005030000"  # '
+    "001c224100"  # (
+    "0041221c00"  # )
+    "082a1c2a08"  # *
+    "08083e0808"  # +
+    "0050300000"  # ,
+    "0808080808"  # -
+    "0060600000"  # .
+    "2010080402"  # /
+    "3e5149453e"  # 0
+    "00427f4000"  # 1
+    "4261514946"  # 2
+    "2141454b31"  # 3
+    "1814127f10"  # 4
+    "2745454539"  # 5
+    "3c4a494930"  # 6
+    "0171090503"  # 7
+    "3649494936"  # 8
+    "064949291e"  # 9
+    "0036360000"  # :
+    "0056360000"  # ;
+    "0814224100"  # <
+    "1414141414"  # =
+    "0041221408"  # >
+    "0201510906"  # ?
+    "324979413e"  # @
+    "7e1111117e"  # A
+    "7f49494936"  # B
+    "3e41414122"  # C
+    "7f4141221c"  # D
+    "7f49494941"  # E
+    "7f09090101"  # F
+    "3e41415132"  # G
+    "7f0808087f"  # H
+    "00417f4100"  # I
+    "2040413f01"  # J
+    "7f08142241"  # K
+    "7f40404040"  # L
+    "7f0204027f"  # M
+    "7f0408107f"  # N
+    "3e4141413e"  # O
+    "7f09090906"  # P
+    "3e4151215e"  # Q
+    "7f09192946"  # R
+    "4649494931"  # S
+    "01017f0101"  # T
+    "3f4040403f"  # U
+    "1f2040201f"  # V
+    "7f2018207f"  # W
+    "6314081463"  # X
+    "0304780403"  # Y
+    "6151494543"  # Z
+    "007f414100"  # [
+    "0204081020"  # backslash
+    "0041417f00"  # ]
+    "0402010204"  # ^
+    "4040404040"  # _
+    "0001020400"  # `
+    "2054545478"  # a
+    "7f48444438"  # b
+    "3844444420"  # c
+    "384444487f"  # d
+    "3854545418"  # e
+    "087e090102"  # f
+    "081454543c"  # g
+    "7f08040478"  # h
+    "00447d4000"  # i
+    "2040443d00"  # j
+    "007f102844"  # k
+    "00417f4000"  # l
+    "7c04180478"  # m
+    "7c08040478"  # n
+    "3844444438"  # o
+    "7c14141408"  # p
+    "081414187c"  # q
+    "7c08040408"  # r
+    "4854545420"  # s
+    "043f444020"  # t
+    "3c4040207c"  # u
+    "1c2040201c"  # v
+    "3c4030403c"  # w
+    "4428102844"  # x
+    "0c5050503c"  # y
+    "4464544c44"  # z
+    "0008364100"  # {
+    "00007f0000"  # |
+    "0041360800"  # }
+    "0804081008"  # ~
+)
+
+# Compact 3x5 font for status text, 5 rows per glyph, most significant bit is the left column
+# Lowercase letters are rendered as uppercase
+FONT_3X5_ROWS: Final[dict[str, tuple[int, ...]]] = {
+    " ": (0, 0, 0, 0, 0),
+    "0": (7, 5, 5, 5, 7),
+    "1": (2, 6, 2, 2, 7),
+    "2": (7, 1, 7, 4, 7),
+    "3": (7, 1, 7, 1, 7),
+    "4": (5, 5, 7, 1, 1),
+    "5": (7, 4, 7, 1, 7),
+    "6": (7, 4, 7, 5, 7),
+    "7": (7, 1, 1, 1, 1),
+    "8": (7, 5, 7, 5, 7),
+    "9": (7, 5, 7, 1, 7),
+    "A": (2, 5, 7, 5, 5),
+    "B": (6, 5, 6, 5, 6),
+    "C": (3, 4, 4, 4, 3),
+    "D": (6, 5, 5, 5, 6),
+    "E": (7, 4, 6, 4, 7),
+    "F": (7, 4, 6, 4, 4),
+    "G": (3, 4, 5, 5, 3),
+    "H": (5, 5, 7, 5, 5),
+    "I": (7, 2, 2, 2, 7),
+    "J": (1, 1, 1, 5, 2),
+    "K": (5, 5, 6, 5, 5),
+    "L": (4, 4, 4, 4, 7),
+    "M": (5, 7, 7, 5, 5),
+    "N": (6, 5, 5, 5, 5),
+    "O": (2, 5, 5, 5, 2),
+    "P": (6, 5, 6, 4, 4),
+    "Q": (2, 5, 5, 6, 3),
+    "R": (6, 5, 6, 5, 5),
+    "S": (3, 4, 2, 1, 6),
+    "T": (7, 2, 2, 2, 2),
+    "U": (5, 5, 5, 5, 7),
+    "V": (5, 5, 5, 5, 2),
+    "W": (5, 5, 7, 7, 5),
+    "X": (5, 5, 2, 5, 5),
+    "Y": (5, 5, 2, 2, 2),
+    "Z": (7, 1, 2, 4, 7),
+    ".": (0, 0, 0, 0, 2),
+    ",": (0, 0, 0, 2, 4),
+    ":": (0, 2, 0, 2, 0),
+    ";": (0, 2, 0, 2, 4),
+    "-": (0, 0, 7, 0, 0),
+    "+": (0, 2, 7, 2, 0),
+    "=": (0, 7, 0, 7, 0),
+    "_": (0, 0, 0, 0, 7),
+    "%": (5, 1, 2, 4, 5),
+    "/": (1, 1, 2, 4, 4),
+    "!": (2, 2, 2, 0, 2),
+    "?": (6, 1, 2, 0, 2),
+    "(": (1, 2, 2, 2, 1),
+    ")": (4, 2, 2, 2, 4),
+    "<": (1, 2, 4, 2, 1),
+    ">": (4, 2, 1, 2, 4),
+    "#": (5, 7, 5, 7, 5),
+    "*": (5, 2, 5, 0, 0),
+    "'": (2, 2, 0, 0, 0),
+    '"': (5, 5, 0, 0, 0),
+    "°": (2, 5, 2, 0, 0),
+}
+
+
+class DivoomPixooFont:
+    """Divoom Pixoo bitmap Font, with a cache of its decoded glyphs."""
+
+    def __init__(
+        self,
+        name: str,
+        width: int,
+        height: int,
+        decode: Callable[[str], np.ndarray | None],
+        uppercase: bool = False,
+    ) -> None:
+        """Initialize the DivoomPixooFont class."""
+        self.name: str = name
+        self.width: int = width
+        self.height: int = height
+        self._decode: Callable[[str], np.ndarray | None] = decode
+        self._uppercase: bool = uppercase
+        self._glyphs: dict[str, np.ndarray] = {}
+
+    def glyph(self, character: str) -> np.ndarray:
+        """Return the height x width boolean mask of a character, decoded once and cached."""
+        if (mask := self._glyphs.get(character)) is not None:
+            return mask
+        key: str = character.upper() if self._uppercase else character
+        if (mask := self._decode(key)) is None:
+            mask = self.glyph(FALLBACK_CHARACTER)
+        else:
+            mask.setflags(write=False)
+        self._glyphs[character] = mask
+        return mask
+
+
+def _decode_5x7(character: str) -> np.ndarray | None:
+    """Decode a glyph of the 5x7 font."""
+    index: int = ord(character) - ord(" ")
+    if not 0 <= index < len(FONT_5X7_COLUMNS) // 5:
+        return None
+    columns: np.ndarray = np.frombuffer(
+        FONT_5X7_COLUMNS, dtype=np.uint8, count=5, offset=index * 5
+    )
+    return ((columns[np.newaxis, :] >> np.arange(7)[:, np.newaxis]) & 1).astype(bool)
+
+
+def _decode_3x5(character: str) -> np.ndarray | None:
+    """Decode a glyph of the 3x5 font."""
+    if (rows := FONT_3X5_ROWS.get(character)) is None:
+        return None
+    return ((np.array(rows)[:, np.newaxis] >> np.arange(2, -1, -1)) & 1).astype(bool)
+
+
+FONTS: Final[Mapping[str, DivoomPixooFont]] = {
+    "5x7": DivoomPixooFont("5x7", 5, 7, _decode_5x7),
+    "3x5": DivoomPixooFont("3x5", 3, 5, _decode_3x5, uppercase=True),
+}
+DEFAULT_FONT: Final = "5x7"
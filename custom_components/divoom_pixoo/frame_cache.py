@@ -0,0 +1,80 @@
+"""Divoom Pixoo Frame cache.
+
+Content hash cache of the frames we recently sent to a device
+Frames identical to the one the device is showing are dropped before encoding and before any network I/O,
+and recently sent frames (i.e. dashboards alternating between a few states) reuse their cached encoding.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+from typing import Final
+
+import numpy as np
+
+from .framebuffer import encode_frame
+
+FRAME_CACHE_SIZE: Final = 16
+
+
+@dataclass
+class DivoomPixooFrameCacheStats:
+    """Divoom Pixoo Frame cache counters."""
+
+    # Frames dropped, because the device already shows them
+    hits: int = 0
+    # Frames that had to be sent
+    misses: int = 0
+    # Frames sent using a cached encoding
+    encode_hits: int = 0
+    # Bytes of PicData that did not have to be sent
+    bytes_saved: int = 0
+
+
+class DivoomPixooFrameCache:
+    """Divoom Pixoo Frame cache, with LRU eviction."""
+
+    def __init__(self, max_size: int = FRAME_CACHE_SIZE) -> None:
+        """Initialize the DivoomPixooFrameCache class."""
+        self._max_size: int = max_size
+        self._encoded: OrderedDict[bytes, str] = OrderedDict()
+        # Digest of the frame the device is currently showing, if it is one of ours
+        self._current_digest: bytes | None = None
+        self.stats: DivoomPixooFrameCacheStats = DivoomPixooFrameCacheStats()
+
+    @staticmethod
+    def digest(pixels: np.ndarray) -> bytes:
+        """Return the content hash of a frame, hashed straight from the numpy buffer."""
+        return hashlib.blake2b(np.ascontiguousarray(pixels), digest_size=16).digest()
+
+    def is_current(self, digest: bytes) -> bool:
+        """Return whether the device is already showing this frame, and count it."""
+        if digest == self._current_digest:
+            self.stats.hits += 1
+            if (pic_data := self._encoded.get(digest)) is not None:
+                self.stats.bytes_saved += len(pic_data)
+            return True
+        self.stats.misses += 1
+        return False
+
+    def encode(self, digest: bytes, pixels: np.ndarray) -> str:
+        """Return the encoded PicData of a frame, from cache when it was sent recently."""
+        if (pic_data := self._encoded.get(digest)) is not None:
+            self._encoded.move_to_end(digest)
+            self.stats.encode_hits += 1
+            return pic_data
+
+        pic_data = encode_frame(pixels)
+        self._encoded[digest] = pic_data
+        if len(self._encoded) > self._max_size:
+            self._encoded.popitem(last=False)
+        return pic_data
+
+    def mark_sent(self, digest: bytes) -> None:
+        """Remember the frame the device is showing now."""
+        self._current_digest = digest
+
+    def invalidate(self) -> None:
+        """Forget the frame the device is showing, i.e. when it switched to another channel."""
+        self._current_digest = None
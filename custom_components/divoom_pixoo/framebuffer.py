@@ -0,0 +1,122 @@
+"""Divoom Pixoo Framebuffer.
+
+Local RGB framebuffer of a device, that our services draw into before it is streamed to the device
+All drawing and encoding is vectorized using numpy, so there are no per pixel python loops
+"""
+from __future__ import annotations
+
+import base64
+from typing import Final
+
+import numpy as np
+
+FRAME_SIZE: Final = 64
+
+Color = tuple[int, int, int]
+
+
+def encode_frame(pixels: np.ndarray) -> str:
+    """Encode a size x size x 3 frame as PicData for Draw/SendHttpGif, i.e. base64 of the row major RGB bytes."""
+    return base64.b64encode(np.ascontiguousarray(pixels).tobytes()).decode("ascii")
+
+
+class DivoomPixooFramebuffer:
+    """Divoom Pixoo Framebuffer, a size x size x 3 uint8 numpy array."""
+
+    def __init__(self, size: int = FRAME_SIZE) -> None:
+        """Initialize the DivoomPixooFramebuffer class."""
+        self.size: int = size
+        self.pixels: np.ndarray = np.zeros((size, size, 3), dtype=np.uint8)
+        # Incremented on every change, so consumers can cheaply detect a new frame
+        self.version: int = 0
+
+    def _clip(
+        self, x: int, y: int, width: int, height: int
+    ) -> tuple[int, int, int, int]:
+        """Clip a rectangle to the framebuffer, and return it as x0, y0, x1, y1."""
+        return (
+            max(x, 0),
+            max(y, 0),
+            min(x + width, self.size),
+            min(y + height, self.size),
+        )
+
+    def clear(self) -> None:
+        """Clear the framebuffer to black."""
+        self.pixels.fill(0)
+        self.version += 1
+
+    def fill_rect(
+        self,
+        color: Color,
+        x: int = 0,
+        y: int = 0,
+        width: int | None = None,
+        height: int | None = None,
+    ) -> None:
+        """Fill a rectangle with a color, by default the whole framebuffer."""
+        x0, y0, x1, y1 = self._clip(
+            x,
+            y,
+            self.size if width is None else width,
+            self.size if height is None else height,
+        )
+        if x0 < x1 and y0 < y1:
+            self.pixels[y0:y1, x0:x1] = color
+        self.version += 1
+
+    def draw_pixels(self, xs: np.ndarray, ys: np.ndarray, colors: np.ndarray) -> None:
+        """Draw individual pixels, given as arrays of x and y coordinates with their n x 3 colors.
+
+        Pixels outside of the framebuffer are ignored.
+        """
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+        inside: np.ndarray = (xs >= 0) & (xs < self.size) & (ys >= 0) & (ys < self.size)
+        self.pixels[ys[inside], xs[inside]] = colors[inside]
+        self.version += 1
+
+    def blit(self, image: np.ndarray, x: int = 0, y: int = 0) -> None:
+        """Copy a height x width x 3 image into the framebuffer, at the given position.
+
+        Parts of the image outside of the framebuffer are clipped.
+        """
+        height, width = image.shape[:2]
+        x0, y0, x1, y1 = self._clip(x, y, width, height)
+        if x0 < x1 and y0 < y1:
+            self.pixels[y0:y1, x0:x1] = image[y0 - y : y1 - y, x0 - x : x1 - x, :3]
+        self.version += 1
+
+    def draw_mask(
+        self,
+        mask: np.ndarray,
+        color: Color,
+        x: int = 0,
+        y: int = 0,
+        background: Color | None = None,
+    ) -> None:
+        """Draw a height x width boolean mask (i.e. rendered text) in a color, at the given position.
+
+        The rest of the masked rectangle is filled with the background color, if any.
+        Parts of the mask outside of the framebuffer are clipped.
+        """
+        height, width = mask.shape
+        x0, y0, x1, y1 = self._clip(x, y, width, height)
+        if x0 < x1 and y0 < y1:
+            region: np.ndarray = self.pixels[y0:y1, x0:x1]
+            if background is not None:
+                region[:] = background
+            region[mask[y0 - y : y1 - y, x0 - x : x1 - x]] = color
+        self.version += 1
+
+    def load(self, data: bytes) -> None:
+        """Replace the whole framebuffer with raw row major RGB bytes."""
+        self.pixels[:] = np.frombuffer(data, dtype=np.uint8).reshape(
+            self.size, self.size, 3
+        )
+        self.version += 1
+
+    def encode(self) -> str:
+        """Encode the framebuffer as PicData for Draw/SendHttpGif, i.e. base64 of the row major RGB bytes."""
+        return encode_frame(self.pixels)
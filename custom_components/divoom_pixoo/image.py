@@ -0,0 +1,105 @@
+"""Divoom Pixoo Image platform.
+
+Shows the last frame that was sent to the device, upscaled for viewing
+The PNG is encoded at most once per frame, when it is first requested, so any number of viewers only costs a lookup.
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+from typing import Final
+
+import numpy as np
+
+from homeassistant.components.image import ImageEntity, ImageEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .coordinator import DivoomPixooDataUpdateCoordinator
+from .entity import DivoomPixooEntity
+from .png import encode_png
+from .streamer import DivoomPixooFrameStreamer
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upscale factor of the frame, 64 x 64 pixels become 512 x 512
+IMAGE_SCALE: Final = 8
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up image entities."""
+    coordinator: DivoomPixooDataUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    async_add_entities(
+        [
+            DivoomPixooImageEntity(
+                coordinator=coordinator,
+                description=ImageEntityDescription(
+                    key="frame", translation_key="frame"
+                ),
+            )
+        ]
+    )
+
+
+class DivoomPixooImageEntity(DivoomPixooEntity, ImageEntity):
+    """Divoom Pixoo Image Entity, of the last frame sent to the device."""
+
+    _attr_has_entity_name = True
+    _attr_content_type = "image/png"
+    # The state does not depend on the coordinator data, only on its availability
+    _data_fields = frozenset()
+
+    def __init__(
+        self,
+        coordinator: DivoomPixooDataUpdateCoordinator,
+        description: ImageEntityDescription,
+    ) -> None:
+        """Initialize the DivoomPixooImageEntity class."""
+        super().__init__(coordinator=coordinator, description=description)
+        ImageEntity.__init__(self, coordinator.hass)
+        self._frame_streamer: DivoomPixooFrameStreamer = coordinator.frame_streamer
+        self._attr_image_last_updated = self._frame_streamer.last_frame_sent
+        # Encoded PNG, and the digest of the frame it was encoded from
+        self._png: bytes | None = None
+        self._png_digest: bytes | None = None
+        self._png_lock: asyncio.Lock = asyncio.Lock()
+
+    async def async_added_to_hass(self) -> None:
+        """Listen for frames sent to the device."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._frame_streamer.async_add_listener(self._async_frame_sent)
+        )
+
+    @callback
+    def _async_frame_sent(self) -> None:
+        """Update the state, so viewers know there is a new image."""
+        self._attr_image_last_updated = self._frame_streamer.last_frame_sent
+        self.async_write_ha_state()
+
+    async def async_image(self) -> bytes | None:
+        """Return the PNG of the last frame, encoded once per frame."""
+        async with self._png_lock:
+            if (frame := self._frame_streamer.last_frame) is None:
+                return None
+            digest: bytes | None = self._frame_streamer.last_frame_digest
+            if digest != self._png_digest:
+                size: int = self._frame_streamer.compositor.size
+                pixels: np.ndarray = np.frombuffer(
+                    base64.b64decode(frame), dtype=np.uint8
+                ).reshape(size, size, 3)
+                _LOGGER.debug("Encode image of frame %s", digest.hex())
+                self._png = await self.hass.async_add_executor_job(
+                    encode_png, pixels, IMAGE_SCALE
+                )
+                self._png_digest = digest
+            return self._png
@@ -6,6 +6,7 @@ from typing import Any
 from homeassistant.components.light import (
     ATTR_BRIGHTNESS,
     ATTR_EFFECT,
+    ATTR_TRANSITION,
     ColorMode,
     LightEntity,
     LightEntityDescription,
@@ -13,6 +14,7 @@ from homeassistant.components.light import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.util.percentage import (
     percentage_to_ranged_value,
@@ -20,12 +22,17 @@ from homeassistant.util.percentage import (
 )
 
 from .const import DOMAIN
-from .coordinator import DivoomPixooDataUpdateCoordinator
+from .coordinator import EFFECT_CHANNELS, DivoomPixooDataUpdateCoordinator
+from .effects import EFFECT_CATEGORY_CHANNEL, EFFECT_CATEGORY_FACES, DivoomPixooEffect
 from .entity import DivoomPixooEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 BRIGHTNESS_SCALE = (0, 255)
+# Category of the effects of a channel, by channel index
+EFFECT_CHANNEL_CATEGORIES = {
+    channel_index: category for category, channel_index in EFFECT_CHANNELS.items()
+}
 
 
 async def async_setup_entry(
@@ -43,13 +50,22 @@ async def async_setup_entry(
             key="screen", name="screen_name", translation_key="screen"
         ),
     )
-    async_add_entities([divoom_light_entity], update_before_add=True)
+    async_add_entities([divoom_light_entity])
 
 
 class DivoomPixooLightEntity(DivoomPixooEntity, LightEntity):
     """Divoom Pixoo Light Entity."""
 
     _attr_has_entity_name = True
+    _data_fields = frozenset(
+        {
+            "screen_state",
+            "screen_brightness",
+            "cur_clock_id",
+            "channel_index",
+            "channel_effect_id",
+        }
+    )
 
     def __init__(
         self,
@@ -62,71 +78,111 @@ class DivoomPixooLightEntity(DivoomPixooEntity, LightEntity):
         # https://developers.home-assistant.io/docs/core/entity/light#color-modes
         self._attr_color_mode = ColorMode.BRIGHTNESS
         self._attr_supported_color_modes = {ColorMode.ONOFF, ColorMode.BRIGHTNESS}
-        self._attr_supported_features = LightEntityFeature.EFFECT
+        self._attr_supported_features = (
+            LightEntityFeature.EFFECT | LightEntityFeature.TRANSITION
+        )
 
     @property
     def is_on(self) -> bool | None:
         """Return whether this light is on or off."""
-        _LOGGER.debug("Get is_on: %s", self.coordinator.data.screen_state > 0)
         return self.coordinator.data.screen_state > 0
 
     @property
     def brightness(self) -> int | None:
         """Return brightness."""
-        ha_brightness: float = percentage_to_ranged_value(
+        return percentage_to_ranged_value(
             BRIGHTNESS_SCALE, self.coordinator.data.screen_brightness
         )
-        _LOGGER.debug(
-            "Get brightness: HA %s / Device %s",
-            ha_brightness,
-            self.coordinator.data.screen_brightness,
-        )
-        return ha_brightness
 
     @property
     def effect(self) -> str | None:
-        """Return the current effect."""
-        _LOGGER.debug("Get effect: %s", self.coordinator.data.screen_effect)
-        return self.coordinator.data.screen_effect
+        """Return the current effect.
+
+        This is the face, or the effect we selected within the current channel, or else the channel itself.
+        """
+        channel_index: int | None = self.coordinator.data.channel_index
+        if channel_index not in (None, EFFECT_CHANNELS[EFFECT_CATEGORY_FACES]):
+            effect: DivoomPixooEffect | None = None
+            if (
+                category := EFFECT_CHANNEL_CATEGORIES.get(channel_index)
+            ) is not None and (
+                effect_id := self.coordinator.data.channel_effect_id
+            ) is not None:
+                effect = self.coordinator.catalog.effect_index.get_by_id(
+                    category, effect_id
+                )
+            if effect is None:
+                effect = self.coordinator.catalog.effect_index.get_by_id(
+                    EFFECT_CATEGORY_CHANNEL, channel_index
+                )
+            if effect is not None:
+                return effect.name
+        if self.coordinator.data.cur_clock_id is None:
+            return None
+        return self.coordinator.catalog.get_face_name(
+            self.coordinator.data.cur_clock_id
+        )
 
     @property
     def effect_list(self) -> list[str]:
         """Return the list of saved effects."""
-        return self.coordinator.screen_effect_list
+        return self.coordinator.catalog.effect_index.effect_list
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the device on."""
         _LOGGER.debug("Do turn_on")
 
-        if ATTR_EFFECT in kwargs:
-            clock_id: int = self.coordinator.screen_effect_dict[kwargs[ATTR_EFFECT]]
-            _LOGGER.debug(
-                "Set effect: HA %s / Device %s",
-                kwargs[ATTR_EFFECT],
-                clock_id,
-            )
-            await self.hass.async_add_executor_job(
-                self.coordinator.pixoo.set_clock, clock_id
-            )
-
-        if ATTR_BRIGHTNESS in kwargs:
-            device_brightness: int = math.ceil(
-                ranged_value_to_percentage(BRIGHTNESS_SCALE, kwargs[ATTR_BRIGHTNESS])
-            )
-            _LOGGER.debug(
-                "Set brightness: HA %s / Device %s",
-                kwargs[ATTR_BRIGHTNESS],
-                device_brightness,
-            )
-            await self.hass.async_add_executor_job(
-                self.coordinator.pixoo.set_brightness, device_brightness
-            )
-
-        await self.hass.async_add_executor_job(self.coordinator.pixoo.set_screen_on)
-        await self.coordinator.async_refresh()
+        # Send all requested changes to the device using a single request
+        async with self.coordinator.async_batch():
+            if ATTR_EFFECT in kwargs:
+                effect: DivoomPixooEffect | None = self.coordinator.catalog.get_effect(
+                    kwargs[ATTR_EFFECT]
+                )
+                if effect is None:
+                    raise ServiceValidationError(
+                        f"Unknown effect {kwargs[ATTR_EFFECT]}"
+                    )
+                _LOGGER.debug(
+                    "Set effect: HA %s / Device %s %s",
+                    kwargs[ATTR_EFFECT],
+                    effect.category,
+                    effect.id,
+                )
+                await self.coordinator.async_set_effect(effect)
+
+            device_brightness: int | None = None
+            if ATTR_BRIGHTNESS in kwargs:
+                device_brightness = math.ceil(
+                    ranged_value_to_percentage(
+                        BRIGHTNESS_SCALE, kwargs[ATTR_BRIGHTNESS]
+                    )
+                )
+                _LOGGER.debug(
+                    "Set brightness: HA %s / Device %s",
+                    kwargs[ATTR_BRIGHTNESS],
+                    device_brightness,
+                )
+
+            # A transition fades in from off, or to the requested brightness
+            transition: float = kwargs.get(ATTR_TRANSITION, 0)
+            if transition and not self.is_on:
+                if device_brightness is None:
+                    device_brightness = int(self.coordinator.data.screen_brightness)
+                await self.coordinator.async_set_brightness(0)
+            elif not transition and device_brightness is not None:
+                await self.coordinator.async_set_brightness(device_brightness)
+                device_brightness = None
+
+            await self.coordinator.async_set_screen(True)
+
+        if device_brightness is not None:
+            # The transition reconciles with the device once it ends
+            self.coordinator.async_start_transition(device_brightness, transition)
+            return
+        await self.coordinator.async_request_refresh()
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn device off."""
         _LOGGER.debug("Do turn_off")
-        await self.hass.async_add_executor_job(self.coordinator.pixoo.set_screen_off)
-        await self.coordinator.async_refresh()
+        await self.coordinator.async_set_screen(False)
+        await self.coordinator.async_request_refresh()
@@ -0,0 +1,121 @@
+"""Divoom Pixoo Metrics.
+
+Counters of all requests the api client sends to a device, per api command
+Latencies are kept as a fixed bucket histogram, so recording a request is cheap and the memory use is bounded,
+and the recent outcomes are kept in a ring buffer for the error rate.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Final
+
+# Upper bounds of the latency histogram buckets in seconds, the last bucket counts everything slower
+LATENCY_BUCKETS: Final = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Number of recent requests the error rate is calculated over
+ERROR_RATE_WINDOW: Final = 100
+
+
+@dataclass
+class DivoomPixooCommandMetrics:
+    """Divoom Pixoo Metrics of a single api command."""
+
+    requests: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    retries: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    last_latency: float | None = None
+    max_latency: float = 0.0
+    total_latency: float = 0.0
+    latency_histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+    )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as json serializable dict, with latencies in milliseconds."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "last_latency_ms": None
+            if self.last_latency is None
+            else round(self.last_latency * 1000, 1),
+            "mean_latency_ms": round(self.total_latency / self.requests * 1000, 1)
+            if self.requests
+            else None,
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+            "latency_histogram_ms": {
+                f"le_{bound * 1000:g}": count
+                for bound, count in zip(
+                    (*LATENCY_BUCKETS, float("inf")), self.latency_histogram
+                )
+            },
+        }
+
+
+class DivoomPixooMetrics:
+    """Divoom Pixoo Metrics of all api commands sent to a device."""
+
+    def __init__(self) -> None:
+        """Initialize the DivoomPixooMetrics class."""
+        self.commands: dict[str, DivoomPixooCommandMetrics] = {}
+        # Whether each of the recent requests failed
+        self._recent_errors: deque[bool] = deque(maxlen=ERROR_RATE_WINDOW)
+
+    def record(
+        self,
+        command: str,
+        latency: float,
+        bytes_sent: int,
+        bytes_received: int = 0,
+        error: bool = False,
+        timeout: bool = False,
+    ) -> None:
+        """Record a request to the device."""
+        metrics: DivoomPixooCommandMetrics = self.commands.setdefault(
+            command, DivoomPixooCommandMetrics()
+        )
+        metrics.requests += 1
+        metrics.errors += error
+        metrics.timeouts += timeout
+        metrics.bytes_sent += bytes_sent
+        metrics.bytes_received += bytes_received
+        metrics.last_latency = latency
+        metrics.max_latency = max(metrics.max_latency, latency)
+        metrics.total_latency += latency
+        metrics.latency_histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self._recent_errors.append(error)
+
+    def record_retry(self, command: str) -> None:
+        """Record that a request to the device is retried."""
+        self.commands.setdefault(command, DivoomPixooCommandMetrics()).retries += 1
+
+    def last_latency(self, command: str) -> float | None:
+        """Return the latency of the last request of a command, in seconds."""
+        if (metrics := self.commands.get(command)) is None:
+            return None
+        return metrics.last_latency
+
+    @property
+    def error_rate(self) -> float | None:
+        """Return the fraction of the recent requests that failed."""
+        if not self._recent_errors:
+            return None
+        return sum(self._recent_errors) / len(self._recent_errors)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all metrics as json serializable dict."""
+        return {
+            "requests": sum(metrics.requests for metrics in self.commands.values()),
+            "errors": sum(metrics.errors for metrics in self.commands.values()),
+            "recent_error_rate": self.error_rate,
+            "commands": {
+                command: metrics.as_dict() for command, metrics in self.commands.items()
+            },
+        }
@@ -0,0 +1,49 @@
+"""Divoom Pixoo Playlist.
+
+Playlists of frames, shown one after the other for their duration
+A playlist is uploaded once as a single animation, that the device loops by itself,
+frames shown longer are repeated, at the speed of the greatest common divisor of all durations.
+The device can not cycle through effects (faces or channels) by itself, so they can not be part of a playlist.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from typing import Final
+
+# Maximum number of frames of an animation the device accepts
+MAX_ANIMATION_FRAMES: Final = 59
+# Durations of frames are rounded to this many ms, so their greatest common divisor stays reasonable
+FRAME_DURATION_RESOLUTION: Final = 100
+
+
+@dataclass(frozen=True, slots=True)
+class DivoomPixooPlaylistItem:
+    """Divoom Pixoo Playlist item, a frame (encoded PicData) and its duration."""
+
+    frame: str
+    duration: float
+
+
+def playlist_animation(items: list[DivoomPixooPlaylistItem]) -> tuple[list[str], int]:
+    """Return the frames of the animation of a playlist, and its speed in ms per frame.
+
+    Raises ValueError when the playlist needs more frames than the device accepts.
+    """
+    # Durations in units of the resolution, at least one
+    durations: list[int] = [
+        max(round(item.duration * 1000 / FRAME_DURATION_RESOLUTION), 1)
+        for item in items
+    ]
+    step: int = math.gcd(*durations)
+    frames: list[str] = [
+        item.frame
+        for item, duration in zip(items, durations)
+        for _ in range(duration // step)
+    ]
+    if len(frames) > MAX_ANIMATION_FRAMES:
+        raise ValueError(
+            f"Playlist needs {len(frames)} frames at {step * FRAME_DURATION_RESOLUTION} ms per frame, "
+            f"the device supports at most {MAX_ANIMATION_FRAMES}"
+        )
+    return frames, step * FRAME_DURATION_RESOLUTION
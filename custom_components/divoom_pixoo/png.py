@@ -0,0 +1,45 @@
+"""Divoom Pixoo PNG.
+
+Minimal PNG encoder for frames, using numpy and zlib only
+Frames are upscaled by repeating their pixels, so they stay sharp in the browser.
+
+https://www.w3.org/TR/png/
+"""
+from __future__ import annotations
+
+import struct
+from typing import Final
+import zlib
+
+import numpy as np
+
+PNG_SIGNATURE: Final = b"\x89PNG\r\n\x1a\n"
+# Upscaled frames are mostly repetition, so a fast compression level is about as small as the best one
+PNG_COMPRESSION_LEVEL: Final = 1
+
+
+def _chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Return a PNG chunk, with its length and checksum."""
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+def encode_png(pixels: np.ndarray, scale: int = 1) -> bytes:
+    """Encode a height x width x 3 uint8 frame as an RGB PNG, upscaled by an integer factor."""
+    if scale > 1:
+        pixels = pixels.repeat(scale, axis=0).repeat(scale, axis=1)
+    height, width = pixels.shape[:2]
+    # Every scanline starts with its filter type, 0 is none
+    scanlines: np.ndarray = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = pixels.reshape(height, width * 3)
+    return (
+        PNG_SIGNATURE
+        # 8 bit depth, color type 2 (RGB), default compression, filter and no interlace
+        + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + _chunk(b"IDAT", zlib.compress(scanlines.tobytes(), PNG_COMPRESSION_LEVEL))
+        + _chunk(b"IEND", b"")
+    )
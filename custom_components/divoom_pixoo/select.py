@@ -121,16 +121,12 @@ class DivoomPixooSelectEntity(DivoomPixooEntity, SelectEntity):
 class DivoomPixooSelectEntityHour(DivoomPixooSelectEntity):
     """Divoom Pixoo Select Entity for Hour Mode."""
 
+    _data_fields = frozenset({"hour_mode"})
+
     @property
     def current_option(self) -> str | None:
         """Return the currently selected option."""
-        hour_mode: str = HOUR_MODE_OPTIONS.inverse[self.coordinator.data.hour_mode]
-        _LOGGER.debug(
-            "Get hour mode: HA %s / Device %s",
-            hour_mode,
-            self.coordinator.data.hour_mode,
-        )
-        return hour_mode
+        return HOUR_MODE_OPTIONS.inverse[self.coordinator.data.hour_mode]
 
     async def async_select_option(self, option: str) -> None:
         """Update the current selected option."""
@@ -138,27 +134,19 @@ class DivoomPixooSelectEntityHour(DivoomPixooSelectEntity):
         _LOGGER.debug(
             "Set hour mode: HA %s Device %s", option, HOUR_MODE_OPTIONS[option]
         )
-        await self.hass.async_add_executor_job(
-            self.coordinator.set_hour_mode, HOUR_MODE_OPTIONS[option]
-        )
-        await self.coordinator.async_refresh()
+        await self.coordinator.async_set_hour_mode(HOUR_MODE_OPTIONS[option])
+        await self.coordinator.async_request_refresh()
 
 
 class DivoomPixooSelectEntityTemperature(DivoomPixooSelectEntity):
     """Divoom Pixoo Select Entity for Temperature Mode."""
 
+    _data_fields = frozenset({"temperature_mode"})
+
     @property
     def current_option(self) -> str | None:
         """Return the currently selected option."""
-        temperature_mode: str = TEMPERATURE_MODE_OPTIONS.inverse[
-            self.coordinator.data.temperature_mode
-        ]
-        _LOGGER.debug(
-            "Get temperature mode: HA %s / Device %s",
-            temperature_mode,
-            self.coordinator.data.temperature_mode,
-        )
-        return temperature_mode
+        return TEMPERATURE_MODE_OPTIONS.inverse[self.coordinator.data.temperature_mode]
 
     async def async_select_option(self, option: str) -> None:
         """Update the current selected option."""
@@ -168,27 +156,21 @@ class DivoomPixooSelectEntityTemperature(DivoomPixooSelectEntity):
             option,
             TEMPERATURE_MODE_OPTIONS[option],
         )
-        await self.hass.async_add_executor_job(
-            self.coordinator.set_temperature_mode, TEMPERATURE_MODE_OPTIONS[option]
+        await self.coordinator.async_set_temperature_mode(
+            TEMPERATURE_MODE_OPTIONS[option]
         )
-        await self.coordinator.async_refresh()
+        await self.coordinator.async_request_refresh()
 
 
 class DivoomPixooSelectEntityMirror(DivoomPixooSelectEntity):
     """Divoom Pixoo Select Entity for Mirror Mode."""
 
+    _data_fields = frozenset({"mirror_mode"})
+
     @property
     def current_option(self) -> str | None:
         """Return the currently selected option."""
-        mirror_mode: str = MIRROR_MODE_OPTIONS.inverse[
-            self.coordinator.data.mirror_mode
-        ]
-        _LOGGER.debug(
-            "Get mirror mode: HA %s / Device %s",
-            mirror_mode,
-            self.coordinator.data.mirror_mode,
-        )
-        return mirror_mode
+        return MIRROR_MODE_OPTIONS.inverse[self.coordinator.data.mirror_mode]
 
     async def async_select_option(self, option: str) -> None:
         """Update the current selected option."""
@@ -198,27 +180,19 @@ class DivoomPixooSelectEntityMirror(DivoomPixooSelectEntity):
             option,
             MIRROR_MODE_OPTIONS[option],
         )
-        await self.hass.async_add_executor_job(
-            self.coordinator.set_mirror_mode, MIRROR_MODE_OPTIONS[option]
-        )
-        await self.coordinator.async_refresh()
+        await self.coordinator.async_set_mirror_mode(MIRROR_MODE_OPTIONS[option])
+        await self.coordinator.async_request_refresh()
 
 
 class DivoomPixooSelectEntityRotation(DivoomPixooSelectEntity):
     """Divoom Pixoo Select Entity for Rotation Mode."""
 
+    _data_fields = frozenset({"rotation_mode"})
+
     @property
     def current_option(self) -> str | None:
         """Return the currently selected option."""
-        rotation_mode: str = ROTATION_MODE_OPTIONS.inverse[
-            self.coordinator.data.rotation_mode
-        ]
-        _LOGGER.debug(
-            "Get rotation mode: HA %s / Device %s",
-            rotation_mode,
-            self.coordinator.data.rotation_mode,
-        )
-        return rotation_mode
+        return ROTATION_MODE_OPTIONS.inverse[self.coordinator.data.rotation_mode]
 
     async def async_select_option(self, option: str) -> None:
         """Update the current selected option."""
@@ -228,7 +202,5 @@ class DivoomPixooSelectEntityRotation(DivoomPixooSelectEntity):
             option,
             ROTATION_MODE_OPTIONS[option],
         )
-        await self.hass.async_add_executor_job(
-            self.coordinator.set_rotation_mode, ROTATION_MODE_OPTIONS[option]
-        )
-        await self.coordinator.async_refresh()
+        await self.coordinator.async_set_rotation_mode(ROTATION_MODE_OPTIONS[option])
+        await self.coordinator.async_request_refresh()
@@ -0,0 +1,102 @@
+"""Divoom Pixoo Sensor platform."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+
+from .const import DOMAIN
+from .coordinator import POLL_COMMAND, DivoomPixooDataUpdateCoordinator
+from .entity import DivoomPixooEntity
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class DivoomPixooSensorEntityDescription(SensorEntityDescription):
+    """Divoom Pixoo Sensor entity description, with a function to get its value from the coordinator."""
+
+    value_fn: Callable[[DivoomPixooDataUpdateCoordinator], StateType]
+
+
+def _poll_latency(coordinator: DivoomPixooDataUpdateCoordinator) -> StateType:
+    """Return the latency of the last poll in milliseconds."""
+    if (latency := coordinator.client.metrics.last_latency(POLL_COMMAND)) is None:
+        return None
+    return round(latency * 1000, 1)
+
+
+def _error_rate(coordinator: DivoomPixooDataUpdateCoordinator) -> StateType:
+    """Return the percentage of the recent requests that failed."""
+    if (error_rate := coordinator.client.metrics.error_rate) is None:
+        return None
+    return round(error_rate * 100, 1)
+
+
+SENSOR_DESCRIPTIONS: tuple[DivoomPixooSensorEntityDescription, ...] = (
+    DivoomPixooSensorEntityDescription(
+        key="poll_latency",
+        translation_key="poll_latency",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        # Changes on every poll, so only recorded when enabled by the user
+        entity_registry_enabled_default=False,
+        value_fn=_poll_latency,
+    ),
+    DivoomPixooSensorEntityDescription(
+        key="error_rate",
+        translation_key="error_rate",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        # Changes on every poll, so only recorded when enabled by the user
+        entity_registry_enabled_default=False,
+        value_fn=_error_rate,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up sensor entities."""
+    coordinator: DivoomPixooDataUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ]
+    async_add_entities(
+        DivoomPixooSensorEntity(coordinator=coordinator, description=description)
+        for description in SENSOR_DESCRIPTIONS
+    )
+
+
+class DivoomPixooSensorEntity(DivoomPixooEntity, SensorEntity):
+    """Divoom Pixoo diagnostic Sensor Entity."""
+
+    _attr_has_entity_name = True
+    entity_description: DivoomPixooSensorEntityDescription
+
+    @property
+    def available(self) -> bool:
+        """Return True, diagnostics matter most when the device can not be reached."""
+        return True
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the value of the sensor."""
+        return self.entity_description.value_fn(self.coordinator)
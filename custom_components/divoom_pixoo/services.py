@@ -0,0 +1,564 @@
+"""Divoom Pixoo Services.
+
+Domain services, that target one or more Divoom Pixoo devices using their device id
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import binascii
+from contextlib import AbstractAsyncContextManager, nullcontext
+import logging
+from typing import Any, Final
+
+import numpy as np
+import voluptuous as vol
+
+from homeassistant.const import ATTR_DEVICE_ID
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+
+from .api import API_COMMAND, DivoomPixooApiError
+from .catalog import DivoomPixooCatalog, async_get_catalog
+from .const import DOMAIN
+from .coordinator import DivoomPixooDataUpdateCoordinator
+from .effects import EFFECT_CATEGORIES, DivoomPixooEffect
+from .fonts import DEFAULT_FONT, FONTS
+from .framebuffer import FRAME_SIZE, DivoomPixooFramebuffer, encode_frame
+from .playlist import DivoomPixooPlaylistItem
+from .text import marquee_frames, render_text
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_FILL_RECTANGLE: Final = "fill_rectangle"
+SERVICE_DRAW_PIXELS: Final = "draw_pixels"
+SERVICE_DRAW_FRAME: Final = "draw_frame"
+SERVICE_SEND_COMMAND: Final = "send_command"
+SERVICE_SEARCH_EFFECTS: Final = "search_effects"
+SERVICE_RUN_COMMANDS: Final = "run_commands"
+SERVICE_DRAW_TEXT: Final = "draw_text"
+SERVICE_SET_WIDGET: Final = "set_widget"
+SERVICE_REMOVE_WIDGET: Final = "remove_widget"
+SERVICE_SET_PLAYLIST: Final = "set_playlist"
+
+ATTR_COLOR: Final = "color"
+ATTR_X: Final = "x"
+ATTR_Y: Final = "y"
+ATTR_WIDTH: Final = "width"
+ATTR_HEIGHT: Final = "height"
+ATTR_PIXELS: Final = "pixels"
+ATTR_DATA: Final = "data"
+ATTR_COMMAND: Final = "command"
+ATTR_PARAMETERS: Final = "parameters"
+ATTR_MAX_CONCURRENCY: Final = "max_concurrency"
+ATTR_QUERY: Final = "query"
+ATTR_CATEGORY: Final = "category"
+ATTR_LIMIT: Final = "limit"
+ATTR_COMMAND_LIST: Final = "command_list"
+ATTR_TEXT: Final = "text"
+ATTR_FONT: Final = "font"
+ATTR_BACKGROUND: Final = "background"
+ATTR_SCROLL: Final = "scroll"
+ATTR_SPEED: Final = "speed"
+ATTR_NAME: Final = "name"
+ATTR_ITEMS: Final = "items"
+ATTR_DURATION: Final = "duration"
+
+# Default maximum number of effects returned by a search
+SEARCH_LIMIT: Final = 50
+# Default scroll speed of text, in pixels per second
+SCROLL_SPEED: Final = 20
+
+SCROLL_AUTO: Final = "auto"
+SCROLL_ALWAYS: Final = "always"
+SCROLL_NEVER: Final = "never"
+
+COLOR_SCHEMA: vol.Schema = vol.All(
+    vol.Coerce(tuple), vol.ExactSequence((cv.byte, cv.byte, cv.byte))
+)
+
+DEVICES_SCHEMA: vol.Schema = vol.Schema(
+    {vol.Required(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string])}
+)
+
+FILL_RECTANGLE_SCHEMA: vol.Schema = DEVICES_SCHEMA.extend(
+    {
+        vol.Required(ATTR_COLOR): COLOR_SCHEMA,
+        vol.Optional(ATTR_X, default=0): vol.Coerce(int),
+        vol.Optional(ATTR_Y, default=0): vol.Coerce(int),
+        vol.Optional(ATTR_WIDTH): cv.positive_int,
+        vol.Optional(ATTR_HEIGHT): cv.positive_int,
+    }
+)
+
+DRAW_PIXELS_SCHEMA: vol.Schema = DEVICES_SCHEMA.extend(
+    {
+        vol.Required(ATTR_PIXELS): vol.All(
+            cv.ensure_list,
+            [
+                vol.Schema(
+                    {
+                        vol.Required(ATTR_X): vol.Coerce(int),
+                        vol.Required(ATTR_Y): vol.Coerce(int),
+                        vol.Required(ATTR_COLOR): COLOR_SCHEMA,
+                    }
+                )
+            ],
+        )
+    }
+)
+
+DRAW_FRAME_SCHEMA: vol.Schema = DEVICES_SCHEMA.extend(
+    {vol.Required(ATTR_DATA): cv.string}
+)
+
+SEND_COMMAND_SCHEMA: vol.Schema = vol.Schema(
+    {
+        # All loaded devices when omitted
+        vol.Optional(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_COMMAND): cv.string,
+        vol.Optional(ATTR_PARAMETERS, default={}): dict,
+        # All devices at the same time when omitted
+        vol.Optional(ATTR_MAX_CONCURRENCY): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
+
+SEARCH_EFFECTS_SCHEMA: vol.Schema = vol.Schema(
+    {
+        vol.Optional(ATTR_QUERY): cv.string,
+        vol.Optional(ATTR_CATEGORY): vol.In(EFFECT_CATEGORIES),
+        vol.Optional(ATTR_LIMIT, default=SEARCH_LIMIT): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+
+RUN_COMMANDS_SCHEMA: vol.Schema = DEVICES_SCHEMA.extend(
+    {
+        vol.Required(ATTR_COMMAND_LIST): vol.All(
+            cv.ensure_list,
+            [vol.Schema({vol.Required(API_COMMAND): cv.string}, extra=vol.ALLOW_EXTRA)],
+        )
+    }
+)
+
+DRAW_TEXT_SCHEMA: vol.Schema = DEVICES_SCHEMA.extend(
+    {
+        vol.Required(ATTR_TEXT): cv.string,
+        vol.Optional(ATTR_COLOR, default=(255, 255, 255)): COLOR_SCHEMA,
+        vol.Optional(ATTR_BACKGROUND): COLOR_SCHEMA,
+        vol.Optional(ATTR_X, default=0): vol.Coerce(int),
+        vol.Optional(ATTR_Y, default=0): vol.Coerce(int),
+        vol.Optional(ATTR_FONT, default=DEFAULT_FONT): vol.In(FONTS),
+        vol.Optional(ATTR_SCROLL, default=SCROLL_AUTO): vol.In(
+            (SCROLL_AUTO, SCROLL_ALWAYS, SCROLL_NEVER)
+        ),
+        vol.Optional(ATTR_SPEED, default=SCROLL_SPEED): vol.All(
+            vol.Coerce(float), vol.Range(min=1)
+        ),
+    }
+)
+
+SET_WIDGET_SCHEMA: vol.Schema = DEVICES_SCHEMA.extend(
+    {
+        vol.Required(ATTR_NAME): cv.string,
+        vol.Required(ATTR_X): vol.Coerce(int),
+        vol.Required(ATTR_Y): vol.Coerce(int),
+        vol.Required(ATTR_WIDTH): cv.positive_int,
+        vol.Required(ATTR_HEIGHT): cv.positive_int,
+        vol.Optional(ATTR_TEXT, default=""): cv.string,
+        vol.Optional(ATTR_COLOR, default=(255, 255, 255)): COLOR_SCHEMA,
+        vol.Optional(ATTR_BACKGROUND): COLOR_SCHEMA,
+        vol.Optional(ATTR_FONT, default=DEFAULT_FONT): vol.In(FONTS),
+    }
+)
+
+REMOVE_WIDGET_SCHEMA: vol.Schema = DEVICES_SCHEMA.extend(
+    {
+        # All widgets when omitted
+        vol.Optional(ATTR_NAME): cv.string,
+    }
+)
+
+SET_PLAYLIST_SCHEMA: vol.Schema = DEVICES_SCHEMA.extend(
+    {
+        vol.Required(ATTR_ITEMS): vol.All(
+            cv.ensure_list,
+            vol.Length(min=1),
+            [
+                vol.Schema(
+                    {
+                        vol.Required(ATTR_DATA): cv.string,
+                        vol.Required(ATTR_DURATION): vol.All(
+                            vol.Coerce(float), vol.Range(min=0.1)
+                        ),
+                    }
+                )
+            ],
+        )
+    }
+)
+
+
+@callback
+def async_get_coordinators(
+    hass: HomeAssistant, device_ids: list[str]
+) -> list[DivoomPixooDataUpdateCoordinator]:
+    """Get the coordinators of the targeted devices."""
+    device_registry: dr.DeviceRegistry = dr.async_get(hass)
+    coordinators: list[DivoomPixooDataUpdateCoordinator] = []
+    for device_id in device_ids:
+        device: dr.DeviceEntry | None = device_registry.async_get(device_id)
+        coordinator: DivoomPixooDataUpdateCoordinator | None = next(
+            (
+                hass.data[DOMAIN][entry_id]
+                for entry_id in (device.config_entries if device else ())
+                if entry_id in hass.data.get(DOMAIN, {})
+            ),
+            None,
+        )
+        if coordinator is None:
+            raise ServiceValidationError(
+                f"Device {device_id} is not a loaded Divoom Pixoo device"
+            )
+        coordinators.append(coordinator)
+    return coordinators
+
+
+@callback
+def async_get_all_coordinators(
+    hass: HomeAssistant,
+) -> dict[str, DivoomPixooDataUpdateCoordinator]:
+    """Get the coordinators of all loaded devices, by device id."""
+    device_registry: dr.DeviceRegistry = dr.async_get(hass)
+    return {
+        device.id: coordinator
+        for entry_id, coordinator in hass.data.get(DOMAIN, {}).items()
+        if isinstance(coordinator, DivoomPixooDataUpdateCoordinator)
+        for device in dr.async_entries_for_config_entry(device_registry, entry_id)
+    }
+
+
+async def async_fan_out(
+    coordinators: dict[str, DivoomPixooDataUpdateCoordinator],
+    payload: dict[str, Any],
+    max_concurrency: int | None = None,
+) -> dict[str, dict[str, Any]]:
+    """Send a single command to many devices concurrently, and return the result and latency per device id.
+
+    Every device still goes through its own command queue, so this never overloads a single device,
+    and all devices are sent to at the same time unless capped by max_concurrency.
+    """
+    limit: AbstractAsyncContextManager[Any] = (
+        nullcontext() if max_concurrency is None else asyncio.Semaphore(max_concurrency)
+    )
+    loop = asyncio.get_running_loop()
+
+    async def async_send(
+        coordinator: DivoomPixooDataUpdateCoordinator,
+    ) -> dict[str, Any]:
+        async with limit:
+            started: float = loop.time()
+            try:
+                response: dict[
+                    str, Any
+                ] = await coordinator.command_queue.async_request(payload)
+            except DivoomPixooApiError as exception:
+                return {
+                    "success": False,
+                    "error": str(exception),
+                    "latency": round((loop.time() - started) * 1000, 1),
+                }
+            coordinator.async_poll_fast()
+            await coordinator.async_request_refresh()
+            return {
+                "success": True,
+                "response": response,
+                "latency": round((loop.time() - started) * 1000, 1),
+            }
+
+    results: list[dict[str, Any]] = await asyncio.gather(
+        *(async_send(coordinator) for coordinator in coordinators.values())
+    )
+    return dict(zip(coordinators, results))
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Set up the Divoom Pixoo services."""
+
+    @callback
+    def async_fill_rectangle(call: ServiceCall) -> None:
+        """Fill a rectangle of the framebuffer with a color, by default the whole frame."""
+        for coordinator in async_get_coordinators(hass, call.data[ATTR_DEVICE_ID]):
+            coordinator.framebuffer.fill_rect(
+                color=call.data[ATTR_COLOR],
+                x=call.data[ATTR_X],
+                y=call.data[ATTR_Y],
+                width=call.data.get(ATTR_WIDTH),
+                height=call.data.get(ATTR_HEIGHT),
+            )
+            coordinator.frame_streamer.async_request_flush()
+
+    @callback
+    def async_draw_pixels(call: ServiceCall) -> None:
+        """Draw individual pixels into the framebuffer."""
+        pixels: list[dict] = call.data[ATTR_PIXELS]
+        xs: np.ndarray = np.fromiter((pixel[ATTR_X] for pixel in pixels), np.intp)
+        ys: np.ndarray = np.fromiter((pixel[ATTR_Y] for pixel in pixels), np.intp)
+        colors: np.ndarray = np.array(
+            [pixel[ATTR_COLOR] for pixel in pixels], dtype=np.uint8
+        )
+        for coordinator in async_get_coordinators(hass, call.data[ATTR_DEVICE_ID]):
+            coordinator.framebuffer.draw_pixels(xs, ys, colors)
+            coordinator.frame_streamer.async_request_flush()
+
+    @callback
+    def async_draw_frame(call: ServiceCall) -> None:
+        """Replace the framebuffer with a complete frame, given as base64 encoded row major RGB bytes."""
+        try:
+            data: bytes = base64.b64decode(call.data[ATTR_DATA], validate=True)
+        except binascii.Error as exception:
+            raise ServiceValidationError(
+                "Frame data is not valid base64"
+            ) from exception
+        for coordinator in async_get_coordinators(hass, call.data[ATTR_DEVICE_ID]):
+            if len(data) != coordinator.framebuffer.pixels.nbytes:
+                raise ServiceValidationError(
+                    f"Frame data should be {coordinator.framebuffer.pixels.nbytes} bytes, got {len(data)}"
+                )
+            coordinator.framebuffer.load(data)
+            coordinator.frame_streamer.async_request_flush()
+
+    async def async_draw_text(call: ServiceCall) -> None:
+        """Render text into the framebuffer, or scroll it as a marquee when it does not fit."""
+        mask: np.ndarray = render_text(call.data[ATTR_TEXT], call.data[ATTR_FONT])
+        x: int = call.data[ATTR_X]
+        y: int = call.data[ATTR_Y]
+        for coordinator in async_get_coordinators(hass, call.data[ATTR_DEVICE_ID]):
+            framebuffer: DivoomPixooFramebuffer = coordinator.framebuffer
+            if call.data[ATTR_SCROLL] == SCROLL_ALWAYS or (
+                call.data[ATTR_SCROLL] == SCROLL_AUTO
+                and x + mask.shape[1] > framebuffer.size
+            ):
+                # Scroll over the current frame, including the widgets
+                coordinator.compositor.compose()
+                base: np.ndarray = coordinator.compositor.pixels.copy()
+                if (background := call.data.get(ATTR_BACKGROUND)) is not None:
+                    base[max(y, 0) : y + mask.shape[0]] = background
+                frames, step = marquee_frames(base, mask, y, call.data[ATTR_COLOR])
+                try:
+                    await coordinator.frame_streamer.async_send_frames(
+                        [encode_frame(frame) for frame in frames],
+                        speed=round(1000 * step / call.data[ATTR_SPEED]),
+                    )
+                except DivoomPixooApiError as exception:
+                    raise HomeAssistantError(
+                        f"Could not send the marquee to {coordinator.name}: {exception}"
+                    ) from exception
+                continue
+            framebuffer.draw_mask(
+                mask,
+                call.data[ATTR_COLOR],
+                x=x,
+                y=y,
+                background=call.data.get(ATTR_BACKGROUND),
+            )
+            coordinator.frame_streamer.async_request_flush()
+
+    @callback
+    def async_set_widget(call: ServiceCall) -> None:
+        """Add or update a named widget, a text layer that owns a rectangle on top of the framebuffer."""
+        width: int = call.data[ATTR_WIDTH]
+        height: int = call.data[ATTR_HEIGHT]
+        # Render the widget once for all devices, text that does not fit is clipped
+        text: np.ndarray = render_text(call.data[ATTR_TEXT], call.data[ATTR_FONT])
+        mask: np.ndarray = np.zeros((height, width), dtype=bool)
+        text_height: int = min(height, text.shape[0])
+        text_width: int = min(width, text.shape[1])
+        mask[:text_height, :text_width] = text[:text_height, :text_width]
+        pixels: np.ndarray = np.empty((height, width, 3), dtype=np.uint8)
+        pixels[:] = call.data[ATTR_COLOR]
+        if (background := call.data.get(ATTR_BACKGROUND)) is not None:
+            pixels[~mask] = background
+            # Opaque, the background hides the framebuffer below the widget
+            mask = None
+        for coordinator in async_get_coordinators(hass, call.data[ATTR_DEVICE_ID]):
+            if coordinator.compositor.set_layer(
+                call.data[ATTR_NAME],
+                pixels,
+                x=call.data[ATTR_X],
+                y=call.data[ATTR_Y],
+                mask=mask,
+            ):
+                coordinator.frame_streamer.async_request_flush()
+
+    @callback
+    def async_remove_widget(call: ServiceCall) -> None:
+        """Remove a named widget, or all widgets."""
+        for coordinator in async_get_coordinators(hass, call.data[ATTR_DEVICE_ID]):
+            if ATTR_NAME in call.data:
+                coordinator.compositor.remove_layer(call.data[ATTR_NAME])
+            else:
+                coordinator.compositor.clear_layers()
+            coordinator.frame_streamer.async_request_flush()
+
+    async def async_set_playlist(call: ServiceCall) -> None:
+        """Show a playlist of frames, uploaded once as an animation the device loops by itself."""
+        items: list[DivoomPixooPlaylistItem] = []
+        for item in call.data[ATTR_ITEMS]:
+            try:
+                data: bytes = base64.b64decode(item[ATTR_DATA], validate=True)
+            except binascii.Error as exception:
+                raise ServiceValidationError(
+                    "Frame data is not valid base64"
+                ) from exception
+            if len(data) != FRAME_SIZE * FRAME_SIZE * 3:
+                raise ServiceValidationError(
+                    f"Frame data should be {FRAME_SIZE * FRAME_SIZE * 3} bytes, got {len(data)}"
+                )
+            items.append(
+                DivoomPixooPlaylistItem(
+                    frame=base64.b64encode(data).decode("ascii"),
+                    duration=item[ATTR_DURATION],
+                )
+            )
+        for coordinator in async_get_coordinators(hass, call.data[ATTR_DEVICE_ID]):
+            try:
+                await coordinator.async_set_playlist(items)
+            except ValueError as exception:
+                raise ServiceValidationError(str(exception)) from exception
+            except DivoomPixooApiError as exception:
+                raise HomeAssistantError(
+                    f"Could not send the playlist to {coordinator.name}: {exception}"
+                ) from exception
+
+    async def async_send_command(call: ServiceCall) -> ServiceResponse:
+        """Send a single raw api command to a fleet of devices concurrently."""
+        coordinators: dict[str, DivoomPixooDataUpdateCoordinator]
+        if ATTR_DEVICE_ID in call.data:
+            coordinators = dict(
+                zip(
+                    call.data[ATTR_DEVICE_ID],
+                    async_get_coordinators(hass, call.data[ATTR_DEVICE_ID]),
+                )
+            )
+        else:
+            coordinators = async_get_all_coordinators(hass)
+
+        results: dict[str, dict[str, Any]] = await async_fan_out(
+            coordinators,
+            {API_COMMAND: call.data[ATTR_COMMAND], **call.data[ATTR_PARAMETERS]},
+            max_concurrency=call.data.get(ATTR_MAX_CONCURRENCY),
+        )
+        _LOGGER.debug("Sent %s to %s devices", call.data[ATTR_COMMAND], len(results))
+        return {"devices": results}
+
+    async def async_search_effects(call: ServiceCall) -> ServiceResponse:
+        """Search the effects by name prefix and/or category, i.e. to find faces that are not in the effect list."""
+        catalog: DivoomPixooCatalog = await async_get_catalog(hass)
+        effects: list[DivoomPixooEffect] = catalog.effect_index.search(
+            query=call.data.get(ATTR_QUERY), category=call.data.get(ATTR_CATEGORY)
+        )
+        return {
+            "total": len(effects),
+            "effects": [
+                {"name": effect.name, "category": effect.category, "id": effect.id}
+                for effect in effects[: call.data[ATTR_LIMIT]]
+            ],
+        }
+
+    async def async_run_commands(call: ServiceCall) -> ServiceResponse:
+        """Run a list of raw api commands in order, packed into as few requests as possible, on one or more devices."""
+        commands: list[dict[str, Any]] = call.data[ATTR_COMMAND_LIST]
+        device_ids: list[str] = call.data[ATTR_DEVICE_ID]
+        coordinators: list[DivoomPixooDataUpdateCoordinator] = async_get_coordinators(
+            hass, device_ids
+        )
+
+        async def async_run(
+            coordinator: DivoomPixooDataUpdateCoordinator,
+        ) -> list[dict[str, Any]]:
+            coordinator.async_poll_fast()
+            results: list[dict[str, Any] | Exception]
+            try:
+                results = await coordinator.command_queue.async_send_all(commands)
+            except DivoomPixooApiError as exception:
+                # A device that fails must not fail the call for the other devices
+                results = [exception for _ in commands]
+            await coordinator.async_request_refresh()
+            return [
+                {
+                    "command": command[API_COMMAND],
+                    "success": False,
+                    "error": str(result),
+                }
+                if isinstance(result, Exception)
+                else {
+                    "command": command[API_COMMAND],
+                    "success": True,
+                    "response": result,
+                }
+                for command, result in zip(commands, results)
+            ]
+
+        results: list[list[dict[str, Any]]] = await asyncio.gather(
+            *(async_run(coordinator) for coordinator in coordinators)
+        )
+        return {"devices": dict(zip(device_ids, results))}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_FILL_RECTANGLE,
+        async_fill_rectangle,
+        schema=FILL_RECTANGLE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_DRAW_PIXELS, async_draw_pixels, schema=DRAW_PIXELS_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_DRAW_FRAME, async_draw_frame, schema=DRAW_FRAME_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_DRAW_TEXT, async_draw_text, schema=DRAW_TEXT_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_WIDGET, async_set_widget, schema=SET_WIDGET_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REMOVE_WIDGET,
+        async_remove_widget,
+        schema=REMOVE_WIDGET_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_SET_PLAYLIST, async_set_playlist, schema=SET_PLAYLIST_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEND_COMMAND,
+        async_send_command,
+        schema=SEND_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEARCH_EFFECTS,
+        async_search_effects,
+        schema=SEARCH_EFFECTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RUN_COMMANDS,
+        async_run_commands,
+        schema=RUN_COMMANDS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -49,6 +49,8 @@ class DivoomPixooSirenEntity(DivoomPixooEntity, SirenEntity):
     """
 
     _attr_has_entity_name = True
+    # The state does not depend on the coordinator data, only on its availability
+    _data_fields = frozenset()
 
     def __init__(
         self,
@@ -72,9 +74,7 @@ class DivoomPixooSirenEntity(DivoomPixooEntity, SirenEntity):
 
         self._attr_is_on = True
         self.async_write_ha_state()
-        await self.hass.async_add_executor_job(
-            self.coordinator.play_buzzer, duration_in_ms
-        )
+        await self.coordinator.async_play_buzzer(duration_in_ms)
 
         _LOGGER.debug("Schedule turn_off")
         self._async_cleanup_delay_listener()
@@ -0,0 +1,145 @@
+"""Divoom Pixoo Frame streamer.
+
+Streams the composed frame of a device using Draw/SendHttpGif, whenever it has changed, at most at the target fps
+The device only shows a new frame when its PicID increases, and becomes unstable when the PicID grows too large,
+so we manage the PicID counter here, and reset it on the device using Draw/ResetHttpGifId when needed.
+
+http://docin.divoom-gz.com/web/#/5/36
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from datetime import datetime
+import hashlib
+import logging
+from typing import Any, Final
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.util import dt as dt_util
+
+from .api import API_COMMAND, DivoomPixooApiError
+from .command_queue import DivoomPixooCommandQueue
+from .compositor import DivoomPixooCompositor
+from .frame_cache import DivoomPixooFrameCache
+
+_LOGGER = logging.getLogger(__name__)
+
+# Reset the PicID on the device after this many frames
+PIC_ID_RESET_LIMIT: Final = 32
+# Animation speed of a frame in ms, irrelevant for our single frame animations
+PIC_SPEED: Final = 1000
+
+
+class DivoomPixooFrameStreamer:
+    """Divoom Pixoo Frame streamer."""
+
+    def __init__(
+        self,
+        command_queue: DivoomPixooCommandQueue,
+        compositor: DivoomPixooCompositor,
+        fps: float,
+    ) -> None:
+        """Initialize the DivoomPixooFrameStreamer class."""
+        self._command_queue: DivoomPixooCommandQueue = command_queue
+        self.compositor: DivoomPixooCompositor = compositor
+        self.fps: float = fps
+
+        self._flush_requested: asyncio.Event = asyncio.Event()
+        # 0 means the PicID on the device is unknown, and needs a reset before the next frame
+        self._pic_id: int = 0
+        self.frames_sent: int = 0
+        self.frame_cache: DivoomPixooFrameCache = DivoomPixooFrameCache()
+
+        # Last frame (the first of an animation) that was sent, with its digest and time
+        self.last_frame: str | None = None
+        self.last_frame_digest: bytes | None = None
+        self.last_frame_sent: datetime | None = None
+        self._listeners: list[CALLBACK_TYPE] = []
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> Callable[[], None]:
+        """Listen for frames sent to the device, and return a function to stop listening."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Stop listening for frames sent to the device."""
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_request_flush(self) -> None:
+        """Request the framebuffer and widgets to be sent to the device, with the next frame."""
+        self._flush_requested.set()
+
+    async def async_send_frames(
+        self, frames: list[str], speed: int = PIC_SPEED
+    ) -> None:
+        """Send frames (encoded PicData) to the device as a single animation."""
+        # Until it has been sent completely, we don't know what the device is showing
+        self.frame_cache.invalidate()
+        if self._pic_id == 0 or self._pic_id >= PIC_ID_RESET_LIMIT:
+            _LOGGER.debug("Reset http gif id")
+            await self._command_queue.async_send([{API_COMMAND: "Draw/ResetHttpGifId"}])
+            self._pic_id = 0
+        self._pic_id += 1
+
+        commands: list[dict[str, Any]] = [
+            {
+                API_COMMAND: "Draw/SendHttpGif",
+                "PicNum": len(frames),
+                "PicWidth": self.compositor.size,
+                "PicOffset": offset,
+                "PicID": self._pic_id,
+                "PicSpeed": speed,
+                "PicData": pic_data,
+            }
+            for offset, pic_data in enumerate(frames)
+        ]
+        try:
+            # Frames are large, so send each one in its own request instead of a command list
+            for command in commands:
+                await self._command_queue.async_send([command])
+        except DivoomPixooApiError:
+            # The device might have dropped part of the animation, so start over with a fresh PicID
+            self._pic_id = 0
+            raise
+        self.frames_sent += len(frames)
+
+        digest: bytes = hashlib.blake2b(frames[0].encode(), digest_size=16).digest()
+        if digest != self.last_frame_digest:
+            self.last_frame = frames[0]
+            self.last_frame_digest = digest
+            self.last_frame_sent = dt_util.utcnow()
+            for update_callback in list(self._listeners):
+                update_callback()
+
+    async def async_run(self) -> None:
+        """Compose and send the frame whenever a flush is requested, at most at the target fps, until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._flush_requested.wait()
+            self._flush_requested.clear()
+
+            # Only the layers that changed since the last flush are composed
+            self.compositor.compose()
+            # Drop frames the device is already showing, before encoding or any network I/O
+            digest: bytes = self.frame_cache.digest(self.compositor.pixels)
+            if self.frame_cache.is_current(digest):
+                _LOGGER.debug("Skip unchanged frame")
+                continue
+
+            started: float = loop.time()
+            try:
+                await self.async_send_frames(
+                    [self.frame_cache.encode(digest, self.compositor.pixels)]
+                )
+            except DivoomPixooApiError as exception:
+                _LOGGER.warning("Could not send frame: %s", exception)
+            else:
+                self.frame_cache.mark_sent(digest)
+
+            # Changes made while we wait are combined into the next frame
+            await asyncio.sleep(max(0.0, 1 / self.fps - (loop.time() - started)))
@@ -0,0 +1,79 @@
+"""Divoom Pixoo Text.
+
+Local text rendering into the framebuffer, using the bundled bitmap fonts
+Rendered texts are kept in a small LRU cache of boolean masks, that are assembled from the cached glyphs of their font,
+so status text that is updated often only costs a lookup or a concatenation of already decoded glyphs.
+Text that does not fit the frame is scrolled as a marquee, uploaded once as an animation the device loops by itself.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+import math
+from typing import Final
+
+import numpy as np
+
+from .fonts import FONTS, DivoomPixooFont
+from .framebuffer import Color
+
+# Pixels between characters and between lines
+CHARACTER_SPACING: Final = 1
+LINE_SPACING: Final = 1
+# Number of rendered texts that are cached
+TEXT_CACHE_SIZE: Final = 64
+# Maximum number of frames of a marquee animation, longer texts scroll in larger steps
+MARQUEE_MAX_FRAMES: Final = 40
+
+
+def _render_line(font: DivoomPixooFont, line: str) -> np.ndarray:
+    """Render a single line of text as a boolean mask, from the cached glyphs."""
+    if not line:
+        return np.zeros((font.height, 0), dtype=bool)
+    spacing: np.ndarray = np.zeros((font.height, CHARACTER_SPACING), dtype=bool)
+    parts: list[np.ndarray] = []
+    for character in line:
+        parts.append(font.glyph(character))
+        parts.append(spacing)
+    # No spacing after the last character
+    return np.hstack(parts[:-1])
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(text: str, font_name: str) -> np.ndarray:
+    """Render text, with newlines, as a read only boolean mask of height x width."""
+    font: DivoomPixooFont = FONTS[font_name]
+    lines: list[np.ndarray] = [_render_line(font, line) for line in text.split("\n")]
+    width: int = max(line.shape[1] for line in lines)
+    height: int = len(lines) * (font.height + LINE_SPACING) - LINE_SPACING
+    mask: np.ndarray = np.zeros((height, width), dtype=bool)
+    for index, line in enumerate(lines):
+        top: int = index * (font.height + LINE_SPACING)
+        mask[top : top + font.height, : line.shape[1]] = line
+    mask.setflags(write=False)
+    return mask
+
+
+def marquee_frames(
+    base: np.ndarray, mask: np.ndarray, y: int, color: Color, step: int = 1
+) -> tuple[list[np.ndarray], int]:
+    """Return the frames of a marquee, that scrolls the text mask from right to left over a base frame, and its step.
+
+    The text enters from the right edge and leaves at the left edge, the step is increased to stay within the frame limit.
+    """
+    size: int = base.shape[1]
+    distance: int = size + mask.shape[1]
+    step = max(step, math.ceil(distance / MARQUEE_MAX_FRAMES))
+    # Rows above the frame are clipped
+    if y < 0:
+        mask, y = mask[-y:], 0
+    # Put the text on a strip with a frame of empty space on both sides, every frame is a window of it
+    height: int = max(min(mask.shape[0], base.shape[0] - y), 0)
+    strip: np.ndarray = np.zeros((height, distance + size), dtype=bool)
+    strip[:, size : size + mask.shape[1]] = mask[:height]
+
+    frames: list[np.ndarray] = []
+    for offset in range(0, distance, step):
+        frame: np.ndarray = base.copy()
+        frame[y : y + height][strip[:, offset : offset + size]] = color
+        frames.append(frame)
+    return frames, step
@@ -0,0 +1,381 @@
+"""Divoom Pixoo benchmarks.
+
+Benchmarks of the coordinator poll, light turn on, select option and frame push paths, against fake devices
+Every scenario runs the integration code unchanged on a bare Home Assistant instance, for 1, 10 and 100 devices,
+and reports latency percentiles, device requests per action, executor jobs and event loop blocking as json.
+The fake devices run in the same event loop, so its blocking time includes their (small) share of the work.
+
+    python scripts/benchmark.py --devices 1 10 100 --latency 0.02 --output benchmark.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+import json
+import logging
+import math
+from pathlib import Path
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Final
+
+from fake_pixoo import FakePixoo, FakePixooConfig, async_start_fake_pixoos
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.components.light import LightEntityDescription
+from homeassistant.components.select import SelectEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.divoom_pixoo.catalog import DivoomPixooCatalog
+from custom_components.divoom_pixoo.const import (
+    CONF_MIN_COMMAND_INTERVAL,
+    DOMAIN,
+)
+from custom_components.divoom_pixoo.coordinator import (
+    REQUEST_REFRESH_DELAY,
+    DivoomPixooConfig,
+    DivoomPixooDataUpdateCoordinator,
+)
+from custom_components.divoom_pixoo.light import DivoomPixooLightEntity
+from custom_components.divoom_pixoo.select import (
+    HOUR_MODE_OPTIONS,
+    DivoomPixooSelectEntityHour,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SCENARIOS: Final = ("poll", "light_turn_on", "select_option", "frame_push")
+DEFAULT_DEVICE_COUNTS: Final = (1, 10, 100)
+DEFAULT_ROUNDS: Final = 20
+DEFAULT_PORT: Final = 18080
+# Interval of the event loop monitor
+LOOP_MONITOR_INTERVAL: Final = 0.005
+# Wake ups of the event loop monitor later than this are counted as blocking, smaller delays are timer resolution
+LOOP_BLOCKING_THRESHOLD: Final = 0.001
+# Maximum time to wait for a frame to reach the device
+FRAME_TIMEOUT: Final = 10
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Return the nearest rank percentile of a list of values."""
+    ordered: list[float] = sorted(values)
+    rank: int = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class LoopMonitor:
+    """Measure how long the event loop was blocked, by the delay of a periodic wake up.
+
+    Only the actions themselves are monitored, not the wait for their debounced refreshes.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the LoopMonitor class."""
+        self.blocked: float = 0.0
+        self.max_lag: float = 0.0
+        self._task: asyncio.Task[None] | None = None
+
+    async def _async_run(self) -> None:
+        """Wake up periodically, and record how late every wake up is."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected: float = loop.time() + LOOP_MONITOR_INTERVAL
+            await asyncio.sleep(LOOP_MONITOR_INTERVAL)
+            lag: float = loop.time() - expected
+            if lag > LOOP_BLOCKING_THRESHOLD:
+                self.blocked += lag
+                self.max_lag = max(self.max_lag, lag)
+
+    def start(self) -> None:
+        """Start monitoring."""
+        self._task = asyncio.get_running_loop().create_task(self._async_run())
+
+    async def async_stop(self) -> None:
+        """Stop monitoring."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class ExecutorCounter:
+    """Count the jobs submitted to the default executor, i.e. by hass.async_add_executor_job."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Initialize the ExecutorCounter class, and start counting."""
+        self.jobs: int = 0
+        self._loop: asyncio.AbstractEventLoop = loop
+        self._run_in_executor = loop.run_in_executor
+
+        def run_in_executor(executor: Any, func: Any, *args: Any) -> Any:
+            self.jobs += 1
+            return self._run_in_executor(executor, func, *args)
+
+        loop.run_in_executor = run_in_executor  # type: ignore[method-assign]
+
+    def stop(self) -> None:
+        """Stop counting."""
+        self._loop.run_in_executor = self._run_in_executor  # type: ignore[method-assign]
+
+
+@dataclass
+class Bench:
+    """The integration objects of all benchmarked devices."""
+
+    hass: HomeAssistant
+    devices: dict[str, FakePixoo]
+    coordinators: list[DivoomPixooDataUpdateCoordinator] = field(default_factory=list)
+    lights: list[DivoomPixooLightEntity] = field(default_factory=list)
+    selects: list[DivoomPixooSelectEntityHour] = field(default_factory=list)
+
+
+async def async_run_scenario(
+    bench: Bench,
+    name: str,
+    rounds: int,
+    action: Callable[[int, int], Awaitable[None]],
+) -> dict[str, Any]:
+    """Run an action for every device, for a number of rounds, and return its measurements."""
+    for device in bench.devices.values():
+        device.stats.requests = device.stats.errors = device.stats.dropped = 0
+        device.stats.bytes_received = 0
+    latencies: list[float] = []
+    failures: int = 0
+
+    async def async_timed(round_index: int, index: int) -> None:
+        nonlocal failures
+        started: float = time.perf_counter()
+        try:
+            await action(round_index, index)
+        except Exception:  # noqa: BLE001
+            failures += 1
+            return
+        latencies.append(time.perf_counter() - started)
+
+    monitor = LoopMonitor()
+    executor = ExecutorCounter(bench.hass.loop)
+    monitor.start()
+    started: float = time.perf_counter()
+    try:
+        for round_index in range(rounds):
+            await asyncio.gather(
+                *(
+                    async_timed(round_index, index)
+                    for index in range(len(bench.coordinators))
+                )
+            )
+        duration: float = time.perf_counter() - started
+        await monitor.async_stop()
+        # Include the debounced refreshes that reconcile the optimistic state
+        await asyncio.sleep(REQUEST_REFRESH_DELAY + 0.5)
+        await bench.hass.async_block_till_done()
+    finally:
+        executor.stop()
+        await monitor.async_stop()
+
+    actions: int = rounds * len(bench.coordinators)
+    requests: int = sum(device.stats.requests for device in bench.devices.values())
+    return {
+        "scenario": name,
+        "devices": len(bench.coordinators),
+        "actions": actions,
+        "failures": failures,
+        "duration_s": round(duration, 3),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            "p99": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            "max": round(max(latencies) * 1000, 3) if latencies else None,
+        },
+        "requests_per_action": round(requests / actions, 3),
+        "bytes_per_action": round(
+            sum(device.stats.bytes_received for device in bench.devices.values())
+            / actions,
+            1,
+        ),
+        "device_errors": sum(device.stats.errors for device in bench.devices.values()),
+        "device_dropped": sum(
+            device.stats.dropped for device in bench.devices.values()
+        ),
+        "executor_jobs": executor.jobs,
+        "loop_blocked_ms": round(monitor.blocked * 1000, 3),
+        "loop_max_lag_ms": round(monitor.max_lag * 1000, 3),
+    }
+
+
+async def async_setup_bench(
+    count: int, config: FakePixooConfig, port: int, min_command_interval: float
+) -> tuple[Bench, list[Any]]:
+    """Start fake devices and a bare Home Assistant, with a coordinator and entities per device."""
+    devices, runners = await async_start_fake_pixoos(count, config, port=port, seed=0)
+    hass = HomeAssistant(tempfile.mkdtemp())
+    await hass.async_start()
+    bench = Bench(hass=hass, devices=devices)
+    catalog = DivoomPixooCatalog(hass)
+    for index, address in enumerate(devices):
+        entry = ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title=f"Pixoo {index}",
+            data={},
+            source="user",
+            options={CONF_MIN_COMMAND_INTERVAL: min_command_interval},
+        )
+        coordinator = DivoomPixooDataUpdateCoordinator(
+            hass,
+            entry,
+            DivoomPixooConfig(id=str(index), name=f"Pixoo {index}", ip=address),
+            catalog,
+        )
+        await coordinator.async_refresh()
+        bench.coordinators.append(coordinator)
+        bench.lights.append(
+            DivoomPixooLightEntity(
+                coordinator, LightEntityDescription(key="screen", name="screen")
+            )
+        )
+        bench.selects.append(
+            DivoomPixooSelectEntityHour(
+                coordinator,
+                SelectEntityDescription(
+                    key="hour_mode", options=list(HOUR_MODE_OPTIONS)
+                ),
+            )
+        )
+    return bench, runners
+
+
+async def async_benchmark(
+    count: int, args: argparse.Namespace, config: FakePixooConfig
+) -> list[dict[str, Any]]:
+    """Run all scenarios for a number of devices."""
+    bench, runners = await async_setup_bench(
+        count, config, args.port, args.min_command_interval
+    )
+    effects: list[str] = bench.coordinators[0].catalog.effect_index.effect_list
+    options: list[str] = list(HOUR_MODE_OPTIONS)
+
+    async def async_poll(round_index: int, index: int) -> None:
+        coordinator = bench.coordinators[index]
+        await coordinator.async_refresh()
+        if not coordinator.last_update_success:
+            raise RuntimeError("Poll failed")
+
+    async def async_light_turn_on(round_index: int, index: int) -> None:
+        await bench.lights[index].async_turn_on(
+            brightness=(round_index * 37) % 255 + 1,
+            effect=effects[round_index % len(effects)],
+        )
+
+    async def async_select_option(round_index: int, index: int) -> None:
+        await bench.selects[index].async_select_option(
+            options[round_index % len(options)]
+        )
+
+    async def async_frame_push(round_index: int, index: int) -> None:
+        coordinator = bench.coordinators[index]
+        frames_sent: int = coordinator.frame_streamer.frames_sent
+        coordinator.framebuffer.fill_rect(
+            ((round_index * 50) % 256, index % 256, 255 - round_index % 256)
+        )
+        coordinator.frame_streamer.async_request_flush()
+        deadline: float = time.perf_counter() + FRAME_TIMEOUT
+        while coordinator.frame_streamer.frames_sent == frames_sent:
+            if time.perf_counter() > deadline:
+                raise TimeoutError("Frame was not sent")
+            await asyncio.sleep(0.001)
+
+    scenarios: dict[str, Callable[[int, int], Awaitable[None]]] = {
+        "poll": async_poll,
+        "light_turn_on": async_light_turn_on,
+        "select_option": async_select_option,
+        "frame_push": async_frame_push,
+    }
+    results: list[dict[str, Any]] = []
+    try:
+        for name in args.scenarios:
+            _LOGGER.info("Running %s for %s devices", name, count)
+            results.append(
+                await async_run_scenario(bench, name, args.rounds, scenarios[name])
+            )
+    finally:
+        for coordinator in bench.coordinators:
+            await coordinator.async_shutdown()
+        await bench.hass.async_stop()
+        for runner in runners:
+            await runner.cleanup()
+    return results
+
+
+async def async_main(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the benchmarks for every device count."""
+    config = FakePixooConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        concurrency=args.concurrency,
+    )
+    results: list[dict[str, Any]] = []
+    for count in args.devices:
+        results.extend(await async_benchmark(count, args, config))
+    manifest: dict[str, Any] = json.loads(
+        (
+            Path(__file__).resolve().parent.parent
+            / "custom_components"
+            / DOMAIN
+            / "manifest.json"
+        ).read_text()
+    )
+    return {
+        "metadata": {
+            "version": manifest.get("version"),
+            "timestamp": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": args.rounds,
+            "fake_device": vars(config),
+            "min_command_interval": args.min_command_interval,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    """Parse the arguments, run the benchmarks, and write the results as json."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--devices", type=int, nargs="+", default=list(DEFAULT_DEVICE_COUNTS)
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--min-command-interval", type=float, default=0.0)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.DEBUG if args.debug else logging.INFO, stream=sys.stderr
+    )
+
+    report: dict[str, Any] = asyncio.run(async_main(args))
+    output: str = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Fake Divoom Pixoo devices.
+
+Simulator of the local Divoom Pixoo http api, to run the integration and benchmarks without a real device
+Every fake device listens on its own address, and keeps the state the real firmware reports back,
+with configurable latency, jitter, error rate and concurrency limit.
+
+Run standalone, and add the devices to Home Assistant using their address (i.e. 127.0.0.1:8080) as ip:
+
+    python scripts/fake_pixoo.py --devices 3 --port 8080 --latency 0.05 --jitter 0.02
+
+http://docin.divoom-gz.com/web/#/5/23
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+from collections import Counter
+from dataclasses import dataclass, field
+import json
+import logging
+import random
+import time
+from typing import Any, Final
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+FRAME_SIZES: Final = (16, 32, 64)
+# The firmware handles a single request at a time
+DEFAULT_CONCURRENCY: Final = 1
+# Number of PicIDs the firmware accepts before it needs a Draw/ResetHttpGifId
+PIC_ID_LIMIT: Final = 60
+
+
+@dataclass
+class FakePixooConfig:
+    """Behaviour of a fake device."""
+
+    # Mean response latency, and the maximum random deviation from it, in seconds
+    latency: float = 0.0
+    jitter: float = 0.0
+    # Fraction of requests that fail with an error response
+    error_rate: float = 0.0
+    # Requests handled at the same time, requests over this limit are dropped without response like the firmware does
+    concurrency: int = DEFAULT_CONCURRENCY
+    # Queue requests over the concurrency limit instead of dropping them
+    queue_overload: bool = False
+
+
+@dataclass
+class FakePixooStats:
+    """Counters of a fake device."""
+
+    requests: int = 0
+    commands: Counter[str] = field(default_factory=Counter)
+    errors: int = 0
+    dropped: int = 0
+    bytes_received: int = 0
+    max_concurrent: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as json serializable dict."""
+        return {
+            "requests": self.requests,
+            "commands": dict(self.commands),
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "bytes_received": self.bytes_received,
+            "max_concurrent": self.max_concurrent,
+        }
+
+
+class FakePixoo:
+    """Fake Divoom Pixoo device, its state and its http api."""
+
+    def __init__(self, config: FakePixooConfig, seed: int | None = None) -> None:
+        """Initialize the FakePixoo class."""
+        self.config: FakePixooConfig = config
+        self.stats: FakePixooStats = FakePixooStats()
+        self._random: random.Random = random.Random(seed)
+        self._concurrent: int = 0
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(config.concurrency)
+
+        # State as reported by Channel/GetAllConf
+        self.conf: dict[str, Any] = {
+            "Brightness": 100,
+            "RotationFlag": 1,
+            "ClockTime": 60,
+            "GalleryTime": 60,
+            "SingleGalleyTime": 5,
+            "PowerOnChannelId": 1,
+            "GalleryShowTimeFlag": 1,
+            "CurClockId": 182,
+            "Time24Flag": 1,
+            "TemperatureMode": 0,
+            "GyrateAngle": 0,
+            "MirrorFlag": 0,
+            "LightSwitch": 1,
+        }
+        self.select_index: int = 0
+        self.eq_position: int = 0
+        self.custom_page_index: int = 0
+        self.cloud_index: int = 0
+        self.pic_id: int = 0
+        self.frame: bytes | None = None
+
+        self._handlers: dict[str, Any] = {
+            "Channel/GetAllConf": self._get_all_conf,
+            "Channel/GetIndex": lambda _: {"SelectIndex": self.select_index},
+            "Channel/GetClockInfo": lambda _: {
+                "ClockId": self.conf["CurClockId"],
+                "Brightness": self.conf["Brightness"],
+            },
+            "Device/GetDeviceTime": lambda _: {
+                "UTCTime": int(time.time()),
+                "LocalTime": time.strftime("%Y-%m-%d %H:%M:%S"),
+            },
+            "Channel/SetClockSelectId": self._set_conf("CurClockId", "ClockId", 0),
+            "Channel/SetBrightness": self._set_conf("Brightness", "Brightness"),
+            "Channel/OnOffScreen": self._set_conf("LightSwitch", "OnOff"),
+            "Device/SetTime24Flag": self._set_conf("Time24Flag", "Mode"),
+            "Device/SetDisTempMode": self._set_conf("TemperatureMode", "Mode"),
+            "Device/SetMirrorMode": self._set_conf("MirrorFlag", "Mode"),
+            "Device/SetScreenRotationAngle": self._set_conf("GyrateAngle", "Mode"),
+            "Channel/SetIndex": self._set_attr("select_index", "SelectIndex"),
+            "Channel/SetEqPosition": self._set_attr("eq_position", "EqPosition", 2),
+            "Channel/SetCustomPageIndex": self._set_attr(
+                "custom_page_index", "CustomPageIndex", 3
+            ),
+            "Channel/CloudIndex": self._set_attr("cloud_index", "Index", 1),
+            "Device/PlayBuzzer": lambda _: {},
+            "Draw/GetHttpGifId": lambda _: {"PicId": self.pic_id},
+            "Draw/ResetHttpGifId": self._reset_http_gif_id,
+            "Draw/SendHttpGif": self._send_http_gif,
+            "Draw/CommandList": self._command_list,
+        }
+
+    def _set_conf(self, key: str, parameter: str, channel: int | None = None) -> Any:
+        """Return a handler that sets a GetAllConf value from a parameter, and switches to its channel if any."""
+
+        def handler(payload: dict[str, Any]) -> dict[str, Any]:
+            self.conf[key] = int(payload[parameter])
+            if channel is not None:
+                self.select_index = channel
+            return {}
+
+        return handler
+
+    def _set_attr(
+        self, attribute: str, parameter: str, channel: int | None = None
+    ) -> Any:
+        """Return a handler that sets a state attribute from a parameter, and switches to its channel if any."""
+
+        def handler(payload: dict[str, Any]) -> dict[str, Any]:
+            setattr(self, attribute, int(payload[parameter]))
+            if channel is not None:
+                self.select_index = channel
+            return {}
+
+        return handler
+
+    def _get_all_conf(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Handle Channel/GetAllConf."""
+        return dict(self.conf)
+
+    def _reset_http_gif_id(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Handle Draw/ResetHttpGifId."""
+        self.pic_id = 0
+        return {}
+
+    def _send_http_gif(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Handle Draw/SendHttpGif, validating the frame like the firmware does."""
+        width: int = int(payload["PicWidth"])
+        if width not in FRAME_SIZES:
+            raise ValueError(f"Invalid PicWidth {width}")
+        frame: bytes = base64.b64decode(payload["PicData"])
+        if len(frame) != width * width * 3:
+            raise ValueError(f"Invalid PicData size {len(frame)}")
+        if int(payload["PicID"]) > PIC_ID_LIMIT:
+            raise ValueError("PicID limit reached, reset needed")
+        self.pic_id = int(payload["PicID"])
+        self.frame = frame
+        return {}
+
+    def _command_list(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Handle Draw/CommandList, the device only reports a single result."""
+        for command in payload["CommandList"]:
+            self.execute(command)
+        return {}
+
+    def execute(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Execute a single command, and return its response."""
+        command: str = payload["Command"]
+        self.stats.commands[command] += 1
+        if (handler := self._handlers.get(command)) is None:
+            raise ValueError(f"Unknown command {command}")
+        return handler(payload)
+
+    async def handle_post(self, request: web.Request) -> web.StreamResponse:
+        """Handle a request to the /post endpoint."""
+        self.stats.requests += 1
+        if (
+            self._concurrent >= self.config.concurrency
+            and not self.config.queue_overload
+        ):
+            # The firmware does not answer requests it has no capacity for
+            self.stats.dropped += 1
+            if request.transport is not None:
+                request.transport.close()
+            raise web.HTTPServiceUnavailable
+
+        async with self._semaphore:
+            self._concurrent += 1
+            self.stats.max_concurrent = max(self.stats.max_concurrent, self._concurrent)
+            try:
+                body: bytes = await request.read()
+                self.stats.bytes_received += len(body)
+                if (
+                    delay := self.config.latency
+                    + self._random.uniform(-self.config.jitter, self.config.jitter)
+                ) > 0:
+                    await asyncio.sleep(delay)
+                return web.Response(
+                    text=json.dumps(self._respond(body)), content_type="text/html"
+                )
+            finally:
+                self._concurrent -= 1
+
+    def _respond(self, body: bytes) -> dict[str, Any]:
+        """Return the response to a request body."""
+        if self._random.random() < self.config.error_rate:
+            self.stats.errors += 1
+            return {"error_code": 1}
+        try:
+            payload: dict[str, Any] = json.loads(body)
+            return {"error_code": 0, **self.execute(payload)}
+        except (ValueError, KeyError, TypeError) as exception:
+            self.stats.errors += 1
+            _LOGGER.debug("Invalid request: %s", exception)
+            return {"error_code": "Request data illegal json"}
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        """Handle a request for the counters of this device."""
+        return web.json_response(self.stats.as_dict())
+
+    async def handle_reset_stats(self, request: web.Request) -> web.Response:
+        """Handle a request to reset the counters of this device."""
+        self.stats = FakePixooStats()
+        return web.json_response({})
+
+    def create_app(self) -> web.Application:
+        """Create the http application of this device."""
+        app = web.Application()
+        app.router.add_post("/post", self.handle_post)
+        app.router.add_get("/stats", self.handle_stats)
+        app.router.add_post("/stats/reset", self.handle_reset_stats)
+        return app
+
+
+async def async_start_fake_pixoos(
+    count: int,
+    config: FakePixooConfig,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    seed: int | None = None,
+) -> tuple[dict[str, FakePixoo], list[web.AppRunner]]:
+    """Start fake devices on consecutive ports, and return them by address with their runners."""
+    devices: dict[str, FakePixoo] = {}
+    runners: list[web.AppRunner] = []
+    for index in range(count):
+        device = FakePixoo(config, seed=None if seed is None else seed + index)
+        runner = web.AppRunner(device.create_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port + index).start()
+        devices[f"{host}:{port + index}"] = device
+        runners.append(runner)
+    return devices, runners
+
+
+async def async_main(args: argparse.Namespace) -> None:
+    """Run fake devices until interrupted."""
+    devices, runners = await async_start_fake_pixoos(
+        args.devices,
+        FakePixooConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            concurrency=args.concurrency,
+            queue_overload=args.queue_overload,
+        ),
+        host=args.host,
+        port=args.port,
+        seed=args.seed,
+    )
+    _LOGGER.info("Fake Divoom Pixoo devices at: %s", ", ".join(devices))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def main() -> None:
+    """Parse the arguments, and run the fake devices."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--queue-overload", action="store_true")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
+    try:
+        asyncio.run(async_main(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Tests for the Divoom Pixoo integration."""
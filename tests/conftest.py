@@ -0,0 +1,118 @@
+"""Divoom Pixoo test fixtures.
+
+The tests run the integration code unchanged on a bare Home Assistant instance, against fake devices (see scripts/fake_pixoo.py)
+Config entries are added to Home Assistant without setting them up, the coordinators are created by the fixtures instead.
+"""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+from pathlib import Path
+import socket
+import sys
+
+from aiohttp import web
+import pytest_asyncio
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from fake_pixoo import FakePixoo, FakePixooConfig
+
+from homeassistant.config_entries import ConfigEntries, ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+
+from custom_components.divoom_pixoo.catalog import DivoomPixooCatalog
+from custom_components.divoom_pixoo.const import CONF_MIN_COMMAND_INTERVAL, DOMAIN
+from custom_components.divoom_pixoo.coordinator import (
+    DivoomPixooConfig,
+    DivoomPixooDataUpdateCoordinator,
+)
+
+HOST = "127.0.0.1"
+
+
+def unused_port() -> int:
+    """Return a local port that is not in use."""
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+async def async_start_fake_pixoo(device: FakePixoo, port: int) -> web.AppRunner:
+    """Serve the http api of a fake device on a local port, and return its runner."""
+    runner = web.AppRunner(device.create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, port).start()
+    return runner
+
+
+class FakePixooServer:
+    """A fake device, served on a local port that can be stopped and started again."""
+
+    def __init__(self) -> None:
+        """Initialize the FakePixooServer class."""
+        self.device: FakePixoo = FakePixoo(FakePixooConfig(), seed=0)
+        self.port: int = unused_port()
+        self.address: str = f"{HOST}:{self.port}"
+        self._runner: web.AppRunner | None = None
+
+    async def async_start(self) -> None:
+        """Start serving, the device keeps its state."""
+        self._runner = await async_start_fake_pixoo(self.device, self.port)
+
+    async def async_stop(self) -> None:
+        """Stop serving, so the device can no longer be reached."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+@pytest_asyncio.fixture
+async def hass(tmp_path: Path) -> AsyncIterator[HomeAssistant]:
+    """Return a started bare Home Assistant, with config entries and a device registry."""
+    hass = HomeAssistant(str(tmp_path))
+    hass.config_entries = ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    await dr.async_load(hass)
+    await hass.async_start()
+    yield hass
+    await hass.async_stop(force=True)
+
+
+@pytest_asyncio.fixture
+async def fake_pixoo() -> AsyncIterator[FakePixooServer]:
+    """Return a fake device, served on a local port."""
+    server = FakePixooServer()
+    await server.async_start()
+    yield server
+    await server.async_stop()
+
+
+@pytest_asyncio.fixture
+async def coordinator(
+    hass: HomeAssistant, fake_pixoo: FakePixooServer
+) -> AsyncIterator[DivoomPixooDataUpdateCoordinator]:
+    """Return the coordinator of the fake device, as loaded by its config entry, without any rate limit."""
+    entry = ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="Pixoo",
+        data={},
+        source="user",
+        options={CONF_MIN_COMMAND_INTERVAL: 0.0},
+    )
+    # Like the config entry tests of Home Assistant itself, add the entry without setting it up
+    hass.config_entries._entries[entry.entry_id] = entry
+    coordinator = DivoomPixooDataUpdateCoordinator(
+        hass,
+        entry,
+        DivoomPixooConfig(id="pixoo", name="Pixoo", ip=fake_pixoo.address),
+        DivoomPixooCatalog(hass),
+    )
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    dr.async_get(hass).async_get_or_create(
+        config_entry_id=entry.entry_id, identifiers={(DOMAIN, "pixoo")}, name="Pixoo"
+    )
+    yield coordinator
+    await coordinator.async_shutdown()
@@ -0,0 +1,197 @@
+"""Tests of the Divoom Pixoo circuit breaker, on its own and in the api client against a fake device."""
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+from aiohttp import ClientSession
+import pytest
+import pytest_asyncio
+
+from custom_components.divoom_pixoo import circuit_breaker
+from custom_components.divoom_pixoo.api import (
+    PROBE_COMMAND,
+    DivoomPixooApiClient,
+    DivoomPixooCircuitOpenError,
+    DivoomPixooConnectionError,
+)
+from custom_components.divoom_pixoo.circuit_breaker import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_MAX_RESET_TIMEOUT,
+    CIRCUIT_RESET_TIMEOUT,
+    CircuitState,
+    DivoomPixooCircuitBreaker,
+)
+
+from .conftest import FakePixooServer
+
+WRITE_COMMAND = {"Command": "Device/PlayBuzzer"}
+
+
+class FakeClock:
+    """A monotonic clock that only moves when told to."""
+
+    def __init__(self) -> None:
+        """Initialize the FakeClock class."""
+        self.now: float = 1000.0
+
+    def monotonic(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    """Return the clock of the circuit breaker, without touching the clock of the event loop."""
+    fake_clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", fake_clock)
+    return fake_clock
+
+
+@pytest.fixture
+def states() -> list[CircuitState]:
+    """Return the state changes of the circuit breaker."""
+    return []
+
+
+@pytest.fixture
+def breaker(clock: FakeClock, states: list[CircuitState]) -> DivoomPixooCircuitBreaker:
+    """Return a closed circuit breaker, that records its state changes."""
+    breaker = DivoomPixooCircuitBreaker()
+    breaker.on_state_change = states.append
+    return breaker
+
+
+def open_circuit(breaker: DivoomPixooCircuitBreaker) -> None:
+    """Record enough failures to open the circuit."""
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        breaker.record_failure()
+
+
+def test_open(breaker: DivoomPixooCircuitBreaker, states: list[CircuitState]) -> None:
+    """Test the circuit opens after consecutive failures, and then rejects requests."""
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state is CircuitState.OPEN
+    assert states == [CircuitState.OPEN]
+    assert breaker.rejects_requests
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+
+
+def test_success_resets_failures(
+    breaker: DivoomPixooCircuitBreaker, states: list[CircuitState]
+) -> None:
+    """Test only consecutive failures open the circuit."""
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state is CircuitState.CLOSED
+    assert states == []
+
+
+def test_half_open_probe_closes(
+    breaker: DivoomPixooCircuitBreaker, clock: FakeClock, states: list[CircuitState]
+) -> None:
+    """Test a single probe is allowed once the reset timeout has passed, and closes the circuit when it succeeds."""
+    open_circuit(breaker)
+    clock.now += CIRCUIT_RESET_TIMEOUT - 1
+    assert not breaker.allow_request()
+
+    clock.now += 1
+    assert breaker.probe_due
+    assert breaker.allow_request()
+    assert breaker.state is CircuitState.HALF_OPEN
+    # Other requests keep failing fast while the probe runs
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+
+    assert breaker.state is CircuitState.CLOSED
+    assert states == [CircuitState.OPEN, CircuitState.CLOSED]
+    assert breaker.allow_request()
+
+
+def test_failed_probe_backs_off(
+    breaker: DivoomPixooCircuitBreaker, clock: FakeClock
+) -> None:
+    """Test a failed probe opens the circuit again, doubling the reset timeout up to its maximum."""
+    open_circuit(breaker)
+    reset_timeout: float = CIRCUIT_RESET_TIMEOUT
+    while reset_timeout < CIRCUIT_MAX_RESET_TIMEOUT:
+        clock.now += reset_timeout
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state is CircuitState.OPEN
+        reset_timeout = min(reset_timeout * 2, CIRCUIT_MAX_RESET_TIMEOUT)
+        clock.now += reset_timeout - 1
+        assert not breaker.allow_request()
+        clock.now += 1
+        assert breaker.probe_due
+
+    # After a successful probe, the reset timeout starts over
+    assert breaker.allow_request()
+    breaker.record_success()
+    open_circuit(breaker)
+    clock.now += CIRCUIT_RESET_TIMEOUT
+    assert breaker.probe_due
+
+
+@pytest_asyncio.fixture
+async def client(
+    fake_pixoo: FakePixooServer, clock: FakeClock
+) -> AsyncIterator[DivoomPixooApiClient]:
+    """Return an api client for the fake device."""
+    async with ClientSession() as session:
+        yield DivoomPixooApiClient(session, fake_pixoo.address)
+
+
+@pytest.mark.asyncio
+async def test_client_fails_fast(
+    client: DivoomPixooApiClient, fake_pixoo: FakePixooServer
+) -> None:
+    """Test the client stops reaching out to a device that can not be reached."""
+    await fake_pixoo.async_stop()
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(DivoomPixooConnectionError):
+            await client.async_post(WRITE_COMMAND)
+    assert client.circuit_breaker.state is CircuitState.OPEN
+
+    await fake_pixoo.async_start()
+
+    with pytest.raises(DivoomPixooCircuitOpenError):
+        await client.async_post(WRITE_COMMAND)
+    with pytest.raises(DivoomPixooCircuitOpenError):
+        client.raise_if_unreachable()
+    assert fake_pixoo.device.stats.requests == 0
+
+
+@pytest.mark.asyncio
+async def test_client_probe(
+    client: DivoomPixooApiClient, fake_pixoo: FakePixooServer, clock: FakeClock
+) -> None:
+    """Test the client probes the device once the reset timeout has passed, and sends again once it is back."""
+    await fake_pixoo.async_stop()
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(DivoomPixooConnectionError):
+            await client.async_post(WRITE_COMMAND)
+
+    # A failed probe opens the circuit again
+    clock.now += CIRCUIT_RESET_TIMEOUT
+    with pytest.raises(DivoomPixooConnectionError):
+        await client.async_post(WRITE_COMMAND)
+    assert client.circuit_breaker.state is CircuitState.OPEN
+
+    await fake_pixoo.async_start()
+    clock.now += CIRCUIT_MAX_RESET_TIMEOUT
+
+    assert await client.async_post(WRITE_COMMAND) == {"error_code": 0}
+    assert client.circuit_breaker.state is CircuitState.CLOSED
+    assert fake_pixoo.device.stats.commands[PROBE_COMMAND] == 1
+    assert fake_pixoo.device.stats.commands["Device/PlayBuzzer"] == 1
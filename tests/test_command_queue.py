@@ -0,0 +1,197 @@
+"""Tests of the Divoom Pixoo command queue, against a fake device."""
+from __future__ import annotations
+
+import asyncio
+import base64
+from collections.abc import AsyncIterator, Awaitable
+import json
+from typing import Any
+
+from aiohttp import ClientSession
+import pytest
+import pytest_asyncio
+
+from custom_components.divoom_pixoo.api import API_COMMAND, DivoomPixooApiClient
+from custom_components.divoom_pixoo.command_queue import (
+    MAX_COMMANDS_PER_REQUEST,
+    MAX_REQUEST_SIZE,
+    DivoomPixooCommandQueue,
+)
+
+from .conftest import FakePixooServer
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def command_queue(
+    fake_pixoo: FakePixooServer,
+) -> AsyncIterator[DivoomPixooCommandQueue]:
+    """Return a command queue for the fake device, that is not running yet."""
+    async with ClientSession() as session:
+        yield DivoomPixooCommandQueue(
+            DivoomPixooApiClient(session, fake_pixoo.address), min_interval=0.0
+        )
+
+
+async def async_run_queued(
+    command_queue: DivoomPixooCommandQueue, *sends: Awaitable[Any]
+) -> list[Any]:
+    """Queue all sends before the queue starts running, so they are packed as if they were sent at once."""
+    tasks: list[asyncio.Task[Any]] = [asyncio.ensure_future(send) for send in sends]
+    # Let every send reach the queue, in order
+    for _ in tasks:
+        await asyncio.sleep(0)
+    runner: asyncio.Task[None] = asyncio.create_task(command_queue.async_run())
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+
+def frame(pic_id: int) -> dict[str, Any]:
+    """Return a valid Draw/SendHttpGif command of a 64x64 frame."""
+    return {
+        API_COMMAND: "Draw/SendHttpGif",
+        "PicNum": 1,
+        "PicWidth": 64,
+        "PicOffset": 0,
+        "PicID": pic_id,
+        "PicSpeed": 1000,
+        "PicData": base64.b64encode(bytes(64 * 64 * 3)).decode(),
+    }
+
+
+async def test_merge(
+    command_queue: DivoomPixooCommandQueue, fake_pixoo: FakePixooServer
+) -> None:
+    """Test a pending setting is replaced by a newer one, which moves to the end of the queue."""
+    results: list[Any] = await async_run_queued(
+        command_queue,
+        command_queue.async_send(
+            [{API_COMMAND: "Channel/SetBrightness", "Brightness": 10}]
+        ),
+        command_queue.async_send(
+            [{API_COMMAND: "Channel/SetClockSelectId", "ClockId": 1}]
+        ),
+        command_queue.async_send([{API_COMMAND: "Channel/SetIndex", "SelectIndex": 2}]),
+        command_queue.async_send(
+            [{API_COMMAND: "Channel/SetBrightness", "Brightness": 20}]
+        ),
+        command_queue.async_send(
+            [{API_COMMAND: "Channel/SetClockSelectId", "ClockId": 3}]
+        ),
+    )
+
+    assert fake_pixoo.device.stats.requests == 1
+    assert fake_pixoo.device.stats.commands["Channel/SetBrightness"] == 1
+    assert fake_pixoo.device.stats.commands["Channel/SetClockSelectId"] == 1
+    assert fake_pixoo.device.conf["Brightness"] == 20
+    assert fake_pixoo.device.conf["CurClockId"] == 3
+    # The clock face switches to the faces channel, so it must be applied after the channel change
+    assert fake_pixoo.device.select_index == 0
+    # All callers share the response of the single request
+    assert results == [[{"error_code": 0}]] * 5
+
+
+async def test_no_merge(
+    command_queue: DivoomPixooCommandQueue, fake_pixoo: FakePixooServer
+) -> None:
+    """Test commands that are not merged are all sent, in order."""
+    await async_run_queued(
+        command_queue,
+        command_queue.async_send(
+            [
+                {API_COMMAND: "Channel/SetClockSelectId", "ClockId": 1},
+                {API_COMMAND: "Channel/SetIndex", "SelectIndex": 2},
+                {API_COMMAND: "Channel/SetClockSelectId", "ClockId": 3},
+            ],
+            merge=False,
+        ),
+    )
+
+    assert fake_pixoo.device.stats.requests == 1
+    assert fake_pixoo.device.stats.commands["Channel/SetClockSelectId"] == 2
+    assert fake_pixoo.device.conf["CurClockId"] == 3
+    assert fake_pixoo.device.select_index == 0
+
+
+async def test_pack_count_limit(
+    command_queue: DivoomPixooCommandQueue, fake_pixoo: FakePixooServer
+) -> None:
+    """Test command lists are limited in their number of commands, and a single command is sent as is."""
+    count: int = 2 * MAX_COMMANDS_PER_REQUEST + 1
+
+    results: list[Any] = await async_run_queued(
+        command_queue,
+        command_queue.async_send([{API_COMMAND: "Device/PlayBuzzer"}] * count),
+    )
+
+    assert len(results[0]) == count
+    assert fake_pixoo.device.stats.commands["Device/PlayBuzzer"] == count
+    assert fake_pixoo.device.stats.commands["Draw/CommandList"] == 2
+    assert fake_pixoo.device.stats.requests == 3
+
+
+async def test_pack_size_limit(
+    command_queue: DivoomPixooCommandQueue, fake_pixoo: FakePixooServer
+) -> None:
+    """Test command lists are limited in their json size, so frames are never packed together."""
+    assert 2 * len(json.dumps(frame(1))) > MAX_REQUEST_SIZE
+
+    await async_run_queued(
+        command_queue,
+        command_queue.async_send(
+            [frame(1), frame(2), {API_COMMAND: "Device/PlayBuzzer"}]
+        ),
+    )
+
+    # The first frame on its own, the second one packed with the small command that still fits
+    assert fake_pixoo.device.stats.requests == 2
+    assert fake_pixoo.device.stats.commands["Draw/SendHttpGif"] == 2
+    assert fake_pixoo.device.stats.commands["Draw/CommandList"] == 1
+    assert fake_pixoo.device.pic_id == 2
+
+
+async def test_reads_sent_alone(
+    command_queue: DivoomPixooCommandQueue, fake_pixoo: FakePixooServer
+) -> None:
+    """Test reads are never packed, so they return their own response, in order with the other commands."""
+    results: list[Any] = await async_run_queued(
+        command_queue,
+        command_queue.async_send_all(
+            [
+                {API_COMMAND: "Channel/SetBrightness", "Brightness": 10},
+                {API_COMMAND: "Device/PlayBuzzer"},
+                {API_COMMAND: "Channel/GetAllConf"},
+                {API_COMMAND: "Channel/SetBrightness", "Brightness": 20},
+                {API_COMMAND: "Channel/GetIndex"},
+            ]
+        ),
+    )
+
+    responses: list[Any] = results[0]
+    assert responses[2]["Brightness"] == 10
+    assert responses[4] == {"error_code": 0, "SelectIndex": 0}
+    assert fake_pixoo.device.conf["Brightness"] == 20
+    # A command list of the first two, then every read and the write between them on their own
+    assert fake_pixoo.device.stats.commands["Draw/CommandList"] == 1
+    assert fake_pixoo.device.stats.requests == 4
+
+
+async def test_send_all_errors(
+    command_queue: DivoomPixooCommandQueue, fake_pixoo: FakePixooServer
+) -> None:
+    """Test the error of every command is returned instead of raised."""
+    fake_pixoo.device.config.error_rate = 1.0
+
+    results: list[Any] = await async_run_queued(
+        command_queue,
+        command_queue.async_send_all(
+            [{API_COMMAND: "Channel/GetAllConf"}, {API_COMMAND: "Device/PlayBuzzer"}]
+        ),
+    )
+
+    assert len(results[0]) == 2
+    assert all(isinstance(result, Exception) for result in results[0])
@@ -0,0 +1,165 @@
+"""Tests of the Divoom Pixoo coordinator, against a fake device."""
+from __future__ import annotations
+
+import pytest
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.divoom_pixoo.api import (
+    DivoomPixooConnectionError,
+    DivoomPixooInvalidResponse,
+)
+from custom_components.divoom_pixoo.coordinator import (
+    DivoomPixooData,
+    DivoomPixooDataUpdateCoordinator,
+)
+
+from .conftest import FakePixooServer
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_poll(
+    coordinator: DivoomPixooDataUpdateCoordinator, fake_pixoo: FakePixooServer
+) -> None:
+    """Test the first poll reads the settings, channel and device time, each in a request of its own."""
+    fake_pixoo.device.conf["Brightness"] = 42
+    fake_pixoo.device.select_index = 3
+    # The channel is only read while an entity shows it
+    coordinator.async_add_listener(lambda: None, frozenset({"channel_index"}))
+
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    data: DivoomPixooData = coordinator.data
+    assert data.screen_brightness == 42
+    assert data.screen_state == 1
+    assert data.cur_clock_id == 182
+    assert data.channel_index == 3
+    assert data.clock_drift is not None and abs(data.clock_drift) <= 1
+    # Reads can not share a command list, as that only returns a single response
+    assert fake_pixoo.device.stats.requests == 3
+    assert fake_pixoo.device.stats.commands["Draw/CommandList"] == 0
+
+
+async def test_poll_without_channel_listener(
+    coordinator: DivoomPixooDataUpdateCoordinator, fake_pixoo: FakePixooServer
+) -> None:
+    """Test the channel is not read while no entity shows it."""
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert coordinator.data.channel_index is None
+    assert fake_pixoo.device.stats.commands["Channel/GetIndex"] == 0
+
+
+async def test_poll_only_settings_until_due(
+    coordinator: DivoomPixooDataUpdateCoordinator, fake_pixoo: FakePixooServer
+) -> None:
+    """Test a poll after the fast poll window only reads the settings, and keeps the last known channel."""
+    coordinator.async_add_listener(lambda: None, frozenset({"channel_index"}))
+    await coordinator.async_refresh()
+    fake_pixoo.device.select_index = 3
+    fake_pixoo.device.conf["Brightness"] = 42
+
+    await coordinator.async_refresh()
+
+    assert coordinator.data.screen_brightness == 42
+    assert coordinator.data.channel_index == 0
+    assert fake_pixoo.device.stats.commands["Channel/GetAllConf"] == 2
+    assert fake_pixoo.device.stats.commands["Channel/GetIndex"] == 1
+    assert fake_pixoo.device.stats.commands["Device/GetDeviceTime"] == 1
+
+
+async def test_poll_error_response(
+    coordinator: DivoomPixooDataUpdateCoordinator, fake_pixoo: FakePixooServer
+) -> None:
+    """Test a device that responds with an error fails the update."""
+    fake_pixoo.device.config.error_rate = 1.0
+
+    await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    assert isinstance(coordinator.last_exception, UpdateFailed)
+    assert isinstance(coordinator.last_exception.__cause__, DivoomPixooInvalidResponse)
+
+
+async def test_poll_unreachable(
+    coordinator: DivoomPixooDataUpdateCoordinator, fake_pixoo: FakePixooServer
+) -> None:
+    """Test a device that can not be reached fails the update, and keeps the last known data."""
+    await coordinator.async_refresh()
+    data: DivoomPixooData = coordinator.data
+    await fake_pixoo.async_stop()
+
+    await coordinator.async_refresh()
+
+    assert not coordinator.last_update_success
+    assert isinstance(coordinator.last_exception, UpdateFailed)
+    assert isinstance(coordinator.last_exception.__cause__, DivoomPixooConnectionError)
+    assert coordinator.data is data
+
+
+async def test_batch(
+    coordinator: DivoomPixooDataUpdateCoordinator, fake_pixoo: FakePixooServer
+) -> None:
+    """Test commands within a batch are sent as a single command list, and their optimistic data is applied after it."""
+    await coordinator.async_refresh()
+    fake_pixoo.device.stats.requests = 0
+    updates: list[DivoomPixooData] = []
+    coordinator.async_add_listener(lambda: updates.append(coordinator.data))
+
+    async with coordinator.async_batch():
+        await coordinator.async_set_brightness(30)
+        await coordinator.async_set_screen(False)
+        await coordinator.async_set_hour_mode(0)
+        # Nothing is sent or written through until the batch ends
+        assert fake_pixoo.device.stats.requests == 0
+        assert coordinator.data.screen_brightness == 100
+        assert not updates
+
+    assert fake_pixoo.device.stats.requests == 1
+    assert fake_pixoo.device.stats.commands["Draw/CommandList"] == 1
+    assert fake_pixoo.device.conf["Brightness"] == 30
+    assert fake_pixoo.device.conf["LightSwitch"] == 0
+    assert fake_pixoo.device.conf["Time24Flag"] == 0
+    # All optimistic data is applied at once, with a single notification
+    assert len(updates) == 1
+    assert updates[0].screen_brightness == 30
+    assert updates[0].screen_state == 0
+    assert updates[0].hour_mode == 0
+
+
+async def test_nested_batch(
+    coordinator: DivoomPixooDataUpdateCoordinator, fake_pixoo: FakePixooServer
+) -> None:
+    """Test a nested batch is merged into the outer batch."""
+    await coordinator.async_refresh()
+    fake_pixoo.device.stats.requests = 0
+
+    async with coordinator.async_batch():
+        await coordinator.async_set_brightness(30)
+        async with coordinator.async_batch():
+            await coordinator.async_set_screen(False)
+        assert fake_pixoo.device.stats.requests == 0
+        assert coordinator.data.screen_state == 1
+
+    assert fake_pixoo.device.stats.requests == 1
+    assert coordinator.data.screen_brightness == 30
+    assert coordinator.data.screen_state == 0
+
+
+async def test_batch_error(
+    coordinator: DivoomPixooDataUpdateCoordinator, fake_pixoo: FakePixooServer
+) -> None:
+    """Test a batch that the device rejects raises, without applying its optimistic data."""
+    await coordinator.async_refresh()
+    fake_pixoo.device.config.error_rate = 1.0
+
+    with pytest.raises(DivoomPixooInvalidResponse):
+        async with coordinator.async_batch():
+            await coordinator.async_set_brightness(30)
+            await coordinator.async_set_screen(False)
+
+    assert coordinator.data.screen_brightness == 100
+    assert coordinator.data.screen_state == 1
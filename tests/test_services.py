@@ -0,0 +1,132 @@
+"""Tests of the Divoom Pixoo services, against a fake device."""
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr
+
+from custom_components.divoom_pixoo.const import DOMAIN
+from custom_components.divoom_pixoo.coordinator import DivoomPixooDataUpdateCoordinator
+from custom_components.divoom_pixoo.services import (
+    SERVICE_RUN_COMMANDS,
+    SERVICE_SEND_COMMAND,
+    async_setup_services,
+)
+
+from .conftest import FakePixooServer
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def device_id(
+    hass: HomeAssistant, coordinator: DivoomPixooDataUpdateCoordinator
+) -> str:
+    """Return the id of the fake device, with the services set up."""
+    async_setup_services(hass)
+    device: dr.DeviceEntry | None = dr.async_get(hass).async_get_device(
+        identifiers={(DOMAIN, "pixoo")}
+    )
+    assert device is not None
+    return device.id
+
+
+async def test_run_commands(
+    hass: HomeAssistant, device_id: str, fake_pixoo: FakePixooServer
+) -> None:
+    """Test the response of running commands, with the actual response of reads."""
+    response: Any = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_RUN_COMMANDS,
+        {
+            "device_id": device_id,
+            "command_list": [
+                {"Command": "Channel/SetBrightness", "Brightness": 50},
+                {"Command": "Device/SetTime24Flag", "Mode": 0},
+                {"Command": "Channel/GetAllConf"},
+            ],
+        },
+        blocking=True,
+        return_response=True,
+    )
+
+    results: list[dict[str, Any]] = response["devices"][device_id]
+    assert results[:2] == [
+        {
+            "command": "Channel/SetBrightness",
+            "success": True,
+            "response": {"error_code": 0},
+        },
+        {
+            "command": "Device/SetTime24Flag",
+            "success": True,
+            "response": {"error_code": 0},
+        },
+    ]
+    assert results[2]["command"] == "Channel/GetAllConf"
+    assert results[2]["success"]
+    assert results[2]["response"]["Brightness"] == 50
+    assert results[2]["response"]["Time24Flag"] == 0
+    # The writes are packed, the read is sent on its own
+    assert fake_pixoo.device.stats.requests == 2
+
+
+async def test_run_commands_error(
+    hass: HomeAssistant, device_id: str, fake_pixoo: FakePixooServer
+) -> None:
+    """Test commands that the device rejects report their error, without failing the call."""
+    fake_pixoo.device.config.error_rate = 1.0
+
+    response: Any = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_RUN_COMMANDS,
+        {"device_id": device_id, "command_list": [{"Command": "Channel/GetAllConf"}]},
+        blocking=True,
+        return_response=True,
+    )
+
+    results: list[dict[str, Any]] = response["devices"][device_id]
+    assert len(results) == 1
+    assert results[0]["command"] == "Channel/GetAllConf"
+    assert not results[0]["success"]
+    assert "returned error" in results[0]["error"]
+
+
+async def test_send_command(
+    hass: HomeAssistant, device_id: str, fake_pixoo: FakePixooServer
+) -> None:
+    """Test the response of sending a command to all devices."""
+    response: Any = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SEND_COMMAND,
+        {"command": "Channel/GetIndex"},
+        blocking=True,
+        return_response=True,
+    )
+
+    result: dict[str, Any] = response["devices"][device_id]
+    assert result["success"]
+    assert result["response"] == {"error_code": 0, "SelectIndex": 0}
+    assert result["latency"] >= 0
+
+
+async def test_send_command_unreachable(
+    hass: HomeAssistant, device_id: str, fake_pixoo: FakePixooServer
+) -> None:
+    """Test a device that can not be reached reports its error."""
+    await fake_pixoo.async_stop()
+
+    response: Any = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SEND_COMMAND,
+        {"device_id": device_id, "command": "Device/PlayBuzzer"},
+        blocking=True,
+        return_response=True,
+    )
+
+    result: dict[str, Any] = response["devices"][device_id]
+    assert not result["success"]
+    assert "Could not reach" in result["error"]